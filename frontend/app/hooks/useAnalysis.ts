@@ -17,6 +17,17 @@ interface ProgressPayload {
     reasoning: string;
 }
 
+type DeltaPayload =
+    | { type: "token"; turn: number; text: string }
+    | {
+          type: "tool_call";
+          turn: number;
+          index: number;
+          id: string | null;
+          name: string;
+          args_delta: string;
+      };
+
 interface ResultPayload {
     risk_score: number;
     justification?: string;
@@ -33,6 +44,8 @@ export function useAnalysis() {
     const [logs, setLogs] = useState<string[]>([]);
 
     const esRef = useRef<EventSource | null>(null);
+    // Turn whose streamed tokens are currently shown as reasoning
+    const streamTurnRef = useRef<number | null>(null);
 
     const appendLog = (line: string) =>
         setLogs((prev: string[]) => [...prev, line]);
@@ -44,6 +57,7 @@ export function useAnalysis() {
         setMetrics([]);
         setJustification(null);
         setReasoning(null);
+        streamTurnRef.current = null;
         setLogs([]);
         setLatestMsg("");
 
@@ -82,6 +96,18 @@ export function useAnalysis() {
                     setLatestMsg(logLine);
                 });
 
+                es.addEventListener("delta", (e) => {
+                    const data = JSON.parse((e as MessageEvent).data) as DeltaPayload;
+                    if (data.type === "token") {
+                        const fresh = streamTurnRef.current !== data.turn;
+                        streamTurnRef.current = data.turn;
+                        setReasoning((prev) => (fresh ? "" : prev ?? "") + data.text);
+                    } else if (data.name && !data.args_delta) {
+                        // First delta of a tool call: its name is known, arguments follow
+                        setLatestMsg(`[Turn ${data.turn + 1}] Calling ${data.name} …`);
+                    }
+                });
+
                 es.addEventListener("result", (e) => {
                     console.log("[useAnalysis] result", (e as MessageEvent).data);
                     const data = JSON.parse((e as MessageEvent).data) as ResultPayload;
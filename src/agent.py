@@ -1,6 +1,9 @@
+import asyncio
 import inspect
 import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pformat
 from string import Template
 from typing import Any, Callable, Dict, List, Optional
@@ -19,19 +22,26 @@ from langchain_core.messages import (
     ToolMessage,
     messages_from_dict,
 )
+from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import BaseTool
 from langchain_openai import ChatOpenAI
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph import StateGraph
 from pydantic import BaseModel, Field, PrivateAttr, field_validator
 
 from src.agent_utils import StopNow
+from src.data_store import make_handle, outline
+from src.metrics.from_dataset import METRIC_INPUT_BUILDERS, MetricUnavailable, build_metric_input
+from src.providers.client import run_sync
+from src.providers.wallet_dataset import gather_wallet_dataset
+from src.scheduler import call_etas, delivered_content, scheduled_reply
 from src.utils import count_tokens, get_prompts_dir, truncate_to_n_tokens
 
 logger = logging.getLogger("defi_agent")
 
 
 class ToolExecutor:  # type: ignore
-    """Tiny substitute that supports .invoke()."""
+    """Tiny substitute that supports .invoke() and .ainvoke()."""
 
     def __init__(self, tools: List[Callable]):
         self._tools = {t.name: t for t in tools}
@@ -45,6 +55,15 @@ class ToolExecutor:  # type: ignore
             out = tool(**args)
         return out
 
+    async def ainvoke(self, call_spec: Dict[str, Any]):
+        name, args = call_spec["name"], call_spec.get("arguments", {})
+        tool = self._tools[name]
+        if isinstance(tool, BaseTool):  # type: ignore
+            out = await tool.ainvoke(args)
+        else:
+            out = tool(**args)
+        return out
+
 
 # TOOLS
 # utils
@@ -64,28 +83,35 @@ from src.providers.dexscreener import *
 from src.providers.ethplorer import *
 from src.providers.goplus import *
 from src.providers.moralis import *
+from src.providers.portfolio import *
 
 TOOLS = [
     api_alchemy_tx_history,
     api_alchemy_portfolio,
     api_coingecko_coin_data,
     api_coingecko_contract,
+    api_coingecko_token_prices,
     api_dexscreener_token_data,
+    api_dexscreener_tokens_batch,
     api_ethplorer_token_data,
     api_goplus_token_security,
+    api_goplus_tokens_security_scan,
     api_moralis_wallet_history,
+    api_moralis_wallet_history_summary,
     api_moralis_wallet_portfolio,
+    api_portfolio,
     metric_calculate_exotic_asset_exposure,
     metric_calculate_portfolio_concentration,
     metric_calculate_low_tvl_protocol_concentration,
     metric_calculate_portfolio_churn_rate,
     metric_calculate_bridged_asset_exposure,
     util_stop_now,
-    util_wait_five_seconds,
     util_math_multiply_numbers,
     util_math_sum_numbers,
     util_math_divide_numbers,
     util_math_subtract_numbers,
+    util_math_evaluate,
+    util_query_data,
 ]
 
 METRIC_OUTPUTS = [
@@ -110,6 +136,28 @@ class AgentState(BaseModel):
     turn_count: int = 0
     max_turns: int
     max_messages: int
+    # Upper bound on tool calls from a single LLM turn that run concurrently
+    max_parallel_tools: int = 4
+    # Gather portfolio, history and token data before the first LLM turn
+    prefetch: bool = True
+    # Compute every metric from the prefetched dataset and finalize, without the LLM loop
+    fast_path: bool = False
+    # Compact dataset produced by the prefetch stage, shown to the LLM every turn
+    dataset: Optional[Dict[str, Any]] = None
+    # Fast path: metric tool name -> why it could not be computed from the dataset
+    unavailable_metrics: Dict[str, str] = Field(default_factory=dict)
+    # Large tool results, by handle; the conversation only gets an outline (src/data_store.py)
+    data_store: Dict[str, Any] = Field(default_factory=dict)
+    # Tool results above this many tokens go to data_store (None keeps them inline)
+    store_min_tokens: Optional[int] = 2000
+    # Over-limit tool calls that can start within this many seconds are waited for,
+    # later ones are answered "scheduled" and run on a later tools step
+    max_schedule_wait: float = 20.0
+    # Deferred tool calls, as {"id", "name", "args"}
+    scheduled: List[Dict[str, Any]] = Field(default_factory=list)
+    # Stream LLM output (async graph only): deltas go to the custom stream and
+    # tool calls start as soon as their arguments are complete
+    stream: bool = False
     # The bound LLM object should NOT be serialized into checkpoints, because it is
     # not JSON-serialisable and, when re-loaded, becomes a plain dict – which then
     # breaks calls like `.invoke()`.  We therefore exclude it from Pydantic
@@ -127,7 +175,161 @@ class AgentState(BaseModel):
         arbitrary_types_allowed = True
 
 
-def node_llm(state: AgentState) -> Dict[str, Any]:
+def _message_tokens(msg: BaseMessage, model: str) -> int:
+    return count_tokens(text=str(msg), model=model)
+
+
+def _content_text(msg: BaseMessage) -> str:
+    return msg.content if isinstance(msg.content, str) else json.dumps(msg.content, default=str)
+
+
+def _truncate_message(msg: BaseMessage, model: str, max_tokens: int) -> BaseMessage:
+    """Copy of `msg` with its content cut to `max_tokens` tokens, type and ids kept."""
+    return msg.model_copy(
+        update={
+            "content": truncate_to_n_tokens(
+                text=_content_text(msg), model_name=model, max_tokens=max(0, max_tokens)
+            )
+        }
+    )
+
+
+def _fit_message(msg: BaseMessage, model: str, max_tokens: int) -> tuple[BaseMessage, int]:
+    """`msg`, truncated if needed so that it counts at most `max_tokens` tokens."""
+    ntokens = _message_tokens(msg, model)
+    # Token counts are not additive across the repr, so a second pass may be needed.
+    for _ in range(3):
+        if ntokens <= max_tokens:
+            break
+        content_tokens = count_tokens(text=_content_text(msg), model=model)
+        msg = _truncate_message(msg, model, content_tokens - (ntokens - max_tokens))
+        ntokens = _message_tokens(msg, model)
+    return msg, ntokens
+
+
+def _message_units(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """
+    Split the history into units that are kept or dropped as a whole: an AI
+    message with its tool results, or any other single message.
+    """
+    units: List[List[BaseMessage]] = []
+    for msg in messages:
+        if (
+            isinstance(msg, ToolMessage)
+            and units
+            and isinstance(units[-1][0], AIMessage)
+            and units[-1][0].tool_calls
+        ):
+            units[-1].append(msg)
+        else:
+            units.append([msg])
+    return units
+
+
+# Share of max_token_per_prompt the fixed prefix (system prompt, input, dataset) may use.
+MAX_PREFIX_SHARE = 0.5
+
+
+def _fit_prefix(
+    fixed: List[BaseMessage], context: List[BaseMessage], model: str, budget: int
+) -> tuple[List[BaseMessage], int]:
+    """
+    `fixed + context` as (messages, tokens), with the context messages (the
+    prefetched dataset) truncated to share what `fixed` leaves of `budget`.
+    """
+    fixed_tokens = sum(_message_tokens(m, model) for m in fixed)
+    sized = [(m, _message_tokens(m, model)) for m in context]
+    if fixed_tokens + sum(n for _, n in sized) > budget and context:
+        share = max(0, budget - fixed_tokens) // len(context)
+        sized = [_fit_message(m, model, share) for m in context]
+        logger.warning(
+            "Prompt prefix over %d tokens, dataset truncated to %d tokens", budget, share
+        )
+    return fixed + [m for m, _ in sized], fixed_tokens + sum(n for _, n in sized)
+
+
+def _pack_window(
+    messages: List[BaseMessage],
+    model: str,
+    budget: int,
+    max_messages: int,
+    max_token_per_msg: Optional[int],
+) -> tuple[List[BaseMessage], int]:
+    """
+    The most recent history that fits in `budget` tokens, as (messages, tokens).
+
+    Units are taken newest first with a running token sum until `max_messages`
+    messages are kept or the next unit does not fit; tool calls are never
+    separated from their results. Messages longer than `max_token_per_msg` are
+    truncated. The latest tool round (and anything newer) is always kept: when it
+    does not fit, the remaining budget is shared equally between its messages.
+    """
+    units = _message_units(messages)
+    # Units from the latest AI turn with tool calls onwards are never dropped.
+    required = next(
+        (
+            i + 1
+            for i, unit in enumerate(reversed(units))
+            if isinstance(unit[0], AIMessage) and unit[0].tool_calls
+        ),
+        1,
+    )
+    kept: List[List[BaseMessage]] = []
+    used = kept_messages = truncated = 0
+    for unit in reversed(units):
+        must_keep = len(kept) < required
+        if kept_messages >= max_messages and not must_keep:
+            break
+        sized = [
+            _fit_message(m, model, max_token_per_msg)
+            if max_token_per_msg is not None
+            else (m, _message_tokens(m, model))
+            for m in unit
+        ]
+        cost = sum(n for _, n in sized)
+        if used + cost > budget:
+            if not must_keep:
+                break
+            share = max(0, budget - used) // len(unit)
+            sized = [_fit_message(m, model, share) for m, _ in sized]
+            cost = sum(n for _, n in sized)
+            if used + cost > budget:
+                logger.warning(
+                    "Latest %d messages need %d tokens, over the %d left; sending them truncated",
+                    len(unit),
+                    cost,
+                    budget - used,
+                )
+        truncated += sum(m is not orig for (m, _), orig in zip(sized, unit))
+        kept.append([m for m, _ in sized])
+        used += cost
+        kept_messages += len(unit)
+
+    window = [m for unit in reversed(kept) for m in unit]
+    dropped = len(messages) - len(window)
+    if dropped or truncated:
+        dropped_tools = [
+            m.name or m.tool_call_id
+            for unit in units[: len(units) - len(kept)]
+            for m in unit
+            if isinstance(m, ToolMessage)
+        ]
+        logger.info(
+            "Context window: kept %d/%d messages (%d tokens, budget %d), "
+            "dropped %d older (tool results: %s), truncated %d",
+            len(window),
+            len(messages),
+            used,
+            budget,
+            dropped,
+            dropped_tools,
+            truncated,
+        )
+    return window, used
+
+
+def _prepare_llm_call(state: AgentState):
+    """Build the conversation for this turn and make sure the bound LLM is usable."""
     logger.info(f"─── Turn start: {state.turn_count}/{state.max_turns} " + "─" * 60)
     with open(get_prompts_dir() + "/system.md") as f:
         system_prompt = f.read()
@@ -136,66 +338,37 @@ def node_llm(state: AgentState) -> Dict[str, Any]:
     input_prompt = convo_template.format(
         input_address=state.input_address,
     )
-
-    # Keep only the last max_messages, ensuring we don't split tool calls from their results
-    messages_to_keep = []
-    # Start from the end of the messages
-    for msg in reversed(state.messages):
-        messages_to_keep.insert(0, msg)
-        # If we have enough messages and the last one is not a tool message, we can stop
-        if len(messages_to_keep) >= state.max_messages and not isinstance(
-            msg, ToolMessage
-        ):
-            # However, we need to make sure the AI message that preceded it is included
-            if isinstance(msg, AIMessage) and msg.tool_calls:
-                pass  # This is the start of a tool sequence, keep it
-            else:
-                break
-
-    messages = messages_to_keep
-
-    def truncate_all_messages_equally(messages: List[BaseMessage]) -> List[str]:
-        tot_length = sum(
-            [count_tokens(text=str(msg), model=state.model_name) for msg in messages]
-        )
-        max_msg_tokens = int(state.max_token_per_prompt / len(messages))
-        out = [
-            truncate_to_n_tokens(
-                text=str(msg), model_name=state.model_name, max_tokens=max_msg_tokens
-            )
-        ]
-        return out
-
-    def truncate_long_messages(messages: List[BaseMessage]) -> List[str]:
-        out = []
-        for msg in messages:
-            if state.max_token_per_msg is None:
-                out.append(msg)
-                continue
-            ntokens = count_tokens(text=str(msg), model=state.model_name)
-            new_msg = str(msg)
-            if ntokens > state.max_token_per_msg:
-                new_msg = truncate_to_n_tokens(
-                    text=str(msg),
-                    model_name=state.model_name,
-                    max_tokens=state.max_token_per_msg,
+    context = []
+    if state.dataset is not None:
+        with open(get_prompts_dir() + "/dataset.md") as f:
+            dataset_template = f.read()
+        context.append(
+            HumanMessage(
+                content=dataset_template.format(
+                    input_address=state.input_address,
+                    dataset=json.dumps(state.dataset, separators=(",", ":"), default=str),
                 )
-            out.append(new_msg)
-        return out
+            )
+        )
 
+    prefix = [SystemMessage(system_prompt)]
     if not state.messages:
-        convo = [
-            SystemMessage(system_prompt),
-            HumanMessage(content=input_prompt),
-        ]
-    else:
-        # convo = [SystemMessage(system_prompt)] + messages
-        # convo = [SystemMessage(system_prompt)] + truncate_all_messages_equally(messages)
-        convo = [SystemMessage(system_prompt)] + truncate_long_messages(messages)
-
-    convo_tokens = sum(
-        [count_tokens(text=str(msg), model=state.model_name) for msg in convo]
+        prefix.append(HumanMessage(content=input_prompt))
+    prefix, prefix_tokens = _fit_prefix(
+        prefix,
+        context,
+        model=state.model_name,
+        budget=int(state.max_token_per_prompt * MAX_PREFIX_SHARE),
     )
+    history, history_tokens = _pack_window(
+        state.messages,
+        model=state.model_name,
+        budget=state.max_token_per_prompt - prefix_tokens,
+        max_messages=state.max_messages,
+        max_token_per_msg=state.max_token_per_msg,
+    )
+    convo = prefix + history
+    convo_tokens = prefix_tokens + history_tokens
 
     logger.info(
         f"Invoking LLM with {len(convo)} messages ({convo_tokens} tokens)",
@@ -235,7 +408,55 @@ def node_llm(state: AgentState) -> Dict[str, Any]:
         state.llm_with_tools = llm_wt
 
     logger.debug(f"Calling LLM with input:\n{convo}")
-    raw_ai_msg: AIMessage = llm_wt.invoke(convo)
+    return convo, llm_wt
+
+
+def node_prefetch(state: AgentState) -> Dict[str, Any]:
+    """Fetch the wallet dataset up front so the LLM starts from ready data."""
+    if not (state.prefetch or state.fast_path) or state.dataset is not None:
+        return {}
+    return {"dataset": run_sync(gather_wallet_dataset(state.input_address))}
+
+
+async def anode_prefetch(state: AgentState) -> Dict[str, Any]:
+    if not (state.prefetch or state.fast_path) or state.dataset is not None:
+        return {}
+    return {"dataset": await gather_wallet_dataset(state.input_address)}
+
+
+def after_prefetch(state: AgentState) -> str:
+    return "metrics" if state.fast_path else "agent"
+
+
+def node_metrics(state: AgentState) -> Dict[str, Any]:
+    """
+    Fast path: build every metric_* input from the dataset and compute it.
+    Metrics whose sources failed, or that the dataset cannot support, are skipped
+    and reported to finalize with the reason.
+    """
+    tools = {t.name: t for t in TOOLS}
+    metrics = []
+    unavailable = {}
+    for name in METRIC_INPUT_BUILDERS:
+        try:
+            result = tools[name].invoke({"data": build_metric_input(name, state.dataset or {})})
+        except MetricUnavailable as exc:
+            logger.info("Fast path skips %s: %s", name, exc)
+            unavailable[name] = str(exc)
+            continue
+        except Exception as exc:
+            logger.warning("%s failed on the prefetched dataset: %s", name, exc)
+            unavailable[name] = f"failed: {exc}"
+            continue
+        logger.info("Fast path %s: %s", name, result)
+        metrics.append(_metric_dict(result))
+    return {
+        "metrics": state.metrics + metrics,
+        "unavailable_metrics": {**state.unavailable_metrics, **unavailable},
+    }
+
+
+def _llm_update(state: AgentState, raw_ai_msg: AIMessage, llm_wt) -> Dict[str, Any]:
     logger.info(
         f"LLM returned {len(raw_ai_msg.tool_calls)} tool calls {raw_ai_msg.tool_calls} and content: \"{raw_ai_msg.content}\""
     )
@@ -253,62 +474,416 @@ def node_llm(state: AgentState) -> Dict[str, Any]:
     }
 
 
-def node_tools(state: AgentState) -> Dict[str, Any]:
-    ai_msg: AIMessage = state.messages[-1]
-    out_messages: List[BaseMessage] = []
-    new_metrics: List[BaseModel] = []
+def node_llm(state: AgentState) -> Dict[str, Any]:
+    convo, llm_wt = _prepare_llm_call(state)
+    raw_ai_msg: AIMessage = llm_wt.invoke(convo)
+    return _llm_update(state, raw_ai_msg, llm_wt)
+
 
-    for tc in ai_msg.tool_calls:
-        name, call_id = tc["name"], tc["id"]
-        args = tc.get("args") or tc.get("arguments") or {}
-        logger.info("Executing %s args=%s", name, args)
+async def anode_llm(state: AgentState) -> Dict[str, Any]:
+    convo, llm_wt = _prepare_llm_call(state)
+    if state.stream:
+        raw_ai_msg = await _astream_llm(state, convo, llm_wt)
+    else:
+        raw_ai_msg = await llm_wt.ainvoke(convo)
+    return _llm_update(state, raw_ai_msg, llm_wt)
+
+
+class _EarlyToolRuns:
+    """
+    Tool calls of one run started while the LLM response was still streaming,
+    by tool_call id, and the semaphore bounding that run's tool calls to
+    `max_parallel_tools`. anode_llm and anode_tools run on the same event loop,
+    so anode_tools picks the tasks up.
+    """
+
+    def __init__(self, max_parallel_tools: int):
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.calls: Dict[str, ToolCall] = {}
+        self.semaphore = asyncio.Semaphore(max(1, max_parallel_tools))
+
+    def running(self) -> List[ToolCall]:
+        """Started calls that have not finished, in start order."""
+        return [self.calls[i] for i, task in self.tasks.items() if not task.done()]
+
+    def cancel(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.calls.clear()
+
+
+# Per run (thread_id), so concurrent jobs on the server never see each other's calls.
+_EARLY_TOOL_RUNS: Dict[str, _EarlyToolRuns] = {}
+
+
+def _run_key() -> str:
+    return str(get_config().get("configurable", {}).get("thread_id"))
+
+
+def _early_tool_runs(state: AgentState) -> _EarlyToolRuns:
+    key = _run_key()
+    if key not in _EARLY_TOOL_RUNS:
+        _EARLY_TOOL_RUNS[key] = _EarlyToolRuns(state.max_parallel_tools)
+    return _EARLY_TOOL_RUNS[key]
+
+
+async def _early_tool_call(
+    tc: ToolCall, state: AgentState, runs: _EarlyToolRuns, ahead: List[ToolCall]
+):
+    """
+    Run `tc` now if its provider has quota once the calls `ahead` of it (started
+    earlier in the stream, still running) have had theirs, else return None and
+    leave it to anode_tools.
+    """
+    *_, eta = await call_etas(ahead + [tc])
+    if eta > 0:
+        return None
+    async with runs.semaphore:
+        return await _arun_tool_call(tc, state)
+
+
+def _discard_early_tool_runs() -> None:
+    """Cancel every early tool call of this run that nobody will collect."""
+    runs = _EARLY_TOOL_RUNS.pop(_run_key(), None)
+    if runs is not None:
+        runs.cancel()
+
+
+async def _astream_llm(state: AgentState, convo: List[BaseMessage], llm_wt) -> AIMessage:
+    """
+    Stream the completion. Content and tool-call argument deltas are written to
+    the graph's custom stream as they arrive, and each tool call is started as
+    soon as its arguments are complete, i.e. when the next tool call begins.
+    """
+    writer = get_stream_writer()
+    runs = _early_tool_runs(state)
+    message = None
+    calls: Dict[int, Dict[str, Any]] = {}
+    started: set[int] = set()
+    stopping = False
+
+    def _start(index: int) -> None:
+        nonlocal stopping
+        call = calls[index]
+        if index in started or stopping:
+            return
+        started.add(index)
+        # Nothing after util_stop_now runs, see _tool_calls_to_run.
+        if call["name"] == util_stop_now.name:
+            stopping = True
+            return
         try:
-            result = tool_executor.invoke({"name": name, "arguments": args})
-            ntokens = count_tokens(text=str(result), model=state.model_name)
-            logger.info(f"Tool {name} returned result ({ntokens} tokens): {result}")
-            if isinstance(result, StopNow):
-                out_messages.append(
-                    ToolMessage(
-                        content=json.dumps({"type": "stop_now"}), tool_call_id=call_id
-                    )
-                )
-                break
-            # is_metric = any(isinstance(result, mo) for mo in METRIC_OUTPUTS)
-            is_metric = isinstance(result, BaseMetricOutput)
-            if is_metric:
-                metric_dict = {
-                    "metric_name": result.metric_name,
-                    "metric_description": result.metric_description,
-                    "value": result.value,  
-                    "value_explanation": result.value_explanation,
-                }
-                new_metrics.append(metric_dict)
-                out_messages.append(
-                    ToolMessage(content=json.dumps(metric_dict), tool_call_id=call_id)
+            args = json.loads(call["args"] or "{}")
+        except ValueError:
+            return
+        tc = ToolCall(name=call["name"], args=args, id=call["id"])
+        logger.info("Starting %s while the LLM response streams", call["name"])
+        ahead = runs.running()
+        runs.calls[call["id"]] = tc
+        runs.tasks[call["id"]] = asyncio.create_task(_early_tool_call(tc, state, runs, ahead))
+
+    try:
+        async for chunk in llm_wt.astream(convo):
+            message = chunk if message is None else message + chunk
+            if chunk.content:
+                writer({"type": "token", "turn": state.turn_count, "text": chunk.content})
+            for delta in chunk.tool_call_chunks:
+                index = delta.get("index") or 0
+                if index not in calls:
+                    # A new call begins, so the arguments of the previous ones are complete.
+                    for previous in sorted(calls):
+                        _start(previous)
+                    calls[index] = {"id": None, "name": "", "args": ""}
+                call = calls[index]
+                call["id"] = call["id"] or delta.get("id")
+                call["name"] += delta.get("name") or ""
+                call["args"] += delta.get("args") or ""
+                writer(
+                    {
+                        "type": "tool_call",
+                        "turn": state.turn_count,
+                        "index": index,
+                        "id": call["id"],
+                        "name": call["name"],
+                        "args_delta": delta.get("args") or "",
+                    }
                 )
+    except BaseException:
+        _discard_early_tool_runs()
+        raise
+    return message if message is not None else AIMessage(content="")
 
-            else:
-                out_messages.append(
-                    ToolMessage(content=json.dumps(result), tool_call_id=call_id)
-                )
-        except Exception as exc:
-            logger.warning("%s error: %s", name, exc)
-            logger.info(f"{name} error {exc}")
+
+def _metric_dict(result: BaseMetricOutput) -> Dict[str, Any]:
+    return {
+        "metric_name": result.metric_name,
+        "metric_description": result.metric_description,
+        "value": result.value,
+        "value_explanation": result.value_explanation,
+    }
+
+
+def _tool_message(
+    name: str, call_id: str, result: Any, model_name: str, store_min_tokens: Optional[int]
+) -> tuple[ToolMessage, Optional[Dict[str, Any]], bool, Dict[str, Any]]:
+    """Turn a tool result into (message, metric or None, stop flag, results to store)."""
+    ntokens = count_tokens(text=str(result), model=model_name)
+    logger.info(f"Tool {name} returned result ({ntokens} tokens): {result}")
+    if isinstance(result, StopNow):
+        return (
+            ToolMessage(content=json.dumps({"type": "stop_now"}), tool_call_id=call_id),
+            None,
+            True,
+            {},
+        )
+    # is_metric = any(isinstance(result, mo) for mo in METRIC_OUTPUTS)
+    is_metric = isinstance(result, BaseMetricOutput)
+    if is_metric:
+        metric_dict = _metric_dict(result)
+        return (
+            ToolMessage(content=json.dumps(metric_dict), tool_call_id=call_id),
+            metric_dict,
+            False,
+            {},
+        )
+    too_large = store_min_tokens is not None and ntokens >= store_min_tokens
+    if too_large and name == util_query_data.name:
+        # Storing a query result would only hand back another handle to query.
+        logger.info("Truncated %s result (%d tokens) to %d", name, ntokens, store_min_tokens)
+        partial = {
+            "truncated": True,
+            "tokens": ntokens,
+            "note": "Result too large; narrow the path, select fields with {a,b} or lower limit.",
+            "partial_result": truncate_to_n_tokens(
+                text=json.dumps(result, default=str),
+                model_name=model_name,
+                max_tokens=store_min_tokens,
+            ),
+        }
+        return ToolMessage(content=json.dumps(partial), tool_call_id=call_id), None, False, {}
+    if too_large:
+        handle = make_handle(name, result)
+        logger.info("Stored %s result (%d tokens) as %s", name, ntokens, handle)
+        summary = {
+            "stored_as": handle,
+            "tokens": ntokens,
+            "outline": outline(result),
+            "note": "Full result stored. Read the parts you need with util_query_data.",
+        }
+        return (
+            ToolMessage(content=json.dumps(summary, default=str), tool_call_id=call_id),
+            None,
+            False,
+            {handle: result},
+        )
+    return ToolMessage(content=json.dumps(result), tool_call_id=call_id), None, False, {}
+
+
+def _tool_error_message(name: str, call_id: str, exc: Exception) -> ToolMessage:
+    logger.warning("%s error: %s", name, exc)
+    logger.info(f"{name} error {exc}")
+    return ToolMessage(
+        content=json.dumps(
+            {"status": "error", "message": f"Tool failed with error: {exc}"}
+        ),
+        tool_call_id=call_id,
+    )
+
+
+def _tool_call_parts(tc: ToolCall) -> tuple[str, str, Dict[str, Any]]:
+    name, call_id = tc["name"], tc["id"]
+    args = tc.get("args") or tc.get("arguments") or {}
+    logger.info("Executing %s args=%s", name, args)
+    return name, call_id, args
+
+
+def _tool_calls_to_run(tool_calls: List[ToolCall]) -> List[ToolCall]:
+    """Calls to execute this turn: nothing after the first util_stop_now is run."""
+    for i, tc in enumerate(tool_calls):
+        if tc["name"] == util_stop_now.name:
+            return tool_calls[: i + 1]
+    return list(tool_calls)
+
+
+def _tool_args(state: AgentState, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the arguments hidden from the LLM (InjectedToolArg) to a call."""
+    if name == util_query_data.name:
+        return {**args, "data_store": state.data_store}
+    return args
+
+
+def _run_tool_call(tc: ToolCall, state: AgentState):
+    name, call_id, args = _tool_call_parts(tc)
+    try:
+        result = tool_executor.invoke({"name": name, "arguments": _tool_args(state, name, args)})
+        return _tool_message(name, call_id, result, state.model_name, state.store_min_tokens)
+    except Exception as exc:
+        return _tool_error_message(name, call_id, exc), None, False, {}
+
+
+async def _arun_tool_call(tc: ToolCall, state: AgentState):
+    name, call_id, args = _tool_call_parts(tc)
+    try:
+        result = await tool_executor.ainvoke(
+            {"name": name, "arguments": _tool_args(state, name, args)}
+        )
+        return _tool_message(name, call_id, result, state.model_name, state.store_min_tokens)
+    except Exception as exc:
+        return _tool_error_message(name, call_id, exc), None, False, {}
+
+
+def _tools_step(state: AgentState) -> tuple[List[ToolCall], List[ToolCall]]:
+    """(calls requested by the last LLM turn, calls deferred on an earlier step)."""
+    last = state.messages[-1]
+    new_calls = (
+        _tool_calls_to_run(last.tool_calls)
+        if isinstance(last, AIMessage) and last.tool_calls
+        else []
+    )
+    pending = [ToolCall(name=c["name"], args=c["args"], id=c["id"]) for c in state.scheduled]
+    return new_calls, pending
+
+
+def _split_by_eta(
+    state: AgentState, calls: List[ToolCall], etas: List[float], wait_all: bool
+) -> tuple[List[tuple[ToolCall, float]], Dict[str, float]]:
+    """
+    (calls to run this step with their delay, deferred call ids with their ETA).
+    With `wait_all` (the LLM asked for nothing new, so there is nothing else to
+    do) every call is waited for.
+    """
+    max_wait = float("inf") if wait_all else state.max_schedule_wait
+    run: List[tuple[ToolCall, float]] = []
+    deferred: Dict[str, float] = {}
+    for tc, eta in zip(calls, etas):
+        if eta <= max_wait:
+            run.append((tc, eta))
+        else:
+            deferred[tc["id"]] = eta
+    if deferred:
+        logger.info("Deferring %d over-limit tool calls: %s", len(deferred), deferred)
+    return run, deferred
+
+
+def _tools_update(
+    state: AgentState,
+    new_calls: List[ToolCall],
+    pending: List[ToolCall],
+    outcomes: Dict[str, Any],
+    deferred: Dict[str, float],
+) -> Dict[str, Any]:
+    """Merge per-call outcomes, in tool_call order, into a state update."""
+    out_messages: List[BaseMessage] = []
+    new_metrics: List[Dict[str, Any]] = []
+    stored: Dict[str, Any] = {}
+
+    def _merge(outcome) -> bool:
+        _, metric, stop, to_store = outcome
+        stored.update(to_store)
+        if metric is not None:
+            new_metrics.append(metric)
+        return stop
+
+    stopped = False
+    for tc in new_calls:
+        if tc["id"] in deferred:
+            content = scheduled_reply(tc["name"], deferred[tc["id"]])
+            out_messages.append(ToolMessage(content=content, tool_call_id=tc["id"]))
+            continue
+        out_messages.append(outcomes[tc["id"]][0])
+        if _merge(outcomes[tc["id"]]):
+            stopped = True
+            break
+    # Results of calls deferred earlier answer a tool call that was already
+    # replied to, so they are delivered as a plain message.
+    for tc in pending:
+        if tc["id"] in outcomes and not stopped:
             out_messages.append(
-                ToolMessage(
-                    content=json.dumps(
-                        {"status": "error", "message": f"Tool failed with error: {exc}"}
-                    ),
-                    tool_call_id=call_id,
-                )
+                HumanMessage(content=delivered_content(tc, outcomes[tc["id"]][0].content))
             )
+            _merge(outcomes[tc["id"]])
 
     return {
         "messages": state.messages + out_messages,
         "metrics": state.metrics + new_metrics,
+        "data_store": {**state.data_store, **stored},
+        "scheduled": [
+            {"id": tc["id"], "name": tc["name"], "args": tc["args"]}
+            for tc in pending + new_calls
+            if tc["id"] in deferred
+        ],
     }
 
 
+def node_tools(state: AgentState) -> Dict[str, Any]:
+    new_calls, pending = _tools_step(state)
+    calls = new_calls + pending
+    etas = run_sync(call_etas(calls)) if calls else []
+    run, deferred = _split_by_eta(state, calls, etas, wait_all=not new_calls)
+
+    # Independent calls run concurrently; over-limit ones start when their
+    # provider's bucket should have refilled, ready ones first. The shared token
+    # buckets in src/providers/ratelimit.py still enforce the limits.
+    start = time.monotonic()
+    outcomes: Dict[str, Any] = {}
+    if run:
+        workers = max(1, min(state.max_parallel_tools, len(run)))
+        futures = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool") as pool:
+            for tc, eta in sorted(run, key=lambda item: item[1]):
+                # Waiting happens here rather than in a worker, so the calls
+                # already submitted keep every worker.
+                time.sleep(max(0.0, start + eta - time.monotonic()))
+                futures[tc["id"]] = pool.submit(_run_tool_call, tc, state)
+            outcomes = {call_id: future.result() for call_id, future in futures.items()}
+    return _tools_update(state, new_calls, pending, outcomes, deferred)
+
+
+async def anode_tools(state: AgentState) -> Dict[str, Any]:
+    new_calls, pending = _tools_step(state)
+    runs = _early_tool_runs(state)
+    try:
+        return await _arun_tools(state, new_calls, pending, runs)
+    finally:
+        # Calls started early that this step does not collect, e.g. after util_stop_now.
+        _discard_early_tool_runs()
+
+
+async def _arun_tools(
+    state: AgentState, new_calls: List[ToolCall], pending: List[ToolCall], runs: _EarlyToolRuns
+) -> Dict[str, Any]:
+    early = {tc["id"]: runs.tasks.pop(tc["id"]) for tc in new_calls if tc["id"] in runs.tasks}
+    # Early calls still running hold their provider's quota first.
+    ahead = [tc for tc in new_calls if tc["id"] in early and not early[tc["id"]].done()]
+    calls = [tc for tc in new_calls + pending if tc["id"] not in early]
+    etas = (await call_etas(ahead + calls))[len(ahead):]
+    run, deferred = _split_by_eta(state, calls, etas, wait_all=not new_calls)
+    semaphore = runs.semaphore
+
+    async def _scheduled(tc: ToolCall, eta: float):
+        # Waiting calls do not hold a slot, so ready calls run in between.
+        await asyncio.sleep(eta)
+        async with semaphore:
+            return tc["id"], await _arun_tool_call(tc, state)
+
+    async def _started(tc: ToolCall):
+        outcome = await early[tc["id"]]
+        if outcome is None:
+            # Its provider had no quota when the call was streamed, run it now.
+            async with semaphore:
+                outcome = await _arun_tool_call(tc, state)
+        return tc["id"], outcome
+
+    outcomes = dict(
+        await asyncio.gather(
+            *(_scheduled(tc, eta) for tc, eta in run),
+            *(_started(tc) for tc in new_calls if tc["id"] in early),
+        )
+    )
+    return _tools_update(state, new_calls, pending, outcomes, deferred)
+
+
 def decide_next(state: AgentState) -> str:
     if state.turn_count + 1 > state.max_turns:
         logger.info("Max turns reached, finalizing.")
@@ -335,6 +910,9 @@ def decide_next(state: AgentState) -> str:
 
     if isinstance(last_message, AIMessage) and last_message.tool_calls:
         return "continue"
+    if state.scheduled:
+        logger.info("No new tool calls, running %d scheduled calls.", len(state.scheduled))
+        return "continue"
 
     logger.info("No more tool calls, finalizing.")
     return "finalize"
@@ -357,20 +935,22 @@ class RiskFinalOutputWithMetrics(RiskFinalOutput):
     metrics: List[Dict]
 
 
-def node_finalize(state: AgentState) -> Dict[str, Any]:
-    metrics_blob = json.dumps({"data": state.metrics}, indent=2)
+def _finalize_prompt(state: AgentState) -> str:
+    blob: Dict[str, Any] = {"data": state.metrics}
+    if state.unavailable_metrics:
+        blob["unavailable_metrics"] = state.unavailable_metrics
+    if state.dataset and state.dataset.get("errors"):
+        blob["data_source_errors"] = state.dataset["errors"]
+    metrics_blob = json.dumps(blob, indent=2)
 
     template_prompt = Template(open(get_prompts_dir() + "/risk.md").read())
     prompt = template_prompt.substitute(metrics_blob=metrics_blob)
 
     logger.info(f"Finalizing, last prompt:\n{prompt}")
+    return prompt
 
-    client = instructor.from_provider(f"openai/{state.model_name}")
-    output: RiskFinalOutput = client.chat.completions.create(
-        response_model=RiskFinalOutput,
-        messages=[{"role": "user", "content": prompt}],
-    )
 
+def _finalize_update(state: AgentState, output: RiskFinalOutput) -> Dict[str, Any]:
     final_output = RiskFinalOutputWithMetrics(
         risk_score=output.risk_score,
         justification=output.justification,
@@ -382,6 +962,32 @@ def node_finalize(state: AgentState) -> Dict[str, Any]:
     }
 
 
+def node_finalize(state: AgentState) -> Dict[str, Any]:
+    prompt = _finalize_prompt(state)
+    client = instructor.from_provider(f"openai/{state.model_name}")
+    output: RiskFinalOutput = client.chat.completions.create(
+        response_model=RiskFinalOutput,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return _finalize_update(state, output)
+
+
+async def anode_finalize(state: AgentState) -> Dict[str, Any]:
+    # Tool calls of a last turn that is not executed may have been started early.
+    last = state.messages[-1] if state.messages else None
+    if isinstance(last, AIMessage):
+        _discard_early_tool_runs()
+    prompt = _finalize_prompt(state)
+    client = instructor.from_provider(
+        f"openai/{state.model_name}", async_client=True
+    )
+    output: RiskFinalOutput = await client.chat.completions.create(
+        response_model=RiskFinalOutput,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return _finalize_update(state, output)
+
+
 def build_graph(model: str, temperature: float, checkpointer):
     llm_core = ChatOpenAI(model=model, temperature=temperature, streaming=False)
     llm_with_tools = llm_core.bind_tools(TOOLS)
@@ -397,13 +1003,22 @@ def build_graph(model: str, temperature: float, checkpointer):
             "temperature": temperature,
         }
 
+    # Each node has a sync and a native async implementation: `app.stream` (CLI)
+    # runs the former, `app.astream` (server) the latter.
     graph.add_node("setup", setup_llm)
-    graph.add_node("agent", node_llm)
-    graph.add_node("action", node_tools)
-    graph.add_node("finalize", node_finalize)
+    graph.add_node("prefetch", RunnableLambda(node_prefetch, afunc=anode_prefetch))
+    graph.add_node("agent", RunnableLambda(node_llm, afunc=anode_llm))
+    graph.add_node("action", RunnableLambda(node_tools, afunc=anode_tools))
+    # Metric functions are pure and fast, the same implementation serves both
+    graph.add_node("metrics", node_metrics)
+    graph.add_node("finalize", RunnableLambda(node_finalize, afunc=anode_finalize))
 
     graph.set_entry_point("setup")
-    graph.add_edge("setup", "agent")
+    graph.add_edge("setup", "prefetch")
+    graph.add_conditional_edges(
+        "prefetch", after_prefetch, {"agent": "agent", "metrics": "metrics"}
+    )
+    graph.add_edge("metrics", "finalize")
 
     graph.add_conditional_edges(
         "agent",
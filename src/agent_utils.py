@@ -1,9 +1,9 @@
-from langchain_core.tools import tool
-import time
+from langchain_core.tools import InjectedToolArg, tool
 import datetime as dt
 from pydantic import BaseModel
-from typing import Annotated  
-from src.utils import str_to_float
+from typing import Annotated, Any, Dict, Optional
+from src.data_store import query_stored
+from src.utils import evaluate_expression, str_to_float
 
 class StopNow(BaseModel):
     pass
@@ -13,12 +13,6 @@ def util_stop_now() -> StopNow:
     """This will stop the program loop. To be used when no progress is being made towards the end goal"""
     return StopNow()
 
-@tool
-def util_wait_five_seconds():
-    """This will wait for 5 seconds and return. Use it (potentially multiple times) to wait for API rate limits to reset"""
-    time.sleep(5)
-    return
-
 @tool
 def util_math_multiply_numbers(a: str, b: str) -> str:
     """Multiply two floating point numbers in string format (like '3.14' and '2.0'). Return a floating point in string format"""
@@ -42,3 +36,35 @@ def util_math_divide_numbers(a: str, b: str) -> str:
 def util_math_subtract_numbers(a: str, b: str) -> str:
     """Subtract two floating point numbers in string format (like '3.14' and '2.0'). Return a floating point in string format"""
     return str(str_to_float(a) - str_to_float(b))
+
+
+@tool
+def util_math_evaluate(expressions: Dict[str, str]) -> Dict[str, str]:
+    """Evaluate many arithmetic expressions in one call. Keys are names, values are expressions; an expression can use the names of the ones before it.
+    Supports + - * / // % **, parentheses, sum(), mean(), min(), max(), abs(), round(x, digits) over numbers or lists, and units(raw, decimals) to scale raw token balances.
+    Write non-decimal numbers as quoted strings, e.g. units('0x1bc16d674ec80000', 18).
+    Example: {"eth": "units('0x1bc16d674ec80000', 18) * 2500.5", "total": "sum([eth, 1200, 33.3])", "eth_share": "eth / total"}.
+    Returns every result as a floating point in string format, or an error message for that entry."""
+    results: Dict[str, str] = {}
+    values: Dict[str, float] = {}
+    for name, expression in expressions.items():
+        try:
+            values[name] = evaluate_expression(str(expression), values)
+            results[name] = str(values[name])
+        except (ValueError, TypeError, OverflowError) as exc:
+            results[name] = f"Error: {exc}"
+    return results
+
+
+@tool
+def util_query_data(
+    handle: str,
+    path: str = "",
+    limit: int = 50,
+    data_store: Annotated[Optional[Dict[str, Any]], InjectedToolArg] = None,
+) -> Any:
+    """Read part of a large tool result that was stored under `handle` instead of being shown in full.
+    `path` selects what to return, e.g. `tokens[0]`, `result[*].symbol`, `pairs[?liquidity.usd>10000]{baseToken,priceUsd}`:
+    `.key`, `[n]`, `[a:b]`, `[*]` (all items), `[?field op value]` (filter, op is == != > >= < <= or ~ for contains), `{a,b}` (keep fields).
+    An empty path returns the whole result. At most `limit` list items or object keys are returned."""
+    return query_stored(data_store or {}, handle, path, limit)
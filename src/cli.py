@@ -7,6 +7,9 @@ from rich.json import JSON
 
 from src.agent import build_graph, AgentState
 from src.logging import configure_logging
+from src.providers.base import provider_stats
+from src.providers.cassette import use_cassette
+from src.utils import TOKEN_COUNTS
 from langgraph.checkpoint.sqlite import SqliteSaver
 from uuid import uuid4
 from langchain_core.runnables import RunnableConfig
@@ -28,6 +31,22 @@ console = Console()
 @click.option(
     "--max-messages", type=int, default=7, help="Max messages to keep in history."
 )
+@click.option(
+    "--max-parallel-tools",
+    type=int,
+    default=4,
+    help="Max tool calls from one LLM turn to run concurrently.",
+)
+@click.option(
+    "--prefetch/--no-prefetch",
+    default=True,
+    help="Gather portfolio, history and token data before the first LLM turn.",
+)
+@click.option(
+    "--fast",
+    is_flag=True,
+    help="Compute all metrics from the prefetched data and finalize, skipping the LLM loop.",
+)
 @click.option("--model", type=str, default="gpt-4o", help="OpenAI model to use.")
 @click.option(
     "--temperature", type=float, default=0.0, help="OpenAI model temperature."
@@ -37,6 +56,17 @@ console = Console()
     type=str,
     help="Resume from a checkpoint, e.g., 'thread_id:turn_number'.",
 )
+@click.option(
+    "--cassette-mode",
+    type=click.Choice(["record", "replay"]),
+    help="Record provider responses to a cassette, or replay them without network.",
+)
+@click.option(
+    "--cassette",
+    "cassette_path",
+    type=str,
+    help="Cassette file, default cassettes/<thread_id>.jsonl.gz.",
+)
 @click.option(
     "--log-format",
     type=click.Choice(["human", "json"]),
@@ -49,9 +79,14 @@ def main(
     quiet: bool,
     max_turns: int,
     max_messages: int,
+    max_parallel_tools: int,
+    prefetch: bool,
+    fast: bool,
     model: str,
     temperature: float,
     resume_from: str | None,
+    cassette_mode: str | None,
+    cassette_path: str | None,
     log_format: str,
 ):
     """DeFi Risk Agent CLI"""
@@ -118,10 +153,16 @@ def main(
                 turn_count=0,
                 max_turns=max_turns,
                 max_messages=max_messages,
+                max_parallel_tools=max_parallel_tools,
+                prefetch=prefetch,
+                fast_path=fast,
                 model_name=model,
                 temperature=temperature,
             )
 
+        if cassette_mode:
+            use_cassette(cassette_mode, cassette_path or f"cassettes/{thread_id}.jsonl.gz")
+
         app = build_graph(
             model=model, temperature=temperature, checkpointer=checkpointer
         )
@@ -188,6 +229,9 @@ def main(
             else:
                 console.print(summary_content)
 
+        logger.info("Provider stats: %s", provider_stats())
+        logger.info("Token count cache: %s", TOKEN_COUNTS.stats())
+
 
 if __name__ == "__main__":
     main()
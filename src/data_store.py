@@ -0,0 +1,214 @@
+"""Side-channel storage for large tool results.
+
+A raw provider payload can be tens of thousands of tokens, and once it is in a
+ToolMessage it is re-sent every turn until the message window slides past it,
+after which the agent has to fetch it again. Instead, results above a token
+threshold are kept in the thread's `AgentState.data_store` under a short
+handle, and the conversation only gets the handle and an outline of the
+result's shape. The LLM then reads what it needs with `util_query_data`.
+
+Path expressions, applied left to right:
+    key, .key          field of an object (or index of a list, `items.0`)
+    [n], [a:b]         list element, list slice (negative indices allowed)
+    [*]                every element of a list, or every value of an object
+    [?field op value]  elements matching a condition; `field` may be dotted,
+                       op is one of == != > >= < <= ~ (case-insensitive contains)
+    {a,b}              keep only these fields of each object
+
+After a slice, wildcard or filter the following steps apply to every element,
+e.g. `tokens[?value_usd>1000]{symbol,value_usd}`.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from src.utils import str_to_float
+
+# Object keys listed in a shape outline before the rest are elided.
+OUTLINE_MAX_KEYS = 20
+OUTLINE_MAX_STR = 40
+
+
+class PathError(ValueError):
+    """Raised for malformed paths and paths that match nothing."""
+
+
+def make_handle(tool_name: str, value: Any) -> str:
+    """Stable handle for `value`: identical results share a handle."""
+    digest = hashlib.blake2b(
+        json.dumps(value, sort_keys=True, default=str).encode(), digest_size=4
+    ).hexdigest()
+    return f"{tool_name}:{digest}"
+
+
+def outline(value: Any, depth: int = 3) -> Any:
+    """Compact description of the structure of `value`, with sample leaves."""
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"<object, {len(value)} keys>"
+        out = {k: outline(v, depth - 1) for k, v in list(value.items())[:OUTLINE_MAX_KEYS]}
+        if len(value) > OUTLINE_MAX_KEYS:
+            out["..."] = f"{len(value) - OUTLINE_MAX_KEYS} more keys"
+        return out
+    if isinstance(value, list):
+        if not value or depth <= 0:
+            return f"<list, {len(value)} items>"
+        return [f"<list, {len(value)} items, first:>", outline(value[0], depth - 1)]
+    if isinstance(value, str) and len(value) > OUTLINE_MAX_STR:
+        return value[:OUTLINE_MAX_STR] + "…"
+    return value
+
+
+_STEP = re.compile(
+    r"""
+    \[\*\]                                  (?P<all>)
+    | \[(?P<start>-?\d*):(?P<stop>-?\d*)\]
+    | \[(?P<index>-?\d+)\]
+    | \[\?(?P<filter>[^\]]+)\]
+    | \.?\{(?P<fields>[^}]*)\}
+    | \.?(?P<key>[^.\[\]{}]+)
+    """,
+    re.VERBOSE,
+)
+_CONDITION = re.compile(
+    r"^\s*(?P<field>[^=!<>~\s]+)\s*(?P<op>==|!=|>=|<=|>|<|~)\s*(?P<value>.*?)\s*$"
+)
+
+
+def parse_path(path: str) -> List[Tuple[str, Any]]:
+    steps: List[Tuple[str, Any]] = []
+    pos = 0
+    path = path.strip()
+    while pos < len(path):
+        m = _STEP.match(path, pos)
+        if m is None or m.end() == pos:
+            raise PathError(f"Cannot parse path {path!r} at position {pos}")
+        pos = m.end()
+        if m.group("all") is not None:
+            steps.append(("all", None))
+        elif m.group("index") is not None:
+            steps.append(("index", int(m.group("index"))))
+        elif m.group("filter") is not None:
+            cond = _CONDITION.match(m.group("filter"))
+            if cond is None:
+                raise PathError(f"Cannot parse condition {m.group('filter')!r}")
+            steps.append(("filter", (cond["field"], cond["op"], _literal(cond["value"]))))
+        elif m.group("fields") is not None:
+            fields = [f.strip() for f in m.group("fields").split(",")]
+            steps.append(("fields", [f for f in fields if f]))
+        elif m.group("key") is not None:
+            steps.append(("key", m.group("key")))
+        else:
+            start, stop = (int(g) if g else None for g in m.group("start", "stop"))
+            steps.append(("slice", slice(start, stop)))
+    return steps
+
+
+def _literal(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text.strip("'\"")
+
+
+def _is_index(key: str, items: List[Any]) -> bool:
+    return key.lstrip("-").isdigit() and -len(items) <= int(key) < len(items)
+
+
+def _get(value: Any, dotted: str) -> Any:
+    for key in dotted.split("."):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and _is_index(key, value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+def _matches(item: Any, field: str, op: str, expected: Any) -> bool:
+    actual = _get(item, field)
+    if actual is None:
+        return op == "!=" and expected is not None
+    if op == "~":
+        return str(expected).lower() in str(actual).lower()
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        try:
+            actual = str_to_float(str(actual))
+        except ValueError:
+            return False
+    elif isinstance(expected, str):
+        actual, expected = str(actual).lower(), expected.lower()
+    try:
+        return {
+            "==": actual == expected,
+            "!=": actual != expected,
+            ">": actual > expected,
+            ">=": actual >= expected,
+            "<": actual < expected,
+            "<=": actual <= expected,
+        }[op]
+    except TypeError:
+        return False
+
+
+def query(value: Any, path: str) -> Any:
+    """Evaluate `path` against `value` (see the module docstring for the syntax)."""
+    results = [value]
+    multi = False
+    for kind, arg in parse_path(path):
+        selected: List[Any] = []
+        for v in results:
+            if kind == "key":
+                if isinstance(v, dict) and arg in v:
+                    selected.append(v[arg])
+                elif isinstance(v, list) and _is_index(arg, v):
+                    selected.append(v[int(arg)])
+                elif not multi:
+                    keys = list(v)[:OUTLINE_MAX_KEYS] if isinstance(v, dict) else None
+                    raise PathError(f"Key {arg!r} not found" + (f", keys: {keys}" if keys else ""))
+            elif kind == "index":
+                if isinstance(v, list) and -len(v) <= arg < len(v):
+                    selected.append(v[arg])
+                elif not multi:
+                    raise PathError(f"Index {arg} out of range")
+            elif kind == "slice":
+                if isinstance(v, list):
+                    selected.extend(v[arg])
+            elif kind == "all":
+                if isinstance(v, list):
+                    selected.extend(v)
+                elif isinstance(v, dict):
+                    selected.extend(v.values())
+            elif kind == "filter":
+                if isinstance(v, dict):
+                    v = list(v.values())
+                if isinstance(v, list):
+                    selected.extend(x for x in v if _matches(x, *arg))
+            elif kind == "fields":
+                if isinstance(v, dict):
+                    selected.append({f: _get(v, f) for f in arg})
+                elif not multi:
+                    raise PathError("Field selection needs an object")
+        if kind in ("slice", "all", "filter"):
+            multi = True
+        results = selected
+    return results if multi else results[0]
+
+
+def query_stored(store: Dict[str, Any], handle: str, path: str = "", limit: int = 50) -> Any:
+    """`query` on a stored result, with list items and object keys capped at `limit`."""
+    if handle not in store:
+        raise PathError(f"Unknown handle {handle!r}, stored handles: {list(store)}")
+    result = query(store[handle], path)
+    if isinstance(result, list) and len(result) > limit:
+        return {"total": len(result), "returned": limit, "items": result[:limit]}
+    if isinstance(result, dict) and len(result) > limit:
+        return {
+            "total_keys": len(result),
+            "returned": limit,
+            "items": dict(list(result.items())[:limit]),
+        }
+    return result
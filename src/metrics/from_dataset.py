@@ -0,0 +1,222 @@
+"""Build the metric_* inputs directly from a prefetched wallet dataset.
+
+This is the LLM-free path: the dataset produced by
+`src.providers.wallet_dataset.gather_wallet_dataset` already holds normalised
+balances, prices, market cap ranks, DEX liquidity and a history summary, which
+is everything the metric functions need. Where a metric asks for data no
+provider returns directly, the closest available proxy is used and noted below;
+where there is no sound proxy, or a source the metric depends on failed (see the
+dataset's `errors`), `build_metric_input` raises `MetricUnavailable` instead of
+computing the metric from partial data.
+"""
+
+import datetime as dt
+import math
+from typing import Any, Callable, Dict, List, Tuple
+
+from pydantic import BaseModel
+
+from src.metrics.liquidity import (
+    ExoticAsset,
+    ExoticAssetExposureInput,
+    PortfolioConcentrationInput,
+)
+from src.metrics.protocol import LowTvlProtocolInput, ProtocolPosition
+from src.metrics.systemic import BridgedAsset, BridgedAssetExposureInput
+from src.metrics.user import PortfolioChurnRateInput, Transaction
+
+# Canonical bridged tokens on Ethereum mainnet.
+BRIDGED_SYMBOLS = {"WBTC", "RENBTC", "HBTC", "TBTC", "WBNB", "WAVAX", "WMATIC", "WSOL", "WTRX"}
+# Name fragments used by bridges for their wrapped assets.
+BRIDGED_NAME_MARKERS = (
+    "bridged",
+    "wormhole",
+    "(pos)",
+    "axelar",
+    "multichain",
+    "anyswap",
+    "portal",
+)
+# Churn is not computed when more of the outgoing transfers than this are unpriced.
+MAX_UNPRICED_OUTFLOW_SHARE = 0.2
+
+
+class MetricUnavailable(ValueError):
+    """The dataset cannot support a metric; the message says why."""
+
+
+def _holdings(dataset: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Priced, non-spam holdings."""
+    return [
+        t
+        for t in dataset.get("tokens") or []
+        if (t.get("value_usd") or 0) > 0 and not t.get("possible_spam")
+    ]
+
+
+def _tail_values(dataset: Dict[str, Any]) -> List[float]:
+    """
+    The non-spam holdings summarised under `other_tokens`, as equal shares of
+    their total value (their individual values are not kept).
+    """
+    other = dataset.get("other_tokens") or {}
+    count, value = other.get("count") or 0, other.get("value_usd") or 0.0
+    return [value / count] * count if value > 0 else []
+
+
+def _is_bridged(token: Dict[str, Any]) -> bool:
+    symbol = (token.get("symbol") or "").upper()
+    name = (token.get("name") or "").lower()
+    return (
+        symbol in BRIDGED_SYMBOLS
+        or symbol.endswith(".E")
+        or symbol.startswith("AXL")
+        or any(marker in name for marker in BRIDGED_NAME_MARKERS)
+    )
+
+
+def exotic_asset_exposure_input(dataset: Dict[str, Any]) -> ExoticAssetExposureInput:
+    return ExoticAssetExposureInput(
+        assets=[
+            ExoticAsset(
+                symbol=t.get("symbol") or "?",
+                usd_value=t["value_usd"],
+                # The chain's native token is always top-ranked.
+                market_cap_rank=(
+                    1 if t.get("token_address") is None else t.get("market_cap_rank")
+                ),
+            )
+            for t in _holdings(dataset)
+        ]
+    )
+
+
+def portfolio_concentration_input(dataset: Dict[str, Any]) -> PortfolioConcentrationInput:
+    """The `other_tokens` tail counts as equal holdings, which understates its concentration."""
+    return PortfolioConcentrationInput(
+        asset_values=[t["value_usd"] for t in _holdings(dataset)] + _tail_values(dataset)
+    )
+
+
+def low_tvl_protocol_input(dataset: Dict[str, Any]) -> LowTvlProtocolInput:
+    """
+    Only holdings the dataset marks as protocol positions (`protocol` and
+    `protocol_tvl_usd` keys) count. The portfolio providers report plain token
+    balances, and the liquidity of a token's DEX pool is not the TVL of a
+    protocol holding it, so without such rows the metric is unavailable.
+    """
+    positions = [
+        ProtocolPosition(
+            protocol_name=t["protocol"],
+            usd_value=t["value_usd"],
+            protocol_tvl_usd=t["protocol_tvl_usd"],
+        )
+        for t in _holdings(dataset)
+        if t.get("protocol") and t.get("protocol_tvl_usd") is not None
+    ]
+    if not positions:
+        raise MetricUnavailable("no protocol positions with a known TVL in the dataset")
+    return LowTvlProtocolInput(positions=positions)
+
+
+def _period_days(history: Dict[str, Any]) -> int:
+    """Days the history covers: the requested window, or, when the walk was cut
+    short by its transaction cap, the span of the transactions it fetched."""
+    days = history.get("days") or 30
+    first, last = history.get("first_timestamp"), history.get("last_timestamp")
+    if history.get("truncated") and first and last:
+        span = dt.datetime.fromisoformat(last) - dt.datetime.fromisoformat(first)
+        days = min(days, max(1, math.ceil(span.total_seconds() / 86400)))
+    return days
+
+
+def portfolio_churn_rate_input(dataset: Dict[str, Any]) -> PortfolioChurnRateInput:
+    """
+    Outflows come from the history summary, per token, valued at current prices:
+    those of the token rows, else the `flow_prices_usd` fetched for tokens the
+    wallet no longer holds. When more than MAX_UNPRICED_OUTFLOW_SHARE of the
+    outgoing transfers are of tokens with no price, churn would be understated
+    and the metric is unavailable. The start-of-period value is reconstructed
+    from the current value and the net flows over the period, which is the span
+    the history actually covers.
+    """
+    history = dataset.get("history") or {}
+    prices = {a.lower(): p for a, p in (dataset.get("flow_prices_usd") or {}).items()}
+    for t in dataset.get("tokens") or []:
+        if t.get("price_usd"):
+            prices[(t.get("token_address") or "native").lower()] = t["price_usd"]
+
+    outgoing_flows = history.get("outgoing_by_token") or {}
+    transfers = sum(flow.get("transfers") or 1 for flow in outgoing_flows.values())
+    unpriced = sum(
+        flow.get("transfers") or 1
+        for token, flow in outgoing_flows.items()
+        if (flow.get("amount") or 0.0) > 0 and token.lower() not in prices
+    )
+    if transfers and unpriced / transfers > MAX_UNPRICED_OUTFLOW_SHARE:
+        raise MetricUnavailable(
+            f"{unpriced} of {transfers} outgoing transfers are of tokens with no price"
+        )
+
+    def flows_usd(key: str) -> Dict[str, float]:
+        return {
+            token: (flow.get("amount") or 0.0) * prices.get(token.lower(), 0.0)
+            for token, flow in (history.get(key) or {}).items()
+        }
+
+    outgoing = flows_usd("outgoing_by_token")
+    incoming = flows_usd("incoming_by_token")
+    timestamp = history.get("last_timestamp") or dt.datetime.now(dt.timezone.utc).isoformat()
+    end_value = sum(t["value_usd"] for t in _holdings(dataset)) + sum(_tail_values(dataset))
+    start_value = max(0.0, end_value + sum(outgoing.values()) - sum(incoming.values()))
+    return PortfolioChurnRateInput(
+        outgoing_transactions=[
+            Transaction(timestamp=timestamp, usd_value=value)
+            for value in outgoing.values()
+            if value > 0
+        ],
+        start_period_value_usd=start_value,
+        end_period_value_usd=end_value,
+        period_days=_period_days(history),
+    )
+
+
+def bridged_asset_exposure_input(dataset: Dict[str, Any]) -> BridgedAssetExposureInput:
+    return BridgedAssetExposureInput(
+        assets=[
+            BridgedAsset(
+                symbol=t.get("symbol") or "?",
+                usd_value=t["value_usd"],
+                is_bridged=_is_bridged(t),
+            )
+            for t in _holdings(dataset)
+        ]
+    )
+
+
+# metric_* tool name -> builder of its `data` argument.
+METRIC_INPUT_BUILDERS: Dict[str, Callable[[Dict[str, Any]], BaseModel]] = {
+    "metric_calculate_exotic_asset_exposure": exotic_asset_exposure_input,
+    "metric_calculate_portfolio_concentration": portfolio_concentration_input,
+    "metric_calculate_low_tvl_protocol_concentration": low_tvl_protocol_input,
+    "metric_calculate_portfolio_churn_rate": portfolio_churn_rate_input,
+    "metric_calculate_bridged_asset_exposure": bridged_asset_exposure_input,
+}
+
+# metric_* tool name -> dataset sources (keys of its `errors`) the metric relies on.
+METRIC_SOURCES: Dict[str, Tuple[str, ...]] = {
+    "metric_calculate_exotic_asset_exposure": ("portfolio", "prices"),
+    "metric_calculate_portfolio_concentration": ("portfolio",),
+    "metric_calculate_low_tvl_protocol_concentration": ("portfolio",),
+    "metric_calculate_portfolio_churn_rate": ("portfolio", "history"),
+    "metric_calculate_bridged_asset_exposure": ("portfolio",),
+}
+
+
+def build_metric_input(name: str, dataset: Dict[str, Any]) -> BaseModel:
+    """`data` argument of metric tool `name`; MetricUnavailable if a source it needs failed."""
+    errors = dataset.get("errors") or {}
+    failed = [s for s in METRIC_SOURCES.get(name, ()) if s in errors]
+    if failed:
+        raise MetricUnavailable("; ".join(f"{s} data failed: {errors[s]}" for s in failed))
+    return METRIC_INPUT_BUILDERS[name](dataset)
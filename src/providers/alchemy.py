@@ -1,21 +1,51 @@
 # %%
 
+import asyncio
 import os
+import time
 import typing as t
-import requests
-from langchain_core.tools import tool
-from src.utils import rate_limit
+from src.providers.base import api_tool
+from src.providers.client import ProviderClient
+from src.providers.history_store import get_history_store
+from src.providers.projection import projected
+from src.providers.singleflight import coalesced
 from typing import Annotated  
 
 
 API = os.environ["ALCHEMY_API_KEY"]
 BASE = f"https://api.g.alchemy.com/data/v1/{API}"
+http = ProviderClient("alchemy", BASE, timeout=30, api_key=API)
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_alchemy_portfolio(address: str, network: str="eth-mainnet"):
+# Alchemy returns at most this many transactions per history request.
+HISTORY_PAGE_SIZE = 50
+# Upper bound on older pages backfilled by a single sync.
+MAX_BACKFILL_PAGES = 20
+# Upper bound on newer pages fetched by a single sync before it moves on to backfilling.
+MAX_FORWARD_PAGES = 20
+# A wallet synced this recently is served from the store without asking for new txs.
+SYNC_FRESH_SECONDS = 60
+
+# Fields of /assets/tokens/by-address the agent uses; logos and timestamps are dropped.
+PORTFOLIO_FIELDS = {
+    "data": {
+        "tokens": [
+            {
+                "network": True,
+                "tokenAddress": True,
+                "tokenBalance": True,
+                "tokenMetadata": {"symbol": True, "name": True, "decimals": True},
+                "tokenPrices": [{"currency": True, "value": True}],
+            }
+        ],
+        "pageKey": True,
+    }
+}
+
+@api_tool
+@projected(PORTFOLIO_FIELDS)
+async def api_alchemy_portfolio(address: str, network: str="eth-mainnet"):
     """Fetch portfolio of tokens for address"""
-    url = f"{BASE}/assets/tokens/by-address"
+    url = "/assets/tokens/by-address"
     body = {
         "addresses": [{"address": address, "networks": [network]}],
         "withMetadata": True,
@@ -87,7 +117,9 @@ def api_alchemy_portfolio(address: str, network: str="eth-mainnet"):
     #     "pageKey": null
     #   }
     # }
-    return requests.post(url, json=body, timeout=30).json()
+    r = await http.post(url, json=body)
+    r.raise_for_status()
+    return r.json()
     # tokens = requests.post(url, json=body, timeout=30).json()["data"]["tokens"]
     # clean = []
     # for t in tokens:
@@ -116,15 +148,120 @@ def api_alchemy_portfolio(address: str, network: str="eth-mainnet"):
 
     # return sorted(clean, key=lambda x: x["usd_value"], reverse=True)
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_alchemy_tx_history(address: str, network: str="eth-mainnet", limit:int=50, after: t.Optional[int]=None):
-    """Fetch one page of historical tx for the address; pass `after` to page forward."""
-    url = f"{BASE}/transactions/history/by-address"
+def _block_number(tx: dict) -> int:
+    value = tx.get("blockNumber") or 0
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+async def _tx_history_page(address: str, network: str, after: t.Optional[str] = None) -> dict:
+    url = "/transactions/history/by-address"
     payload = {
         "addresses": [{"address": address, "networks": [network]}],
-        "limit": limit,
+        "limit": HISTORY_PAGE_SIZE,
     }
     if after:  # cursor from previous response
         payload["after"] = after
-    return requests.post(url, json=payload, timeout=30).json()
+    r = await http.post(url, json=payload)
+    r.raise_for_status()
+    return r.json()
+
+
+@coalesced
+async def sync_alchemy_tx_history(address: str, network: str = "eth-mainnet", min_transactions: int = HISTORY_PAGE_SIZE) -> dict:
+    """
+    Bring the local transaction store for `address` up to date.
+
+    New transactions are fetched newest first until the walk reaches history that
+    is already stored (at most MAX_FORWARD_PAGES pages; a longer walk is resumed
+    from its saved forward cursor by the next sync). `newest_block` only advances
+    once the walk has met stored history, so an interrupted walk never leaves a
+    hole behind it. Then older history is backfilled from the saved cursor until
+    at least `min_transactions` are stored (or MAX_BACKFILL_PAGES pages).
+    Returns the sync state.
+    """
+    store = get_history_store()
+    state = await asyncio.to_thread(store.get_sync_state, address, network)
+
+    def rows(data: dict) -> t.List[dict]:
+        return [
+            {"hash": tx["hash"], "block_number": _block_number(tx), "payload": tx}
+            for tx in data.get("transactions") or []
+        ]
+
+    async def save(page: t.List[dict]) -> None:
+        await asyncio.to_thread(
+            store.save_transactions, address, network, page,
+            state["newest_block"], state["backfill_cursor"], state["complete"],
+            state["forward_cursor"], state["forward_block"],
+        )
+
+    if state is None:
+        state = {
+            "newest_block": None,
+            "backfill_cursor": None,
+            "complete": False,
+            "forward_cursor": None,
+            "forward_block": None,
+        }
+    elif time.time() - state["synced_at"] >= SYNC_FRESH_SECONDS:
+        known_block = state["newest_block"] or 0
+        resumed = state["forward_cursor"] is not None
+        cursor, top_block = state["forward_cursor"], state["forward_block"]
+        pages = 0
+        while pages < MAX_FORWARD_PAGES:
+            data = await _tx_history_page(address, network, cursor)
+            pages += 1
+            page = rows(data)
+            fresh = [r for r in page if r["block_number"] >= known_block]
+            top_block = max(top_block or known_block, *(r["block_number"] for r in fresh), 0)
+            cursor = data.get("after")
+            if len(fresh) < len(page) or not cursor:
+                state["newest_block"] = top_block
+                state["forward_cursor"] = state["forward_block"] = None
+            else:
+                state["forward_cursor"], state["forward_block"] = cursor, top_block
+            await save(fresh)
+            if state["forward_cursor"] is not None:
+                continue
+            if not resumed:
+                break
+            # The gap left by an earlier walk is closed; now fetch what is newer still.
+            resumed = False
+            known_block, cursor, top_block = state["newest_block"], None, None
+
+    pages = 0
+    while (
+        not state["complete"]
+        and pages < MAX_BACKFILL_PAGES
+        and await asyncio.to_thread(store.count_transactions, address, network) < min_transactions
+    ):
+        data = await _tx_history_page(address, network, state["backfill_cursor"])
+        pages += 1
+        page = rows(data)
+        if page:
+            state["newest_block"] = max(state["newest_block"] or 0, *(r["block_number"] for r in page))
+        state["backfill_cursor"] = data.get("after")
+        state["complete"] = not page or not state["backfill_cursor"]
+        await save(page)
+    return await asyncio.to_thread(store.get_sync_state, address, network) or state
+
+
+@api_tool
+async def api_alchemy_tx_history(address: str, network: str="eth-mainnet", limit:int=50, after: t.Optional[int]=None):
+    """
+    Fetch one page of historical tx for the address, newest first; pass the returned
+    `after` offset to page forward. Served from a local per-wallet store that only
+    fetches transactions newer than the last sync.
+    """
+    offset = after or 0
+    state = await sync_alchemy_tx_history(address, network, min_transactions=offset + limit)
+    store = get_history_store()
+    transactions = await asyncio.to_thread(store.get_transactions, address, network, limit, offset)
+    total = await asyncio.to_thread(store.count_transactions, address, network)
+    next_offset = offset + len(transactions)
+    return {
+        "transactions": transactions,
+        "totalCount": total,
+        "after": next_offset if next_offset < total or not state["complete"] else None,
+        "history_complete": state["complete"],
+    }
@@ -0,0 +1,53 @@
+import functools
+from typing import Annotated, Any, Awaitable, Callable, Dict
+
+from langchain_core.tools import StructuredTool
+
+from src.providers.cache import get_cache
+from src.providers.cassette import get_cassette
+from src.providers.circuit import circuit_stats
+from src.providers.client import run_sync
+from src.providers.hedge import HEDGE_STATS, LATENCY
+from src.providers.projection import PROJECTION_STATS
+from src.providers.ratelimit import RATE_LIMITER
+from src.providers.retry import RETRY_STATS
+from src.providers.singleflight import SINGLE_FLIGHT, coalesced
+
+
+def api_tool(coroutine: Callable[..., Awaitable[Any]]) -> StructuredTool:
+    """
+    Turn an async provider function into a LangChain tool.
+
+    The tool is natively async (`.ainvoke`, used by the server) and keeps a
+    blocking `.invoke` entry point for the CLI, which runs the coroutine on the
+    shared provider I/O loop. Identical concurrent calls are coalesced into a
+    single upstream request.
+    """
+    shared = coalesced(coroutine)
+
+    @functools.wraps(coroutine)
+    def func(*args, **kwargs):
+        return run_sync(shared(*args, **kwargs))
+
+    return StructuredTool.from_function(
+        func=func,
+        coroutine=shared,
+        name=coroutine.__name__,
+    )
+
+
+def provider_stats() -> Dict[str, Any]:
+    """Counters from the shared provider layer, for logging and the /stats endpoint."""
+    cache = get_cache()
+    cassette = get_cassette()
+    return {
+        "cache": cache.stats() if cache is not None else None,
+        "single_flight": SINGLE_FLIGHT.stats(),
+        "rate_limiter": RATE_LIMITER.stats(),
+        "projection": PROJECTION_STATS.stats(),
+        "latency": LATENCY.stats(),
+        "hedging": HEDGE_STATS.stats(),
+        "circuits": circuit_stats(),
+        "retries": RETRY_STATS.stats(),
+        "cassette": cassette.stats() if cassette is not None else None,
+    }
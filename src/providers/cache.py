@@ -0,0 +1,284 @@
+"""Persistent TTL cache for provider responses.
+
+Token-level data (prices, security flags, pair data...) does not depend on the
+wallet being analysed, so it is cached on disk in SQLite, keyed by tool name and
+normalised arguments. The cache survives restarts and is shared by the CLI and
+the server.
+
+Configuration (environment variables):
+    PROVIDER_CACHE_PATH      sqlite file, default `provider_cache.db`
+    PROVIDER_CACHE_MAX_MB    size cap before LRU eviction kicks in, default 64
+    PROVIDER_CACHE_COMPRESS  zlib-compress stored payloads, default 1
+    PROVIDER_CACHE_DISABLED  set to 1 to bypass the cache entirely (it is also
+                             bypassed while a provider cassette is active)
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("defi_agent")
+
+# Default time-to-live in seconds for each provider's responses.
+PROVIDER_TTLS: Dict[str, float] = {
+    "coingecko": 15 * 60,
+    "dexscreener": 5 * 60,
+    "ethplorer": 60 * 60,
+    "goplus": 24 * 60 * 60,
+}
+
+_ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        # Addresses are case-insensitive (EIP-55 checksums only change case).
+        return _ADDRESS_RE.sub(lambda m: m.group(0).lower(), value.strip())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """Stable cache key for a tool call."""
+    blob = json.dumps(
+        {"tool": tool_name, "args": _normalize(arguments)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed key/value store with per-entry TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        compress: bool = True,
+        compress_min_bytes: int = 512,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            # WAL lets the CLI and the server processes share the file.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    compressed INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+            )
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); expired entries count as a miss and are dropped."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, compressed, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            value, compressed, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return False, None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        if compressed:
+            value = zlib.decompress(value)
+        return True, json.loads(value)
+
+    def set(self, key: str, tool: str, value: Any, ttl: float) -> None:
+        raw = json.dumps(value).encode()
+        compressed = self.compress and len(raw) >= self.compress_min_bytes
+        if compressed:
+            raw = zlib.compress(raw)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, tool, raw, int(compressed), len(raw), now + ttl, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under the cap."""
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """Process-wide cache built from the environment, or None when disabled."""
+    from src.providers.cassette import get_cassette
+
+    global _cache
+    # Cassette runs must see (and record) every upstream request.
+    if os.getenv("PROVIDER_CACHE_DISABLED", "0") == "1" or get_cassette() is not None:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path=os.getenv("PROVIDER_CACHE_PATH", "provider_cache.db"),
+                max_bytes=int(float(os.getenv("PROVIDER_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                compress=os.getenv("PROVIDER_CACHE_COMPRESS", "1") == "1",
+            )
+        return _cache
+
+
+def _is_cacheable(value: Any) -> bool:
+    # Some providers (e.g. Ethplorer) report failures in a 200 body.
+    return not (isinstance(value, dict) and "error" in value)
+
+
+def cached(
+    provider: str,
+    ttl: Optional[float] = None,
+    cacheable: Callable[[Any], bool] = _is_cacheable,
+):
+    """
+    Decorator caching the result of an async provider function on disk.
+    `ttl` defaults to the provider's entry in PROVIDER_TTLS.
+    `cacheable` decides whether a result is stored, for providers that report
+    failures in a successful response.
+    Cache hits never reach the provider client, so they don't consume the API budget.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        entry_ttl = ttl if ttl is not None else PROVIDER_TTLS[provider]
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return await func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = make_key(func.__name__, bound.arguments)
+            hit, value = await asyncio.to_thread(cache.get, key)
+            if hit:
+                logger.debug("Cache hit for %s %s", func.__name__, bound.arguments)
+                return value
+            value = await func(*args, **kwargs)
+            if cacheable(value):
+                await asyncio.to_thread(cache.set, key, func.__name__, value, entry_ttl)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+async def cached_per_item(
+    provider: str,
+    namespace: str,
+    items: List[str],
+    fetch_many: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ttl: Optional[float] = None,
+    cacheable: Callable[[Any], bool] = _is_cacheable,
+) -> Dict[str, Any]:
+    """
+    Cache results of a bulk endpoint one item at a time.
+
+    Each item is looked up under `namespace`; only the misses are passed to
+    `fetch_many`, which must return a dict keyed by item. Items missing from
+    that dict, or rejected by `cacheable`, are not cached.
+    """
+    cache = get_cache()
+    if cache is None:
+        return await fetch_many(items)
+    entry_ttl = ttl if ttl is not None else PROVIDER_TTLS[provider]
+    keys = {item: make_key(namespace, {"item": item}) for item in items}
+    results: Dict[str, Any] = {}
+    missing: List[str] = []
+    for item, key in keys.items():
+        hit, value = await asyncio.to_thread(cache.get, key)
+        if hit:
+            results[item] = value
+        else:
+            missing.append(item)
+    if missing:
+        logger.debug("%s: %d cached, fetching %d", namespace, len(results), len(missing))
+        fetched = await fetch_many(missing)
+        for item, value in fetched.items():
+            if item in keys and cacheable(value):
+                await asyncio.to_thread(cache.set, keys[item], namespace, value, entry_ttl)
+        results.update(fetched)
+    return results
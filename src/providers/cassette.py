@@ -0,0 +1,164 @@
+"""Record/replay of provider HTTP traffic.
+
+In `record` mode every response returned by `ProviderClient.request` is
+appended to a gzip-compressed JSON-lines cassette. In `replay` mode requests
+are answered from the cassette without touching the network, the rate limiter
+or the circuit breakers: identical requests get their recorded responses back
+in the order they were recorded (the last one repeats), and a request that was
+never recorded raises `CassetteMiss`.
+
+While a cassette is active the persistent response cache is bypassed and wallet
+history is kept in memory, so that a recording contains every request of the
+run and a replay issues exactly the same ones.
+
+Requests are keyed by provider, method, path, query parameters and JSON body;
+base URLs and headers (which carry API keys) are never written to disk. Each
+entry also carries the time its recording started: providers that derive time
+windows from the clock use `reference_time()`, which returns that time while
+replaying, so a replay days later walks the same pages as the recording.
+
+Configuration (environment variables, or `use_cassette`):
+    PROVIDER_CASSETTE_MODE   `record` or `replay`; unset to go to the network
+    PROVIDER_CASSETTE_PATH   cassette file, default `cassette.jsonl.gz`
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from src.providers.cache import make_key
+
+logger = logging.getLogger("defi_agent")
+
+RECORD, REPLAY = "record", "replay"
+
+# Response headers worth keeping; the rest is noise in the cassette.
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request that is not in the cassette."""
+
+
+def request_key(provider: str, method: str, path: str, kwargs: Dict[str, Any]) -> str:
+    return make_key(
+        f"{provider}:{method.upper()}:{path}",
+        {"params": kwargs.get("params"), "json": kwargs.get("json")},
+    )
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        # Start of the recording; cassettes recorded before it was stored replay
+        # against the wall clock.
+        self.started_at: Optional[float] = time.time() if mode == RECORD else None
+        if mode == REPLAY:
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+                    if self.started_at is None:
+                        self.started_at = entry.get("started_at")
+            logger.info(
+                "Replaying %d provider responses from %s",
+                sum(map(len, self._entries.values())),
+                path,
+            )
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            logger.info("Recording provider responses to %s", path)
+
+    def record(
+        self, key: str, provider: str, method: str, path: str, response: httpx.Response
+    ) -> None:
+        entry = {
+            "key": key,
+            "provider": provider,
+            "request": f"{method.upper()} {path}",
+            "status": response.status_code,
+            "headers": {h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers},
+            "body": response.text,
+            "started_at": self.started_at,
+        }
+        with self._lock:
+            # Appending gzip members keeps the file valid if the run is killed.
+            with gzip.open(self.path, "at") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.recorded += 1
+
+    def replay(self, key: str, method: str, url: str) -> httpx.Response:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {method.upper()} {url}")
+            index = min(self._served[key], len(entries) - 1)
+            self._served[key] += 1
+            self.replayed += 1
+        entry = entries[index]
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=entry["body"].encode(),
+            request=httpx.Request(method, url),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_cassette: Optional[Cassette] = None
+_configured = False
+_cassette_lock = threading.Lock()
+
+
+def use_cassette(mode: Optional[str], path: Optional[str] = None) -> Optional[Cassette]:
+    """Activate a cassette for the rest of the process (`mode=None` turns it off)."""
+    global _cassette, _configured
+    with _cassette_lock:
+        _cassette = Cassette(path or "cassette.jsonl.gz", mode) if mode else None
+        _configured = True
+        return _cassette
+
+
+def reference_time() -> float:
+    """Current time, or the recording's start time while replaying a cassette."""
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == REPLAY and cassette.started_at is not None:
+        return cassette.started_at
+    return time.time()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The active cassette, configured from the environment on first use."""
+    global _cassette, _configured
+    with _cassette_lock:
+        if not _configured:
+            mode = os.getenv("PROVIDER_CASSETTE_MODE") or None
+            path = os.getenv("PROVIDER_CASSETTE_PATH", "cassette.jsonl.gz")
+            _cassette = Cassette(path, mode) if mode else None
+            _configured = True
+        return _cassette
@@ -0,0 +1,121 @@
+"""Per-provider circuit breakers.
+
+A provider that keeps failing (connection errors, timeouts, 5xx) is not called
+again for a cool-down period: requests fail immediately with
+`ProviderUnavailable`, without waiting for a timeout or a rate-limit token, so
+the agent can switch to another source in the same turn. After the cool-down a
+single probe request is let through; its outcome closes or re-opens the circuit.
+
+Configuration (environment variables):
+    CIRCUIT_FAILURE_THRESHOLD   consecutive failures that open a circuit, default 5
+    CIRCUIT_COOLDOWN_SECONDS    time an open circuit rejects calls, default 30
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger("defi_agent")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def before_request(self) -> None:
+        """Let the request through or raise ProviderUnavailable."""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            remaining = self.cooldown_seconds - (time.monotonic() - self._opened_at)
+            if remaining <= 0 and not self._probing:
+                self._state = HALF_OPEN
+                self._probing = True
+                logger.info("%s circuit half-open, probing", self.name)
+                return
+            self.rejected += 1
+        raise ProviderUnavailable(
+            f"{self.name} is unavailable after repeated failures; "
+            f"retry in {max(remaining, 1):.0f}s or use another provider"
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("%s circuit closed", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                    logger.warning(
+                        "%s circuit open after %d failure(s)", self.name, self._failures
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """The probe ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+                cooldown_seconds=float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30")),
+            )
+        return _breakers[provider]
+
+
+def circuit_stats() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
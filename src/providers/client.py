@@ -0,0 +1,274 @@
+"""Shared HTTP client layer for every `api_*` provider.
+
+All providers go through one pooled `httpx.AsyncClient` per event loop, so
+TCP/TLS connections are kept alive and reused per host instead of being
+re-negotiated on every tool call. HTTP/2 is used when the optional `h2` package
+is installed.
+
+Provider functions are natively async. Synchronous callers (the CLI, tests)
+go through `run_sync`, which executes the coroutine on a single background
+event loop so that they still share one connection pool.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+import httpx
+
+from src.providers.cassette import RECORD, get_cassette, request_key
+from src.providers.circuit import get_breaker
+from src.providers.ratelimit import RATE_LIMITER, bucket_key, limit_for
+from src.providers.retry import RETRY_STATS, RETRY_STATUSES, RetryPolicy, retry_after_seconds
+
+logger = logging.getLogger("defi_agent")
+
+T = TypeVar("T")
+
+# Applied to every provider call unless the provider overrides it, so that a
+# stuck upstream can never hang a whole job.
+DEFAULT_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "defi-risk-agent/0.1",
+}
+
+# httpx.AsyncClient is bound to the loop it was first used on, so keep one per loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+# Background loop used to serve synchronous callers.
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            http2 = _http2_available()
+            logger.debug("Creating shared HTTP client (http2=%s)", http2)
+            client = httpx.AsyncClient(
+                http2=http2,
+                timeout=DEFAULT_TIMEOUT,
+                limits=DEFAULT_LIMITS,
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+            )
+            _clients[loop] = client
+        return client
+
+
+async def aclose_http_client() -> None:
+    """Close the pooled client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_sync_loop.run_forever, name="provider-io", daemon=True
+            ).start()
+        return _sync_loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a provider coroutine from synchronous code and return its result."""
+    loop = _get_sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync() called from the provider I/O loop itself")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+@atexit.register
+def _shutdown_sync_loop() -> None:
+    global _sync_loop
+    loop = _sync_loop
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(aclose_http_client(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+    _sync_loop = None
+
+
+# Every ProviderClient by provider name, e.g. for scheduling calls by rate limit.
+PROVIDER_CLIENTS: Dict[str, "ProviderClient"] = {}
+
+
+def base_url_for(name: str, default: str) -> str:
+    """
+    Base URL of provider `name`: `<NAME>_BASE_URL` if set, else
+    `PROVIDER_BASE_URL/<name>` (e.g. the local mock server), else `default`.
+    """
+    override = os.getenv(f"{name.upper()}_BASE_URL")
+    if override:
+        return override
+    shared = os.getenv("PROVIDER_BASE_URL")
+    if shared:
+        return f"{shared.rstrip('/')}/{name}"
+    return default
+
+
+class ProviderClient:
+    """
+    Per-provider view over the shared client: base URL (overridable, see
+    `base_url_for`), headers, timeout and rate limit. Every request takes a token from the provider's bucket, keyed by
+    `api_key` so that different keys get independent quotas, and goes through
+    the provider's circuit breaker: transport errors and 5xx responses count as
+    failures. Transient failures are retried according to `retry` (see
+    `src.providers.retry`); once retries are exhausted the last response is
+    returned, or the last transport error raised. With an active cassette
+    (see `src.providers.cassette`) responses are recorded or replayed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        api_key: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        self.name = name
+        self.retry = retry or RetryPolicy.from_env()
+        self.rate_key = bucket_key(name, api_key)
+        self.rate_limit = limit_for(name, api_key)
+        self.breaker = get_breaker(name)
+        self.base_url = base_url_for(name, base_url).rstrip("/")
+        self.headers = headers or {}
+        self.timeout = (
+            httpx.Timeout(timeout, connect=5.0)
+            if timeout is not None
+            else DEFAULT_TIMEOUT
+        )
+        PROVIDER_CLIENTS[name] = self
+
+    async def eta(self, queued: int = 0) -> float:
+        """Seconds until a request could start with `queued` requests ahead of it."""
+        tokens = await RATE_LIMITER.available(self.rate_key, self.rate_limit)
+        return max(0.0, queued + 1 - tokens) / self.rate_limit.refill_per_second
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        headers = {**self.headers, **(kwargs.pop("headers", None) or {})}
+        kwargs.setdefault("timeout", self.timeout)
+        cassette = get_cassette()
+        if cassette is None:
+            return await self._request(method, path, headers, kwargs)
+        key = request_key(self.name, method, path, kwargs)
+        if cassette.mode != RECORD:
+            return cassette.replay(key, method, self.url(path))
+        response = await self._request(method, path, headers, kwargs)
+        await asyncio.to_thread(cassette.record, key, self.name, method, path, response)
+        return response
+
+    async def _request(
+        self, method: str, path: str, headers: Dict[str, str], kwargs: Dict[str, Any]
+    ) -> httpx.Response:
+        deadline = time.monotonic() + self.retry.deadline_seconds
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self._send(method, path, headers, kwargs)
+            except httpx.TransportError as exc:
+                delay = self.retry.backoff(attempt)
+                if not self._may_retry(attempt, delay, deadline):
+                    raise
+                logger.info(
+                    "%s %s failed (%s), retry %d in %.2fs", self.name, path, exc, attempt, delay
+                )
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                hint = retry_after_seconds(response)
+                delay = hint if hint is not None else self.retry.backoff(attempt)
+                if not self._may_retry(attempt, delay, deadline):
+                    return response
+                logger.info(
+                    "%s %s returned %d, retry %d in %.2fs",
+                    self.name, path, response.status_code, attempt, delay,
+                )
+                if hint is not None:
+                    # The limiter does the waiting, for every caller of this provider.
+                    RETRY_STATS.record(self.name, retry_after_honoured=1)
+                    await RATE_LIMITER.block(self.rate_key, self.rate_limit, hint)
+                    continue
+            RETRY_STATS.record(self.name, backoff_seconds=delay)
+            await asyncio.sleep(delay)
+
+    def _may_retry(self, attempt: int, delay: float, deadline: float) -> bool:
+        if attempt < self.retry.max_attempts and time.monotonic() + delay < deadline:
+            RETRY_STATS.record(self.name, retries=1)
+            return True
+        RETRY_STATS.record(self.name, gave_up=1)
+        return False
+
+    async def _send(
+        self, method: str, path: str, headers: Dict[str, str], kwargs: Dict[str, Any]
+    ) -> httpx.Response:
+        """One attempt: circuit breaker, rate-limit token, HTTP request."""
+        self.breaker.before_request()
+        try:
+            await RATE_LIMITER.acquire(self.rate_key, self.rate_limit)
+            response = await get_http_client().request(
+                method, self.url(path), headers=headers, **kwargs
+            )
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
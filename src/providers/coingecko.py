@@ -2,16 +2,24 @@ import datetime as dt
 
 # import decimal
 
+import asyncio
+from typing import Annotated, Dict, List
+
 from httpx import HTTPError
-import requests
-from langchain_core.tools import tool
-from src.utils import rate_limit
-from typing import Annotated
+from src.providers.base import api_tool
+from src.providers.cache import cached, cached_per_item
+from src.providers.client import ProviderClient
+from src.providers.singleflight import coalesced
+
+http = ProviderClient("coingecko", "https://api.coingecko.com/api/v3", timeout=20)
 
+# /coins/markets returns at most this many coins per page.
+MAX_IDS_PER_REQUEST = 250
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_coingecko_contract(address: str, chain: str = "ethereum"):
+
+@api_tool
+@cached("coingecko")
+async def api_coingecko_contract(address: str, chain: str = "ethereum"):
     """Fetch available data on contract"""
     # https://docs.coingecko.com/reference/coins-contract-address:
     # {
@@ -114,14 +122,14 @@ def api_coingecko_contract(address: str, chain: str = "ethereum"):
     # ]
     # }
 
-    url = f"https://api.coingecko.com/api/v3/coins/{chain}/contract/{address}"
+    url = f"/coins/{chain}/contract/{address}"
     params = {
         "localization": "false",
         "tickers": "false",
         "community_data": "false",
         "developer_data": "false",
     }
-    r = requests.get(url, params=params, timeout=20)
+    r = await http.get(url, params=params)
     # return r.json()
     # r.raise_for_status()
     data = r.json()
@@ -139,9 +147,8 @@ def api_coingecko_contract(address: str, chain: str = "ethereum"):
     }
 
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_coingecko_coin_data(coin_id):
+@api_tool
+async def api_coingecko_coin_data(coin_id):
     """Fetch available data for coin."""
     # https://docs.coingecko.com/reference/coins-id.
     #  Example response (curated):
@@ -274,7 +281,7 @@ def api_coingecko_coin_data(coin_id):
     #     }
     # ]
     # }
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
+    url = f"/coins/{coin_id}"
     params = {
         "localization": "false",
         "tickers": "false",
@@ -282,7 +289,7 @@ def api_coingecko_coin_data(coin_id):
         "developer_data": "false",
         "sparkline": "false",
     }
-    r = requests.get(url, params=params, timeout=20)
+    r = await http.get(url, params=params)
     r.raise_for_status()
     data = r.json()
 
@@ -301,3 +308,78 @@ def api_coingecko_coin_data(coin_id):
             dt.date.fromisoformat(data["genesis_date"]), dt.datetime.min.time()
         ).isoformat(),
     }
+
+
+@coalesced
+@cached("coingecko", ttl=24 * 60 * 60)
+async def _contract_to_coin_id(chain: str) -> Dict[str, str]:
+    """Map every contract address listed on CoinGecko for `chain` to its coin id."""
+    r = await http.get("/coins/list", params={"include_platform": "true"})
+    r.raise_for_status()
+    index = {}
+    for coin in r.json():
+        address = (coin.get("platforms") or {}).get(chain)
+        if address:
+            index[address.lower()] = coin["id"]
+    return index
+
+
+async def _markets(coin_ids: List[str]) -> List[dict]:
+    r = await http.get(
+        "/coins/markets",
+        params={
+            "vs_currency": "usd",
+            "ids": ",".join(coin_ids),
+            "per_page": MAX_IDS_PER_REQUEST,
+            "sparkline": "false",
+        },
+    )
+    r.raise_for_status()
+    return r.json()
+
+
+@api_tool
+async def api_coingecko_token_prices(token_addresses: List[str], chain: str = "ethereum"):
+    """
+    Price a whole list of token contract addresses in one go (e.g. a full portfolio).
+    Returns, per lowercase address: symbol, current_price_usd, market_cap_usd and
+    market_cap_rank (None if unranked), plus the addresses CoinGecko does not list.
+    Prefer this over calling api_coingecko_contract once per token.
+    """
+    addresses = list(dict.fromkeys(a.strip().lower() for a in token_addresses if a.strip()))
+
+    async def fetch_many(missing: List[str]) -> Dict[str, dict]:
+        index = await _contract_to_coin_id(chain)
+        # Several addresses can resolve to the same coin (e.g. a migrated contract).
+        ids: Dict[str, List[str]] = {}
+        for a in missing:
+            if a in index:
+                ids.setdefault(index[a], []).append(a)
+        if not ids:
+            return {}
+        id_list = list(ids)
+        pages = await asyncio.gather(
+            *(
+                _markets(id_list[i : i + MAX_IDS_PER_REQUEST])
+                for i in range(0, len(id_list), MAX_IDS_PER_REQUEST)
+            )
+        )
+        prices = {}
+        for page in pages:
+            for coin in page:
+                for address in ids.get(coin["id"], []):
+                    prices[address] = {
+                        "symbol": coin.get("symbol"),
+                        "current_price_usd": coin.get("current_price"),
+                        "market_cap_usd": coin.get("market_cap"),
+                        "market_cap_rank": coin.get("market_cap_rank"),
+                    }
+        return prices
+
+    prices = await cached_per_item(
+        "coingecko", f"coingecko_token_price:{chain}", addresses, fetch_many
+    )
+    return {
+        "tokens": {a: prices[a] for a in addresses if a in prices},
+        "not_found": [a for a in addresses if a not in prices],
+    }
@@ -1,21 +1,103 @@
-import requests
-from langchain_core.tools import tool
-from src.utils import rate_limit
-from typing import Annotated   
-
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_dexscreener_token_data(token_addresses: str, network: str = 'ethereum'):
+import asyncio
+from typing import Annotated, Dict, List
+
+from src.providers.base import api_tool
+from src.providers.cache import cached, cached_per_item
+from src.providers.client import ProviderClient
+from src.providers.projection import projected
+
+http = ProviderClient("dexscreener", "https://api.dexscreener.com", timeout=15)
+
+# The /tokens/v1 endpoint accepts at most this many comma-separated addresses.
+MAX_ADDRESSES_PER_REQUEST = 30
+
+# Pair fields the agent uses; links, images, socials and short-window stats are dropped.
+PAIR_FIELDS = [
+    {
+        "chainId": True,
+        "dexId": True,
+        "pairAddress": True,
+        "labels": True,
+        "baseToken": True,
+        "quoteToken": True,
+        "priceNative": True,
+        "priceUsd": True,
+        "txns": {"h24": True},
+        "volume": {"h24": True},
+        "priceChange": {"h24": True},
+        "liquidity": True,
+        "fdv": True,
+        "marketCap": True,
+        "pairCreatedAt": True,
+    }
+]
+
+
+def _split_addresses(token_addresses) -> List[str]:
+    """Normalise a comma-separated string or list of addresses, dropping duplicates."""
+    if isinstance(token_addresses, str):
+        token_addresses = token_addresses.split(",")
+    seen = {}
+    for address in token_addresses:
+        address = address.strip().lower()
+        if address:
+            seen.setdefault(address, None)
+    return list(seen)
+
+
+def _pair_key(pair: dict):
+    """Identity of a pair for de-duplication; pairs without an address fall back to
+    (chain, dex, base token, quote token) so they are not collapsed into one."""
+    address = pair.get("pairAddress")
+    if address:
+        return address.lower()
+    return (
+        pair.get("chainId"),
+        pair.get("dexId"),
+        (pair.get("baseToken") or {}).get("address", "").lower(),
+        (pair.get("quoteToken") or {}).get("address", "").lower(),
+    )
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+@projected(PAIR_FIELDS, name="dexscreener_pairs")
+async def _fetch_pairs(addresses: List[str], network: str) -> List[dict]:
+    """Pairs for up to MAX_ADDRESSES_PER_REQUEST tokens in one request."""
+    url = f"/tokens/v1/{network}/{','.join(addresses)}"
+    response = await http.get(url, headers={"Accept": "*/*"})
+    response.raise_for_status()
+    return response.json()
+
+
+async def _fetch_pairs_chunked(addresses: List[str], network: str) -> List[List[dict]]:
+    # Chunks are fetched concurrently; the provider's token bucket paces them.
+    return await asyncio.gather(
+        *(
+            _fetch_pairs(chunk, network)
+            for chunk in _chunks(addresses, MAX_ADDRESSES_PER_REQUEST)
+        )
+    )
+
+
+@api_tool
+@cached("dexscreener")
+async def api_dexscreener_token_data(token_addresses: str, network: str = 'ethereum'):
     """
     Fetches token information from DexScreener API.
     `network`: e.g., 'ethereum', 'bsc'
     `token_addresses`: comma-separated token addresses
     """
-    url = f"https://api.dexscreener.com/tokens/v1/{network}/{token_addresses}"
-    
-    response = requests.get(url, headers={"Accept": "*/*"}, timeout=15)
-    response.raise_for_status()
-    data =  response.json()
+    addresses = _split_addresses(token_addresses)
+    data = []
+    seen_pairs = set()
+    for pairs in await _fetch_pairs_chunked(addresses, network):
+        for pair in pairs:
+            if _pair_key(pair) not in seen_pairs:
+                seen_pairs.add(_pair_key(pair))
+                data.append(pair)
     # [{'chainId': 'ethereum',
     #   'dexId': 'uniswap',
     #   'url': 'https://dexscreener.com/ethereum/0x0890f93a1fd344b3437ec10c1c14d1a581142c5f',
@@ -42,3 +124,31 @@ def api_dexscreener_token_data(token_addresses: str, network: str = 'ethereum'):
     # }
     return data
 
+
+@api_tool
+async def api_dexscreener_tokens_batch(
+    token_addresses: List[str], network: str = "ethereum"
+) -> Dict[str, List[dict]]:
+    """
+    Fetches DexScreener pairs for any number of tokens at once (e.g. a whole portfolio).
+    `token_addresses`: list of token contract addresses
+    `network`: e.g., 'ethereum', 'bsc'
+    Returns a dict mapping each lowercase token address to its pairs (empty if none).
+    Prefer this over calling api_dexscreener_token_data once per token.
+    """
+    addresses = _split_addresses(token_addresses)
+
+    async def fetch_many(missing: List[str]) -> Dict[str, List[dict]]:
+        wanted = set(missing)
+        by_token: Dict[str, Dict[object, dict]] = {address: {} for address in missing}
+        for pairs in await _fetch_pairs_chunked(missing, network):
+            for pair in pairs:
+                for side in ("baseToken", "quoteToken"):
+                    address = (pair.get(side) or {}).get("address", "").lower()
+                    if address in wanted:
+                        by_token[address].setdefault(_pair_key(pair), pair)
+        return {address: list(pairs.values()) for address, pairs in by_token.items()}
+
+    return await cached_per_item(
+        "dexscreener", f"dexscreener_pairs:{network}", addresses, fetch_many
+    )
@@ -1,17 +1,47 @@
-import requests
 import datetime as dt
-from langchain_core.tools import tool
-from src.utils import rate_limit
+from src.providers.base import api_tool
+from src.providers.cache import cached
+from src.providers.client import ProviderClient
+from src.providers.projection import projected
 from typing import Annotated   
 
+API_KEY = "freekey"
+http = ProviderClient("ethplorer", "https://api.ethplorer.io", timeout=20, api_key=API_KEY)
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_ethplorer_token_data(address: str):
+# Fields of /getTokenInfo the agent uses; images and volume diffs are dropped.
+TOKEN_INFO_FIELDS = {
+    "address": True,
+    "name": True,
+    "symbol": True,
+    "decimals": True,
+    "owner": True,
+    "totalSupply": True,
+    "holdersCount": True,
+    "transfersCount": True,
+    "txsCount": True,
+    "contractInfo": {"creatorAddress": True, "creationTimestamp": True},
+    "price": {
+        "rate": True,
+        "diff": True,
+        "diff7d": True,
+        "diff30d": True,
+        "marketCapUsd": True,
+        "availableSupply": True,
+        "volume24h": True,
+    },
+}
+
+
+@api_tool
+@cached("ethplorer")
+@projected(TOKEN_INFO_FIELDS)
+async def api_ethplorer_token_data(address: str):
     """Fetch token data for the contract address"""
-    out = requests.get(
-        f"https://api.ethplorer.io/getTokenInfo/{address}?apiKey=freekey"
-    ).json()
+    r = await http.get(f"/getTokenInfo/{address}", params={"apiKey": API_KEY})
+    # Client errors come with an explanatory {"error": ...} body, kept for the agent.
+    if r.status_code == 429 or r.status_code >= 500:
+        r.raise_for_status()
+    out = r.json()
     return out
     # {
     #   "address": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",
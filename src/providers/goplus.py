@@ -1,31 +1,120 @@
 
-import requests
-from langchain_core.tools import tool
-from src.utils import rate_limit
-from typing import Annotated  
-
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_goplus_token_security(address: str, chain_id: int = 1):
+import asyncio
+from typing import Annotated, Any, Dict, List, Optional
+
+from src.providers.base import api_tool
+from src.providers.cache import cached_per_item
+from src.providers.client import ProviderClient
+
+http = ProviderClient("goplus", "https://api.gopluslabs.io/api/v1", timeout=15)
+
+# Addresses sent per token_security request in bulk scans.
+MAX_ADDRESSES_PER_REQUEST = 20
+
+# GoPlus "0"/"1" flags kept in the compact bulk-scan table.
+SECURITY_FLAGS = [
+    "is_honeypot",
+    "is_mintable",
+    "owner_change_balance",
+    "can_take_back_ownership",
+    "hidden_owner",
+    "is_proxy",
+    "transfer_pausable",
+    "is_blacklisted",
+    "cannot_sell_all",
+]
+# GoPlus flags for which "1" is the safe value, inverted so that True always flags a risk.
+INVERTED_FLAGS = {
+    "is_open_source": "is_closed_source",
+    "is_in_dex": "not_in_dex",
+}
+
+@api_tool
+async def api_goplus_token_security(address: str, chain_id: int = 1):
     """
     Fetches token security data from GoPlus API.
     `address`: the contract address to get security info about.
     `chain_id`: 1 for Ethereum, 56 for BSC, etc.
     """
-    url = f"https://api.gopluslabs.io/api/v1/token_security/{chain_id}"
-    params = {"contract_addresses": address.lower()}
-    
-    response = requests.get(url, params=params, timeout=15)
+    address = address.strip().lower()
+    infos = await _token_security([address], chain_id)
+    if address not in infos:
+        return {"result": {}, "not_found": [address]}
+    return {"result": {address: infos[address]}}
+
+
+def _flag(value: Any) -> Optional[bool]:
+    if value in (None, ""):
+        return None
+    return str(value) == "1"
+
+
+def _tax(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _security_row(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact view of one GoPlus token_security entry."""
+    row: Dict[str, Any] = {"symbol": info.get("token_symbol")}
+    for flag in SECURITY_FLAGS:
+        row[flag] = _flag(info.get(flag))
+    for flag, inverted in INVERTED_FLAGS.items():
+        value = _flag(info.get(flag))
+        row[inverted] = None if value is None else not value
+    row["buy_tax"] = _tax(info.get("buy_tax"))
+    row["sell_tax"] = _tax(info.get("sell_tax"))
+    return row
+
+
+async def _fetch_security(addresses: List[str], chain_id: int) -> Dict[str, Any]:
+    response = await http.get(
+        f"/token_security/{chain_id}",
+        params={"contract_addresses": ",".join(addresses)},
+    )
     response.raise_for_status()
-    data = response.json()
-    return data
-    
-    # # The result is a dictionary keyed by the lowercase address.
-    # token_info = data.get("result", {}).get(address.lower())
-    # if not token_info:
-    #     return {}
-    
-    # # Extract all security flags (e.g., is_open_source, is_honeypot).
-    # flags = {k: v for k, v in token_info.items() if k.startswith("is_")}
-    # return flags
+    return {k.lower(): v for k, v in (response.json().get("result") or {}).items()}
+
+
+async def _token_security(addresses: List[str], chain_id: int) -> Dict[str, Any]:
+    """Raw GoPlus entries for `addresses`, cached per token.
+
+    Single-token and bulk lookups share these entries, so scanning a portfolio
+    warms the cache for later single-token calls and vice versa. Tokens GoPlus
+    doesn't know are absent from the result and are not cached.
+    """
+
+    async def fetch_many(missing: List[str]) -> Dict[str, Any]:
+        chunks = [
+            missing[i : i + MAX_ADDRESSES_PER_REQUEST]
+            for i in range(0, len(missing), MAX_ADDRESSES_PER_REQUEST)
+        ]
+        results: Dict[str, Any] = {}
+        for part in await asyncio.gather(*(_fetch_security(c, chain_id) for c in chunks)):
+            results.update(part)
+        return results
 
+    return await cached_per_item(
+        "goplus", f"goplus_token_security:{chain_id}", addresses, fetch_many
+    )
+
+
+@api_tool
+async def api_goplus_tokens_security_scan(token_addresses: List[str], chain_id: int = 1):
+    """
+    Scans many tokens at once (e.g. a whole portfolio) with GoPlus and returns a compact
+    per-token table of security flags (honeypot, mintable, owner can change balances,
+    hidden owner, proxy, closed source, not traded on a DEX, taxes...). True means the
+    risk flag is raised, None that GoPlus did not report it.
+    `token_addresses`: list of contract addresses.
+    `chain_id`: 1 for Ethereum, 56 for BSC, etc.
+    Prefer this over calling api_goplus_token_security once per token.
+    """
+    addresses = list(dict.fromkeys(a.strip().lower() for a in token_addresses if a.strip()))
+    infos = await _token_security(addresses, chain_id)
+    return {
+        "tokens": {a: _security_row(infos[a]) for a in addresses if a in infos},
+        "not_found": [a for a in addresses if a not in infos],
+    }
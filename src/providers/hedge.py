@@ -0,0 +1,145 @@
+"""Latency tracking and hedged requests across redundant providers.
+
+When two providers can answer the same question, the primary is started first
+and the secondary only if the primary has not answered within the primary's
+recent latency percentile. Whichever succeeds first wins and the other call is
+cancelled. Tail latency drops at the cost of a few duplicate upstream calls.
+
+Configuration (environment variables):
+    HEDGE_PERCENTILE      latency percentile after which to hedge, default 90
+    HEDGE_DEFAULT_DELAY   hedge delay in seconds until enough samples exist, default 2
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger("defi_agent")
+
+# Percentiles need this many samples before they replace the default delay.
+MIN_SAMPLES = 5
+
+
+def _pick(samples, pct: float) -> float:
+    """Nearest-rank percentile of sorted `samples`."""
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+class LatencyTracker:
+    """Sliding window of call latencies per provider."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, provider: str, pct: float) -> Optional[float]:
+        """Latency below which `pct` percent of recent calls finished, None if too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return _pick(samples, pct)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            providers = {p: sorted(s) for p, s in self._samples.items()}
+        return {
+            provider: {
+                "samples": len(samples),
+                "p50": _pick(samples, 50),
+                "p90": _pick(samples, 90),
+                "p99": _pick(samples, 99),
+            }
+            for provider, samples in providers.items()
+        }
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.wins: Dict[str, int] = {}
+
+    def record(self, hedged: bool, winner: str) -> None:
+        with self._lock:
+            self.calls += 1
+            self.hedged += int(hedged)
+            self.wins[winner] = self.wins.get(winner, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "hedged": self.hedged, "wins": dict(self.wins)}
+
+
+LATENCY = LatencyTracker()
+HEDGE_STATS = HedgeStats()
+
+
+def hedge_delay(provider: str) -> float:
+    """Seconds to wait for `provider` before firing the backup request."""
+    pct = float(os.getenv("HEDGE_PERCENTILE", "90"))
+    delay = LATENCY.percentile(provider, pct)
+    if delay is None:
+        return float(os.getenv("HEDGE_DEFAULT_DELAY", "2"))
+    return delay
+
+
+async def _timed(provider: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    # Failed and cancelled calls are recorded too: leaving out the slow legs that
+    # lost a hedge would drag the percentile, and so the hedge delay, down.
+    start = time.monotonic()
+    try:
+        return await factory()
+    finally:
+        LATENCY.record(provider, time.monotonic() - start)
+
+
+async def hedged(
+    primary: Tuple[str, Callable[[], Awaitable[Any]]],
+    secondary: Tuple[str, Callable[[], Awaitable[Any]]],
+    delay: Optional[float] = None,
+) -> Tuple[str, Any, bool]:
+    """
+    Run `primary` (a `(provider, factory)` pair) and fall back to `secondary`
+    if it is slower than `delay` (default: `hedge_delay(primary provider)`) or
+    fails. Returns `(provider, result, hedged)` for the first success; raises
+    the primary's error if both fail.
+
+    Factories should call the provider directly, not through a coalesced tool:
+    those shield the upstream call, so cancelling the loser would not stop it.
+    """
+    names = {}
+    first = asyncio.ensure_future(_timed(*primary))
+    names[first] = primary[0]
+    try:
+        wait = hedge_delay(primary[0]) if delay is None else delay
+        done, _ = await asyncio.wait({first}, timeout=wait)
+        if first in done and first.exception() is None:
+            HEDGE_STATS.record(False, primary[0])
+            return primary[0], first.result(), False
+
+        logger.debug("Hedging %s with %s after %.2fs", primary[0], secondary[0], wait)
+        second = asyncio.ensure_future(_timed(*secondary))
+        names[second] = secondary[0]
+        pending = set(names) - done
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    HEDGE_STATS.record(True, names[task])
+                    return names[task], task.result(), True
+        raise first.exception() or second.exception()
+    finally:
+        # The losing (or abandoned) call is not awaited further.
+        for task in names:
+            task.cancel()
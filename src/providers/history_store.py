@@ -0,0 +1,250 @@
+"""Local SQLite store for wallet history.
+
+Two kinds of data live here:
+
+- paginated history walks: pages are written as soon as they arrive together
+  with the cursor to the next page, so a walk interrupted by a crash, a timeout
+  or a resumed checkpoint picks up from the last cursor instead of starting over;
+- per-address transaction logs with their sync state (newest block seen,
+  backfill cursor, and the cursor of a forward walk cut short before it met
+  stored history), so wallets that are re-scored only fetch what is new.
+
+Configuration (environment variables):
+    PROVIDER_STORE_PATH   sqlite file, default `provider_store.db`
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+
+class HistoryStore:
+    """Persist history pages and cursors, keyed by a caller-chosen walk id."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS walks (
+                    walk_id TEXT PRIMARY KEY,
+                    cursor TEXT,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS walk_pages (
+                    walk_id TEXT NOT NULL,
+                    page_no INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (walk_id, page_no)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transactions (
+                    address TEXT NOT NULL,
+                    network TEXT NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    block_number INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (address, network, tx_hash)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS transactions_by_block
+                ON transactions (address, network, block_number DESC)
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tx_sync (
+                    address TEXT NOT NULL,
+                    network TEXT NOT NULL,
+                    newest_block INTEGER,
+                    backfill_cursor TEXT,
+                    complete INTEGER NOT NULL DEFAULT 0,
+                    synced_at REAL NOT NULL,
+                    forward_cursor TEXT,
+                    forward_block INTEGER,
+                    PRIMARY KEY (address, network)
+                )
+                """
+            )
+            # Stores created before forward cursors existed.
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tx_sync)")}
+            for column, kind in (("forward_cursor", "TEXT"), ("forward_block", "INTEGER")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE tx_sync ADD COLUMN {column} {kind}")
+
+    def get_walk(self, walk_id: str) -> Optional[Dict[str, Any]]:
+        """Return the walk's cursor, done flag, last update and stored pages, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor, done, updated_at FROM walks WHERE walk_id = ?",
+                (walk_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            pages = self._conn.execute(
+                "SELECT payload FROM walk_pages WHERE walk_id = ? ORDER BY page_no",
+                (walk_id,),
+            ).fetchall()
+        cursor, done, updated_at = row
+        return {
+            "cursor": cursor,
+            "done": bool(done),
+            "updated_at": updated_at,
+            "pages": [json.loads(zlib.decompress(p)) for (p,) in pages],
+        }
+
+    def reset_walk(self, walk_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM walk_pages WHERE walk_id = ?", (walk_id,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO walks VALUES (?, NULL, 0, ?)",
+                (walk_id, time.time()),
+            )
+
+    def add_page(
+        self,
+        walk_id: str,
+        page_no: int,
+        items: List[Any],
+        cursor: Optional[str],
+        done: bool,
+    ) -> None:
+        """Store one page and the cursor to the next one in a single transaction."""
+        payload = zlib.compress(json.dumps(items).encode())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO walk_pages VALUES (?, ?, ?)",
+                (walk_id, page_no, payload),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO walks VALUES (?, ?, ?, ?)",
+                (walk_id, cursor, int(done), time.time()),
+            )
+
+    def get_sync_state(self, address: str, network: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT newest_block, backfill_cursor, complete, synced_at,
+                       forward_cursor, forward_block
+                FROM tx_sync WHERE address = ? AND network = ?
+                """,
+                (address.lower(), network),
+            ).fetchone()
+        if row is None:
+            return None
+        newest_block, backfill_cursor, complete, synced_at, forward_cursor, forward_block = row
+        return {
+            "newest_block": newest_block,
+            "backfill_cursor": backfill_cursor,
+            "complete": bool(complete),
+            "synced_at": synced_at,
+            "forward_cursor": forward_cursor,
+            "forward_block": forward_block,
+        }
+
+    def save_transactions(
+        self,
+        address: str,
+        network: str,
+        transactions: List[Dict[str, Any]],
+        newest_block: Optional[int],
+        backfill_cursor: Optional[str],
+        complete: bool,
+        forward_cursor: Optional[str] = None,
+        forward_block: Optional[int] = None,
+    ) -> None:
+        """
+        Upsert transactions (`hash` and integer `block_number` keys required
+        alongside `payload`) and the sync state in a single transaction.
+        """
+        address = address.lower()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        address,
+                        network,
+                        tx["hash"],
+                        tx["block_number"],
+                        zlib.compress(json.dumps(tx["payload"]).encode()),
+                    )
+                    for tx in transactions
+                ],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tx_sync VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    address,
+                    network,
+                    newest_block,
+                    backfill_cursor,
+                    int(complete),
+                    time.time(),
+                    forward_cursor,
+                    forward_block,
+                ),
+            )
+
+    def get_transactions(
+        self, address: str, network: str, limit: int, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Stored transactions, newest block first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT payload FROM transactions
+                WHERE address = ? AND network = ?
+                ORDER BY block_number DESC, tx_hash
+                LIMIT ? OFFSET ?
+                """,
+                (address.lower(), network, limit, offset),
+            ).fetchall()
+        return [json.loads(zlib.decompress(p)) for (p,) in rows]
+
+    def count_transactions(self, address: str, network: str) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM transactions WHERE address = ? AND network = ?",
+                (address.lower(), network),
+            ).fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """Process-wide store built from the environment (in memory during cassette runs)."""
+    from src.providers.cassette import get_cassette
+
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.getenv("PROVIDER_STORE_PATH", "provider_store.db")
+            _store = HistoryStore(":memory:" if get_cassette() is not None else path)
+        return _store
@@ -0,0 +1,472 @@
+"""Local stand-in for the six upstream providers, for end-to-end load tests.
+
+Serves the endpoints the `api_*` tools use under one prefix per provider
+(`/alchemy`, `/coingecko`, `/dexscreener`, `/ethplorer`, `/goplus`,
+`/moralis`) with synthetic, deterministic data: every wallet address maps to a
+stable portfolio and history, every token address to stable market and
+security data. Point the agent at it with `PROVIDER_BASE_URL`:
+
+    uvicorn src.providers.mock_server:app --port 8010
+    PROVIDER_BASE_URL=http://localhost:8010 uvicorn src.server:app
+
+Behaviour (environment variables; each can be overridden per provider, e.g.
+`MOCK_GOPLUS_ERROR_RATE`):
+    MOCK_LATENCY_MS   `median[:p99]` of the log-normal response delay, default 50:400
+    MOCK_ERROR_RATE   fraction of requests answered with 503, default 0
+    MOCK_RATE_LIMIT   `calls/seconds[:burst]` enforced with 429 + Retry-After, default none
+    MOCK_TOKENS       size of the token universe wallets draw from, default 500
+    MOCK_SEED         seed of the synthetic data, default 0
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.providers.ratelimit import LocalTokenBucket, RateLimit
+
+PROVIDERS = ("alchemy", "coingecko", "dexscreener", "ethplorer", "goplus", "moralis")
+
+SEED = os.getenv("MOCK_SEED", "0")
+NOW = int(time.time())
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+app = FastAPI(title="Mock DeFi providers")
+
+
+def _setting(provider: str, name: str, default: Optional[str]) -> Optional[str]:
+    return os.getenv(f"MOCK_{provider.upper()}_{name}", os.getenv(f"MOCK_{name}", default))
+
+
+class Behaviour:
+    """Latency, error and rate-limit settings of one mocked provider."""
+
+    def __init__(self, provider: str):
+        median, _, p99 = _setting(provider, "LATENCY_MS", "50:400").partition(":")
+        self.median = float(median) / 1000
+        # Log-normal whose 99th percentile is p99 (z(0.99) = 2.326).
+        self.sigma = math.log(float(p99) / float(median)) / 2.326 if p99 else 0.0
+        self.error_rate = float(_setting(provider, "ERROR_RATE", "0"))
+        spec = _setting(provider, "RATE_LIMIT", None)
+        self.rate_limit = RateLimit.parse(spec) if spec else None
+
+    def delay(self) -> float:
+        return self.median * math.exp(self.sigma * random.gauss(0, 1))
+
+
+BEHAVIOURS = {p: Behaviour(p) for p in PROVIDERS}
+BUCKETS = LocalTokenBucket()
+
+
+@app.middleware("http")
+async def misbehave(request: Request, call_next):
+    provider = request.url.path.strip("/").split("/")[0]
+    behaviour = BEHAVIOURS.get(provider)
+    if behaviour is None:
+        return await call_next(request)
+    if behaviour.rate_limit is not None:
+        wait = BUCKETS.take(provider, behaviour.rate_limit)
+        if wait > 0:
+            return JSONResponse(
+                {"error": "rate limited"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+    await asyncio.sleep(behaviour.delay())
+    if random.random() < behaviour.error_rate:
+        return JSONResponse({"error": "service unavailable"}, status_code=503)
+    return await call_next(request)
+
+
+# --- synthetic data -------------------------------------------------------------
+
+
+def _rng(*parts: Any) -> random.Random:
+    return random.Random(":".join(map(str, (SEED, *parts))))
+
+
+def _address(*parts: Any) -> str:
+    return "0x" + hashlib.sha256(":".join(map(str, (SEED, *parts))).encode()).hexdigest()[:40]
+
+
+@lru_cache(maxsize=100_000)
+def token(address: str) -> Dict[str, Any]:
+    """Stable synthetic token for any address."""
+    address = address.lower()
+    rng = _rng("token", address)
+    n = int(address[2:8], 16) % 100_000
+    price = rng.lognormvariate(0, 2.5)
+    supply = 10 ** rng.uniform(6, 11)
+    return {
+        "address": address,
+        "id": f"mock-token-{address[2:10]}",
+        "symbol": f"TK{n}",
+        "name": f"Mock Token {n}",
+        "decimals": rng.choice([6, 8, 18, 18, 18]),
+        "price": price,
+        "supply": supply,
+        "market_cap": price * supply * rng.uniform(0.2, 1.0),
+        "rank": rng.randint(1, 5000) if rng.random() < 0.6 else None,
+        "created": NOW - rng.randint(86_400, 8 * 365 * 86_400),
+        "holders": rng.randint(10, 3_000_000),
+        "liquidity": price * supply * rng.uniform(0.0001, 0.05),
+        "spam": rng.random() < 0.1,
+        "risk": {
+            flag: rng.random() < 0.08
+            for flag in ("is_honeypot", "is_mintable", "hidden_owner", "is_proxy")
+        },
+    }
+
+
+@lru_cache(maxsize=1)
+def universe() -> List[str]:
+    return [_address("universe", i) for i in range(int(os.getenv("MOCK_TOKENS", "500")))]
+
+
+@lru_cache(maxsize=100_000)
+def holdings(wallet: str) -> List[Dict[str, Any]]:
+    """Stable synthetic ERC-20 balances of a wallet (raw integer amounts)."""
+    rng = _rng("wallet", wallet.lower())
+    picked = rng.sample(universe(), k=min(len(universe()), rng.randint(3, 40)))
+    out = []
+    for address in picked:
+        info = token(address)
+        units = rng.lognormvariate(math.log(1000 / max(info["price"], 1e-9)), 1.5)
+        out.append({"token": info, "raw": int(units * 10 ** info["decimals"])})
+    return out
+
+
+def native_balance(wallet: str) -> int:
+    return int(_rng("native", wallet.lower()).uniform(0, 50) * 10**18)
+
+
+def tx_count(wallet: str) -> int:
+    return _rng("txs", wallet.lower()).randint(10, 600)
+
+
+def transaction(wallet: str, i: int) -> Dict[str, Any]:
+    """The wallet's i-th most recent transaction."""
+    wallet = wallet.lower()
+    rng = _rng("tx", wallet, i)
+    held = holdings(wallet)
+    counterparty = _address("counterparty", rng.randint(0, 30))
+    outgoing = rng.random() < 0.5
+    info = rng.choice(held)["token"] if held and rng.random() < 0.7 else None
+    amount = rng.lognormvariate(0, 2)
+    return {
+        "hash": "0x" + hashlib.sha256(f"{SEED}:{wallet}:{i}".encode()).hexdigest(),
+        "block": 20_000_000 - i * 37,
+        "timestamp": NOW - i * rng.randint(600, 86_400 * 2),
+        "from": wallet if outgoing else counterparty,
+        "to": counterparty if outgoing else wallet,
+        "token": info,
+        "amount": amount,
+        "fee": rng.uniform(0.0001, 0.01),
+    }
+
+
+def _iso(ts: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(ts))
+
+
+def _page(offset: Optional[str], size: int, total: int):
+    start = int(offset or 0)
+    end = min(total, start + size)
+    return range(start, end), (str(end) if end < total else None)
+
+
+# --- Alchemy --------------------------------------------------------------------
+
+
+@app.post("/alchemy/assets/tokens/by-address")
+async def alchemy_tokens(body: Dict[str, Any]):
+    spec = body["addresses"][0]
+    wallet, network = spec["address"], spec["networks"][0]
+    tokens = [
+        {
+            "address": wallet,
+            "network": network,
+            "tokenAddress": None,
+            "tokenBalance": hex(native_balance(wallet)),
+            "tokenMetadata": {"symbol": None, "decimals": None, "name": None, "logo": None},
+            "tokenPrices": [{"currency": "usd", "value": "3500.0", "lastUpdatedAt": _iso(NOW)}],
+        }
+    ]
+    for h in holdings(wallet):
+        info = h["token"]
+        tokens.append(
+            {
+                "address": wallet,
+                "network": network,
+                "tokenAddress": info["address"],
+                "tokenBalance": "0x" + format(h["raw"], "064x"),
+                "tokenMetadata": {
+                    "symbol": info["symbol"],
+                    "decimals": info["decimals"],
+                    "name": info["name"],
+                    "logo": None,
+                },
+                "tokenPrices": [
+                    {"currency": "usd", "value": str(info["price"]), "lastUpdatedAt": _iso(NOW)}
+                ],
+            }
+        )
+    return {"data": {"tokens": tokens, "pageKey": None}}
+
+
+@app.post("/alchemy/transactions/history/by-address")
+async def alchemy_history(body: Dict[str, Any]):
+    wallet = body["addresses"][0]["address"]
+    total = tx_count(wallet)
+    indices, after = _page(body.get("after"), int(body.get("limit", 50)), total)
+    txs = []
+    for i in indices:
+        tx = transaction(wallet, i)
+        txs.append(
+            {
+                "network": body["addresses"][0]["networks"][0],
+                "hash": tx["hash"],
+                "timeStamp": _iso(tx["timestamp"]),
+                "blockNumber": tx["block"],
+                "fromAddress": tx["from"],
+                "toAddress": tx["to"],
+                "contractAddress": tx["token"]["address"] if tx["token"] else None,
+                "value": str(int(tx["amount"] * 10**18)),
+            }
+        )
+    return {"transactions": txs, "after": after, "before": None, "totalCount": total}
+
+
+# --- Moralis --------------------------------------------------------------------
+
+
+@app.get("/moralis/{wallet}/erc20")
+async def moralis_erc20(wallet: str, limit: int = 500):
+    return [
+        {
+            "token_address": h["token"]["address"],
+            "symbol": h["token"]["symbol"],
+            "name": h["token"]["name"],
+            "logo": None,
+            "thumbnail": None,
+            "decimals": h["token"]["decimals"],
+            "balance": str(h["raw"]),
+            "possible_spam": h["token"]["spam"],
+            "verified_contract": not h["token"]["spam"],
+            "usd_price": h["token"]["price"],
+            "security_score": None,
+        }
+        for h in holdings(wallet)[:limit]
+    ]
+
+
+@app.get("/moralis/wallets/{wallet}/history")
+async def moralis_history(wallet: str, page_size: int = 100, cursor: Optional[str] = None):
+    indices, next_cursor = _page(cursor, page_size, tx_count(wallet))
+    result = []
+    for i in indices:
+        tx = transaction(wallet, i)
+        direction = "outgoing" if tx["from"] == wallet.lower() else "incoming"
+        erc20, native = [], []
+        if tx["token"]:
+            erc20.append(
+                {
+                    "address": tx["token"]["address"],
+                    "token_symbol": tx["token"]["symbol"],
+                    "from_address": tx["from"],
+                    "to_address": tx["to"],
+                    "value_formatted": str(tx["amount"]),
+                }
+            )
+        else:
+            native.append(
+                {
+                    "token_symbol": "ETH",
+                    "direction": direction,
+                    "value_formatted": str(tx["amount"]),
+                }
+            )
+        result.append(
+            {
+                "hash": tx["hash"],
+                "block_number": str(tx["block"]),
+                "block_timestamp": _iso(tx["timestamp"]),
+                "from_address": tx["from"],
+                "to_address": tx["to"],
+                "category": "token send" if direction == "outgoing" else "token receive",
+                "transaction_fee": str(tx["fee"]),
+                "erc20_transfers": erc20,
+                "native_transfers": native,
+            }
+        )
+    return {
+        "page": str(int(cursor or 0) // max(page_size, 1)),
+        "page_size": str(page_size),
+        "cursor": next_cursor,
+        "result": result,
+    }
+
+
+# --- CoinGecko ------------------------------------------------------------------
+
+
+def _coin_data(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": info["id"],
+        "symbol": info["symbol"].lower(),
+        "name": info["name"],
+        "platforms": {"ethereum": info["address"]},
+        "genesis_date": time.strftime("%Y-%m-%d", time.gmtime(info["created"])),
+        "market_cap_rank": info["rank"],
+        "market_data": {
+            "current_price": {"usd": info["price"]},
+            "market_cap": {"usd": info["market_cap"]},
+            "total_volume": {"usd": info["liquidity"] * 3},
+        },
+    }
+
+
+def _coin_ids() -> Dict[str, str]:
+    return {token(a)["id"]: a for a in universe()}
+
+
+@app.get("/coingecko/coins/list")
+async def coingecko_list():
+    return [
+        {
+            "id": token(a)["id"],
+            "symbol": token(a)["symbol"].lower(),
+            "name": token(a)["name"],
+            "platforms": {"ethereum": a},
+        }
+        for a in universe()
+    ]
+
+
+@app.get("/coingecko/coins/markets")
+async def coingecko_markets(ids: str = "", vs_currency: str = "usd"):
+    by_id = _coin_ids()
+    out = []
+    for coin_id in ids.split(","):
+        if coin_id in by_id:
+            info = token(by_id[coin_id])
+            out.append(
+                {
+                    "id": coin_id,
+                    "symbol": info["symbol"].lower(),
+                    "current_price": info["price"],
+                    "market_cap": info["market_cap"],
+                    "market_cap_rank": info["rank"],
+                }
+            )
+    return out
+
+
+@app.get("/coingecko/coins/{chain}/contract/{address}")
+async def coingecko_contract(chain: str, address: str):
+    return _coin_data(token(address))
+
+
+@app.get("/coingecko/coins/{coin_id}")
+async def coingecko_coin(coin_id: str):
+    address = _coin_ids().get(coin_id)
+    if address is None:
+        return JSONResponse({"error": "coin not found"}, status_code=404)
+    return _coin_data(token(address))
+
+
+# --- DexScreener ----------------------------------------------------------------
+
+
+@app.get("/dexscreener/tokens/v1/{network}/{addresses}")
+async def dexscreener_tokens(network: str, addresses: str):
+    pairs = []
+    for address in addresses.split(","):
+        info = token(address.strip())
+        rng = _rng("pair", info["address"])
+        volume = info["liquidity"] * rng.uniform(0.05, 2)
+        pairs.append(
+            {
+                "chainId": network,
+                "dexId": "uniswap",
+                "url": f"https://dexscreener.com/{network}/{info['address']}",
+                "pairAddress": _address("pair", info["address"]),
+                "labels": ["v2"],
+                "baseToken": {
+                    "address": info["address"],
+                    "name": info["name"],
+                    "symbol": info["symbol"],
+                },
+                "quoteToken": {"address": WETH, "name": "Wrapped Ether", "symbol": "WETH"},
+                "priceNative": str(info["price"] / 3500),
+                "priceUsd": str(info["price"]),
+                "txns": {"h24": {"buys": rng.randint(0, 5000), "sells": rng.randint(0, 5000)}},
+                "volume": {"h24": volume},
+                "priceChange": {"h24": rng.uniform(-30, 30)},
+                "liquidity": {"usd": info["liquidity"]},
+                "fdv": info["price"] * info["supply"],
+                "marketCap": info["market_cap"],
+                "pairCreatedAt": (info["created"] + rng.randint(0, 86_400 * 30)) * 1000,
+            }
+        )
+    return pairs
+
+
+# --- Ethplorer ------------------------------------------------------------------
+
+
+@app.get("/ethplorer/getTokenInfo/{address}")
+async def ethplorer_token_info(address: str):
+    info = token(address)
+    return {
+        "address": info["address"],
+        "name": info["name"],
+        "symbol": info["symbol"],
+        "decimals": str(info["decimals"]),
+        "owner": _address("owner", info["address"]),
+        "totalSupply": str(int(info["supply"] * 10 ** info["decimals"])),
+        "holdersCount": info["holders"],
+        "transfersCount": info["holders"] * 7,
+        "txsCount": info["holders"] * 5,
+        "contractInfo": {
+            "creatorAddress": _address("creator", info["address"]),
+            "creationTimestamp": info["created"],
+        },
+        "price": {
+            "rate": info["price"],
+            "diff": 0.0,
+            "diff7d": 0.0,
+            "marketCapUsd": info["market_cap"],
+            "availableSupply": info["supply"],
+            "volume24h": info["liquidity"] * 3,
+        },
+    }
+
+
+# --- GoPlus ---------------------------------------------------------------------
+
+
+@app.get("/goplus/token_security/{chain_id}")
+async def goplus_token_security(chain_id: int, contract_addresses: str = ""):
+    result = {}
+    for address in contract_addresses.split(","):
+        info = token(address.strip())
+        risk = info["risk"]
+        result[info["address"]] = {
+            "token_symbol": info["symbol"],
+            "token_name": info["name"],
+            **{flag: "1" if raised else "0" for flag, raised in risk.items()},
+            "is_open_source": "0" if risk["hidden_owner"] else "1",
+            "is_in_dex": "1",
+            "holder_count": str(info["holders"]),
+            "buy_tax": "0",
+            "sell_tax": "0.1" if risk["is_honeypot"] else "0",
+        }
+    return {"code": 1, "message": "OK", "result": result}
@@ -1,22 +1,52 @@
+import asyncio
+import datetime as dt
 import os
 import pprint
+import time
+from collections import Counter, defaultdict
+from typing import Annotated, Any, AsyncIterator, Dict, List
 
-import requests
-from langchain_core.tools import tool
-from src.utils import rate_limit
-from typing import Annotated  
+from src.providers.base import api_tool
+from src.providers.cache import make_key
+from src.providers.cassette import reference_time
+from src.providers.client import ProviderClient
+from src.providers.history_store import get_history_store
+from src.providers.projection import projected
 
 
 BASE   = "https://deep-index.moralis.io/api/v2.2"
 HEAD   = {"X-API-Key": os.getenv("MORALIS_API_KEY")}
+http   = ProviderClient(
+    "moralis", BASE, headers=HEAD, timeout=30, api_key=os.getenv("MORALIS_API_KEY")
+)
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_moralis_wallet_portfolio(address: str, chain: str = "eth", limit: int = 500):
+# A finished history walk is reused for this long before being fetched again.
+HISTORY_WALK_TTL_SECONDS = 60 * 60
+
+# Fields of /{address}/erc20 the agent uses; logos and thumbnails are dropped.
+PORTFOLIO_FIELDS = [
+    {
+        "token_address": True,
+        "symbol": True,
+        "name": True,
+        "decimals": True,
+        "balance": True,
+        "usd_price": True,
+        "usd_value": True,
+        "possible_spam": True,
+        "verified_contract": True,
+        "security_score": True,
+        "percentage_relative_to_total_supply": True,
+    }
+]
+
+@api_tool
+@projected(PORTFOLIO_FIELDS)
+async def api_moralis_wallet_portfolio(address: str, chain: str = "eth", limit: int = 500):
     """Return ERC-20 token balances (USD prices included)."""
-    url    = f"{BASE}/{address}/erc20"
+    url    = f"/{address}/erc20"
     params = {"chain": chain, "limit": limit}
-    r = requests.get(url, headers=HEAD, params=params, timeout=30)
+    r = await http.get(url, params=params)
     r.raise_for_status()
     return r.json()        # → list[dict]
     # {'token_address': '0x1596f7f7a0c495daf141376321d3ecac66a10a42',
@@ -33,19 +63,18 @@ def api_moralis_wallet_portfolio(address: str, chain: str = "eth", limit: int =
     # 'percentage_relative_to_total_supply': 0.002563684,
     # 'security_score': None}
 
-@tool
-@rate_limit(max_calls=2, period_seconds=10)
-def api_moralis_wallet_history(address: str, chain: str = "eth",
+@api_tool
+async def api_moralis_wallet_history(address: str, chain: str = "eth",
                        cursor: str | None = None, page_size: int = 100):
     """
     Return one page of decoded wallet history.
     Re-feed the returned cursor to paginate.
     """
-    url    = f"{BASE}/wallets/{address}/history"
+    url    = f"/wallets/{address}/history"
     params = {"chain": chain, "page_size": page_size}
     if cursor:
         params["cursor"] = cursor
-    r = requests.get(url, headers=HEAD, params=params, timeout=30)
+    r = await http.get(url, params=params)
     r.raise_for_status()
     return r.json()        # keys: result[], cursor, page
     # {
@@ -165,3 +194,164 @@ def api_moralis_wallet_history(address: str, chain: str = "eth",
     #     }
     #   ]
     # }
+
+
+# Transactions per page of a wallet-history walk.
+HISTORY_PAGE_SIZE = 100
+
+
+def _parse_timestamp(value: str) -> dt.datetime:
+    return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+async def iter_wallet_history(
+    address: str,
+    chain: str = "eth",
+    days: int = 30,
+    max_transactions: int = 1000,
+    page_size: int = HISTORY_PAGE_SIZE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield decoded wallet-history transactions, newest first, walking Moralis pages
+    until `days` ago or `max_transactions`. Every page is stored with its cursor as
+    it arrives, so an interrupted walk resumes from the last cursor.
+    """
+    now = dt.datetime.fromtimestamp(reference_time(), dt.timezone.utc)
+    since = now - dt.timedelta(days=days)
+    walk_id = make_key(
+        "moralis_wallet_history",
+        {
+            "address": address,
+            "chain": chain,
+            "since": since.date().isoformat(),
+            "max_transactions": max_transactions,
+        },
+    )
+    store = get_history_store()
+    walk = await asyncio.to_thread(store.get_walk, walk_id)
+    if walk and walk["done"] and time.time() - walk["updated_at"] > HISTORY_WALK_TTL_SECONDS:
+        walk = None
+    if walk is None:
+        await asyncio.to_thread(store.reset_walk, walk_id)
+        walk = {"cursor": None, "done": False, "pages": []}
+
+    def in_window(tx: Dict[str, Any]) -> bool:
+        return _parse_timestamp(tx["block_timestamp"]) >= since
+
+    seen = 0
+    for page in walk["pages"]:
+        for tx in page:
+            if seen >= max_transactions or not in_window(tx):
+                return
+            seen += 1
+            yield tx
+    if walk["done"]:
+        return
+
+    cursor = walk["cursor"]
+    page_no = len(walk["pages"])
+    while True:
+        params = {"chain": chain, "page_size": page_size, "order": "DESC"}
+        if cursor:
+            params["cursor"] = cursor
+        r = await http.get(f"/wallets/{address}/history", params=params)
+        r.raise_for_status()
+        data = r.json()
+        items = data.get("result") or []
+        cursor = data.get("cursor") or None
+        done = (
+            cursor is None
+            or not items
+            or seen + len(items) >= max_transactions
+            or not in_window(items[-1])
+        )
+        await asyncio.to_thread(store.add_page, walk_id, page_no, items, cursor, done)
+        page_no += 1
+        for tx in items:
+            if seen >= max_transactions or not in_window(tx):
+                return
+            seen += 1
+            yield tx
+        if done:
+            return
+
+
+def _summarize_history(address: str, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate decoded history into per-token flows, categories and counterparties."""
+    address = address.lower()
+    categories: Counter = Counter()
+    counterparties: Counter = Counter()
+    entities: Dict[str, str] = {}
+    flows: Dict[str, Dict[str, Dict[str, Any]]] = {
+        "outgoing": defaultdict(lambda: {"symbol": None, "amount": 0.0, "transfers": 0}),
+        "incoming": defaultdict(lambda: {"symbol": None, "amount": 0.0, "transfers": 0}),
+    }
+    fees = 0.0
+
+    def add_flow(direction: str, token: str, symbol: str, amount: Any) -> None:
+        flow = flows[direction][token]
+        flow["symbol"] = symbol
+        flow["amount"] += float(amount or 0)
+        flow["transfers"] += 1
+
+    for tx in transactions:
+        categories[tx.get("category") or "unknown"] += 1
+        fees += float(tx.get("transaction_fee") or 0)
+        sender = (tx.get("from_address") or "").lower()
+        side = "to_address" if sender == address else "from_address"
+        other = tx.get(side)
+        if other:
+            counterparties[other.lower()] += 1
+            entity = tx.get(f"{side}_entity")
+            if entity:
+                entities[other.lower()] = entity
+        for transfer in tx.get("native_transfers") or []:
+            direction = "outgoing" if transfer.get("direction") == "outgoing" else "incoming"
+            add_flow(direction, "native", transfer.get("token_symbol"), transfer.get("value_formatted"))
+        for transfer in tx.get("erc20_transfers") or tx.get("erc20_transfer") or []:
+            direction = (
+                "outgoing"
+                if (transfer.get("from_address") or "").lower() == address
+                else "incoming"
+            )
+            add_flow(
+                direction,
+                (transfer.get("address") or "").lower(),
+                transfer.get("token_symbol"),
+                transfer.get("value_formatted"),
+            )
+
+    timestamps = [tx["block_timestamp"] for tx in transactions if tx.get("block_timestamp")]
+    return {
+        "transactions": len(transactions),
+        "first_timestamp": min(timestamps) if timestamps else None,
+        "last_timestamp": max(timestamps) if timestamps else None,
+        "categories": dict(categories),
+        "outgoing_by_token": dict(flows["outgoing"]),
+        "incoming_by_token": dict(flows["incoming"]),
+        "top_counterparties": [
+            {"address": a, "entity": entities.get(a), "transactions": n}
+            for a, n in counterparties.most_common(10)
+        ],
+        "total_fees_native": fees,
+    }
+
+
+@api_tool
+async def api_moralis_wallet_history_summary(
+    address: str, chain: str = "eth", days: int = 30, max_transactions: int = 1000
+):
+    """
+    Walk the wallet's whole decoded history for the last `days` days (up to
+    `max_transactions`) server-side and return an aggregated summary: transaction
+    count and time span, counts per category (send, receive, token swap, ...),
+    outgoing/incoming amounts per token (keyed by token address, 'native' for ETH),
+    top counterparties and total fees. No cursor handling needed.
+    """
+    transactions = [
+        tx async for tx in iter_wallet_history(address, chain, days, max_transactions)
+    ]
+    summary = _summarize_history(address, transactions)
+    summary.update({"address": address, "chain": chain, "days": days})
+    summary["truncated"] = len(transactions) >= max_transactions
+    return summary
@@ -0,0 +1,119 @@
+"""Provider-independent wallet portfolio.
+
+Alchemy and Moralis both return ERC-20 balances with USD prices. Their payloads
+are normalised into the same rows so that either can answer, and the unified
+tool hedges between them (see `src.providers.hedge`).
+
+Configuration (environment variables):
+    PORTFOLIO_PRIMARY   provider tried first, `alchemy` (default) or `moralis`
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from src.providers.alchemy import api_alchemy_portfolio
+from src.providers.base import api_tool
+from src.providers.hedge import hedged
+from src.providers.moralis import api_moralis_wallet_portfolio
+
+# Moralis chain name -> Alchemy network name.
+ALCHEMY_NETWORKS = {
+    "eth": "eth-mainnet",
+    "base": "base-mainnet",
+    "polygon": "polygon-mainnet",
+    "arbitrum": "arb-mainnet",
+    "optimism": "opt-mainnet",
+    "bsc": "bnb-mainnet",
+}
+
+# Symbol of the gas token Alchemy reports with a null tokenAddress.
+NATIVE_SYMBOLS = {"polygon-mainnet": "POL", "bnb-mainnet": "BNB"}
+
+
+def _units(raw: Any, decimals: Any) -> Optional[float]:
+    try:
+        return int(str(raw), 0) / 10 ** int(decimals)
+    except (TypeError, ValueError):
+        return None
+
+
+def _row(token_address, symbol, name, balance, price_usd, possible_spam=None) -> Dict[str, Any]:
+    return {
+        "token_address": token_address.lower() if token_address else None,
+        "symbol": symbol,
+        "name": name,
+        "balance": balance,
+        "price_usd": price_usd,
+        "value_usd": balance * price_usd if balance is not None and price_usd is not None else None,
+        "possible_spam": possible_spam,
+    }
+
+
+def normalize_alchemy_portfolio(data: Dict[str, Any], network: str) -> List[Dict[str, Any]]:
+    rows = []
+    for token in (data.get("data") or {}).get("tokens") or []:
+        meta = token.get("tokenMetadata") or {}
+        prices = token.get("tokenPrices") or []
+        price = next((float(p["value"]) for p in prices if p.get("currency") == "usd"), None)
+        if token.get("tokenAddress") is None:  # native token
+            rows.append(_row(None, NATIVE_SYMBOLS.get(network, "ETH"), None,
+                             _units(token.get("tokenBalance"), 18), price))
+        else:
+            rows.append(_row(token["tokenAddress"], meta.get("symbol"), meta.get("name"),
+                             _units(token.get("tokenBalance"), meta.get("decimals")), price))
+    return rows
+
+
+def normalize_moralis_portfolio(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        _row(
+            token.get("token_address"),
+            token.get("symbol"),
+            token.get("name"),
+            _units(token.get("balance"), token.get("decimals")),
+            token.get("usd_price"),
+            token.get("possible_spam"),
+        )
+        for token in data or []
+    ]
+
+
+def primary_provider() -> str:
+    """Provider `api_portfolio` asks first."""
+    return os.getenv("PORTFOLIO_PRIMARY", "alchemy")
+
+
+@api_tool
+async def api_portfolio(address: str, chain: str = "eth"):
+    """
+    Fetch the wallet's token balances with USD prices from whichever of Alchemy or
+    Moralis answers first; rows are normalised (balance in token units, price and
+    value in USD) and sorted by value.
+    `chain`: 'eth', 'base', 'polygon', 'arbitrum', 'optimism' or 'bsc'.
+    """
+    network = ALCHEMY_NETWORKS.get(chain, chain)
+
+    # The legs bypass single-flight (`__wrapped__` of the coalesced coroutine):
+    # its shield would keep the losing request running after it is cancelled.
+    async def alchemy():
+        fetch = api_alchemy_portfolio.coroutine.__wrapped__
+        raw = await fetch(address=address, network=network)
+        return normalize_alchemy_portfolio(raw, network)
+
+    async def moralis():
+        fetch = api_moralis_wallet_portfolio.coroutine.__wrapped__
+        raw = await fetch(address=address, chain=chain)
+        return normalize_moralis_portfolio(raw)
+
+    legs = [("alchemy", alchemy), ("moralis", moralis)]
+    if primary_provider() == "moralis":
+        legs.reverse()
+    source, rows, was_hedged = await hedged(*legs)
+    rows = [r for r in rows if r["balance"]]
+    rows.sort(key=lambda r: r["value_usd"] or 0.0, reverse=True)
+    return {
+        "source": source,
+        "hedged": was_hedged,
+        "total_value_usd": sum(r["value_usd"] or 0.0 for r in rows),
+        "tokens": rows,
+    }
@@ -0,0 +1,128 @@
+"""Field projection for provider responses.
+
+Raw upstream payloads carry logos, links, null metadata and nested statistics the
+agent never looks at, and every byte of a tool result is serialised into the
+prompt (and the checkpoint) on each later turn. Tools declare the fields they
+need with a spec and everything else is dropped right after the HTTP call.
+
+A spec mirrors the shape of the payload:
+    True            keep the value as is
+    {"k": spec}     keep only the listed keys of a dict, projecting each value
+    [spec]          project every element of a list
+
+None values and containers that end up empty are dropped as well.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from src.utils import count_tokens
+
+logger = logging.getLogger("defi_agent")
+
+# Token counts are reported with one fixed model's encoding (cl100k_base); they
+# are an estimate of what the projection saves in the prompt, not a billing figure.
+TOKEN_COUNT_MODEL = "gpt-4"
+
+_DROP = object()
+
+
+def project(value: Any, spec: Any) -> Any:
+    """Return the part of `value` selected by `spec` (see module docstring)."""
+    out = _project(value, spec)
+    return None if out is _DROP else out
+
+
+def _project(value: Any, spec: Any) -> Any:
+    if value is None:
+        return _DROP
+    if spec is True:
+        return value
+    if isinstance(spec, dict):
+        if not isinstance(value, dict):
+            return value
+        out = {}
+        for key, sub in spec.items():
+            if key in value:
+                projected = _project(value[key], sub)
+                if projected is not _DROP:
+                    out[key] = projected
+        return out if out else _DROP
+    if isinstance(spec, list):
+        if not isinstance(value, list):
+            return value
+        items = [_project(v, spec[0]) for v in value]
+        return [v for v in items if v is not _DROP]
+    raise ValueError(f"Invalid projection spec: {spec!r}")
+
+
+class ProjectionStats:
+    """Bytes and tokens before/after projection, per tool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, raw: Any, projected: Any) -> Dict[str, int]:
+        raw_text, out_text = json.dumps(raw), json.dumps(projected)
+        call = {
+            "bytes_in": len(raw_text.encode()),
+            "bytes_out": len(out_text.encode()),
+            "tokens_in": count_tokens(raw_text, TOKEN_COUNT_MODEL),
+            "tokens_out": count_tokens(out_text, TOKEN_COUNT_MODEL),
+        }
+        with self._lock:
+            totals = self._tools.setdefault(name, dict.fromkeys(["calls", *call], 0))
+            totals["calls"] += 1
+            for k, v in call.items():
+                totals[k] += v
+        return call
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                name: {
+                    **totals,
+                    "bytes_saved": totals["bytes_in"] - totals["bytes_out"],
+                    "tokens_saved": totals["tokens_in"] - totals["tokens_out"],
+                }
+                for name, totals in self._tools.items()
+            }
+
+
+PROJECTION_STATS = ProjectionStats()
+
+
+def projected(spec: Any, name: Optional[str] = None):
+    """
+    Decorator projecting the result of an async provider function with `spec`.
+    Place it directly on the function doing the HTTP call (below `cached`), so
+    only the slim payload is cached and returned.
+    """
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            raw = await func(*args, **kwargs)
+            if isinstance(raw, dict) and "error" in raw:
+                return raw
+            out = project(raw, spec)
+            call = await asyncio.to_thread(PROJECTION_STATS.record, label, raw, out)
+            logger.debug(
+                "%s: projected %d -> %d bytes, %d tokens saved",
+                label,
+                call["bytes_in"],
+                call["bytes_out"],
+                call["tokens_in"] - call["tokens_out"],
+            )
+            return out
+
+        return wrapper
+
+    return decorator
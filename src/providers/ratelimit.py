@@ -0,0 +1,280 @@
+"""Token-bucket rate limiting shared across processes.
+
+Every upstream request takes one token from its provider's bucket. Buckets
+live in Redis (`REDIS_URL`) so that all uvicorn workers, CLI processes and
+batch runs draw from the same quota; when Redis is not configured or not
+reachable, an in-process bucket is used instead.
+
+Limits default to DEFAULT_RATE_LIMITS and can be overridden per provider with
+`RATE_LIMIT_<PROVIDER>=<calls>/<seconds>[:<burst>]`, e.g.
+`RATE_LIMIT_COINGECKO=30/60:5`. Buckets are keyed by provider and by a
+fingerprint of the API key, so different keys get independent quotas; a key
+with a different plan gets its own limit with
+`RATE_LIMIT_<PROVIDER>_<FINGERPRINT>=<calls>/<seconds>[:<burst>]`, where the
+fingerprint is the one in the bucket key (`key_fingerprint`, also shown in the
+rate-limit log lines), so the key itself never goes in the environment.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("defi_agent")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`max_calls` every `period_seconds`, with bursts of up to `burst` calls."""
+
+    max_calls: int
+    period_seconds: float
+    burst: Optional[int] = None
+
+    @property
+    def capacity(self) -> float:
+        return float(self.burst or self.max_calls)
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.max_calls / self.period_seconds
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """Parse `calls/seconds[:burst]`."""
+        rate, _, burst = spec.partition(":")
+        calls, _, period = rate.partition("/")
+        return cls(
+            max_calls=int(calls),
+            period_seconds=float(period or 1),
+            burst=int(burst) if burst else None,
+        )
+
+
+DEFAULT_RATE_LIMITS: Dict[str, RateLimit] = {
+    "alchemy": RateLimit(max_calls=2, period_seconds=10),
+    "coingecko": RateLimit(max_calls=2, period_seconds=10),
+    "dexscreener": RateLimit(max_calls=2, period_seconds=10),
+    "ethplorer": RateLimit(max_calls=2, period_seconds=10),
+    "goplus": RateLimit(max_calls=2, period_seconds=10),
+    "moralis": RateLimit(max_calls=2, period_seconds=10),
+}
+
+
+REDIS_RETRY_SECONDS = 30.0
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else "anon"
+
+
+def limit_for(provider: str, api_key: Optional[str] = None) -> RateLimit:
+    """Limit for `provider`: per-key override, then per-provider override, then default."""
+    for var in (
+        f"RATE_LIMIT_{provider.upper()}_{key_fingerprint(api_key).upper()}",
+        f"RATE_LIMIT_{provider.upper()}",
+    ):
+        spec = os.getenv(var)
+        if spec:
+            return RateLimit.parse(spec)
+    return DEFAULT_RATE_LIMITS.get(provider, RateLimit(max_calls=2, period_seconds=10))
+
+
+def bucket_key(provider: str, api_key: Optional[str] = None) -> str:
+    return f"ratelimit:{provider}:{key_fingerprint(api_key)}"
+
+
+class LocalTokenBucket:
+    """In-process token buckets, used when Redis is unavailable."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        """Take a token if available and return 0, else return seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - ts) * limit.refill_per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / limit.refill_per_second
+
+    def peek(self, key: str, limit: RateLimit) -> float:
+        """Tokens currently in the bucket (negative while blocked), without taking one."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (limit.capacity, now))
+            return min(limit.capacity, tokens + (now - ts) * limit.refill_per_second)
+
+    def block(self, key: str, limit: RateLimit, seconds: float) -> None:
+        """Empty the bucket so that the next token is only available in `seconds`."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - ts) * limit.refill_per_second)
+            self._buckets[key] = (min(tokens, 1 - seconds * limit.refill_per_second), now)
+
+
+# Refill, then take one token if possible. Uses the Redis clock so that
+# processes on different hosts agree on time. Returns the wait in seconds.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+# Refilled token count, read-only.
+_PEEK_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+return tostring(math.min(capacity, tokens + math.max(0, now - ts) * rate))
+"""
+
+# Empty the bucket so that the next token is only available in ARGV[3] seconds.
+_BLOCK_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local seconds = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+tokens = math.min(tokens, 1 - seconds * rate)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate + seconds) + 60)
+return 1
+"""
+
+
+class RateLimiter:
+    """Token-bucket limiter backed by Redis with an in-process fallback."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url
+        self.local = LocalTokenBucket()
+        # redis.asyncio clients are bound to the loop they were created on.
+        self._clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # After a Redis error, use local buckets for a while before retrying.
+        self._redis_down_until = 0.0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def _redis(self):
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                try:
+                    import redis.asyncio as redis
+                except ImportError:
+                    logger.warning("redis package not installed, using in-process rate limits")
+                    self.redis_url = None
+                    return None
+                client = redis.from_url(self.redis_url)
+                self._clients[loop] = client
+            return client
+
+    async def _take(self, key: str, limit: RateLimit) -> float:
+        client = self._redis()
+        if client is not None:
+            try:
+                wait = await client.eval(
+                    _TAKE_SCRIPT, 1, key, limit.capacity, limit.refill_per_second
+                )
+                return float(wait)
+            except Exception as exc:
+                # Don't let a Redis outage stop the agent: degrade to local buckets.
+                logger.warning("Redis rate limiter unavailable (%s), using in-process limits", exc)
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self.local.take(key, limit)
+
+    async def block(self, key: str, limit: RateLimit, seconds: float) -> None:
+        """Make every caller sharing `key` wait `seconds`, e.g. after a 429 with Retry-After."""
+        client = self._redis()
+        if client is not None:
+            try:
+                await client.eval(
+                    _BLOCK_SCRIPT, 1, key, limit.capacity, limit.refill_per_second, seconds
+                )
+                return
+            except Exception as exc:
+                logger.warning("Redis rate limiter unavailable (%s), using in-process limits", exc)
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        self.local.block(key, limit, seconds)
+
+    async def available(self, key: str, limit: RateLimit) -> float:
+        """Tokens currently available for `key`, without taking any."""
+        client = self._redis()
+        if client is not None:
+            try:
+                tokens = await client.eval(
+                    _PEEK_SCRIPT, 1, key, limit.capacity, limit.refill_per_second
+                )
+                return float(tokens)
+            except Exception as exc:
+                logger.warning("Redis rate limiter unavailable (%s), using in-process limits", exc)
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self.local.peek(key, limit)
+
+    async def try_acquire(self, key: str, limit: RateLimit) -> Tuple[bool, float]:
+        """Take a token without blocking. Returns (acquired, seconds until next token)."""
+        wait = await self._take(key, limit)
+        return wait <= 0, wait
+
+    async def acquire(self, key: str, limit: RateLimit) -> None:
+        """Wait until a token is available and take it."""
+        while True:
+            acquired, wait = await self.try_acquire(key, limit)
+            if acquired:
+                return
+            logger.info("Rate limit reached for %s. Waiting for %.2f seconds.", key, wait)
+            self.waits += 1
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": (
+                "redis"
+                if self.redis_url and time.monotonic() >= self._redis_down_until
+                else "local"
+            ),
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
+
+
+RATE_LIMITER = RateLimiter(redis_url=os.getenv("REDIS_URL"))
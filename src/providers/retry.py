@@ -0,0 +1,99 @@
+"""Retry policy shared by all providers.
+
+Transport errors, 429 and 5xx responses are retried with exponential backoff
+and full jitter. When the provider says how long to wait (`Retry-After`, or a
+`*RateLimit-Reset` header on a 429) that wait is pushed into the provider's
+token bucket instead, so every concurrent caller and process backs off, not
+just the one that got the 429. Retries stop at `max_attempts` or when the next
+attempt would start after the per-call deadline.
+
+Configuration (environment variables):
+    RETRY_MAX_ATTEMPTS       attempts per call including the first, default 4
+    RETRY_DEADLINE_SECONDS   no retry is started after this, default 60
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_RESET_HEADERS = ("x-ratelimit-reset", "ratelimit-reset", "x-rate-limit-reset")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    deadline_seconds: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "4")),
+            deadline_seconds=float(os.getenv("RETRY_DEADLINE_SECONDS", "60")),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def _seconds(value: str) -> Optional[float]:
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+    # Some providers send an epoch timestamp rather than a delay.
+    if seconds > 1e9:
+        seconds -= time.time()
+    return max(0.0, seconds)
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """How long the provider asked us to wait, if it said so."""
+    value = response.headers.get("retry-after")
+    if value is not None:
+        return _seconds(value)
+    if response.status_code == 429:
+        for header in _RESET_HEADERS:
+            value = response.headers.get(header)
+            if value is not None:
+                return _seconds(value)
+    return None
+
+
+class RetryStats:
+    """Retry counters per provider."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Dict[str, float]] = {}
+
+    def record(self, provider: str, **counts: float) -> None:
+        with self._lock:
+            row = self._providers.setdefault(
+                provider,
+                {"retries": 0, "retry_after_honoured": 0, "gave_up": 0, "backoff_seconds": 0.0},
+            )
+            for key, value in counts.items():
+                row[key] += value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {p: dict(row) for p, row in self._providers.items()}
+
+
+RETRY_STATS = RetryStats()
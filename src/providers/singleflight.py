@@ -0,0 +1,68 @@
+"""In-flight request coalescing for provider tools.
+
+When several jobs ask the same provider the same question at the same time,
+only the first call goes upstream; the others await its result instead of
+spending their own rate-limit budget.
+"""
+
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from src.providers.cache import make_key
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key."""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        with self._lock:
+            task = self._inflight.get(slot)
+            leader = task is None
+            if leader:
+                self.calls += 1
+                task = loop.create_task(factory())
+                self._inflight[slot] = task
+                task.add_done_callback(lambda _: self._forget(slot))
+            else:
+                self.coalesced += 1
+        # Shield the shared task so that one caller being cancelled does not
+        # cancel the upstream call for everybody else.
+        result = await asyncio.shield(task)
+        # Followers get their own copy so nobody mutates a shared payload.
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, slot) -> None:
+        with self._lock:
+            self._inflight.pop(slot, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"upstream_calls": self.calls, "coalesced": self.coalesced}
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+
+def coalesced(func: Callable[..., Awaitable[Any]]):
+    """Decorator routing an async provider function through SINGLE_FLIGHT."""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = make_key(func.__name__, bound.arguments)
+        return await SINGLE_FLIGHT.do(key, lambda: func(*args, **kwargs))
+
+    return wrapper
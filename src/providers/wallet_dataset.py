@@ -0,0 +1,197 @@
+"""Deterministic data gathering for one wallet.
+
+Fetches what every assessment needs before the LLM is involved: the portfolio
+and the recent history concurrently, then market, liquidity and security data
+for the portfolio's tokens, also concurrently. The result is a compact,
+provider-independent dataset (one row per token, one history summary) that is
+cheap to put in a prompt and to checkpoint. Spam and dust holdings are dropped
+and only the most valuable tokens get a row; the rest is summarised as a count
+and a total value under `other_tokens`. Tokens that moved in the history but
+have no row are priced too (`flow_prices_usd`), so that flows of tokens the
+wallet no longer holds are not valued at zero.
+
+A failing source does not fail the whole dataset: its error is reported under
+`errors` and the corresponding fields are left empty.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from src.providers.coingecko import api_coingecko_token_prices
+from src.providers.dexscreener import api_dexscreener_tokens_batch
+from src.providers.goplus import api_goplus_tokens_security_scan
+from src.providers.moralis import api_moralis_wallet_history_summary
+from src.providers.portfolio import api_portfolio
+
+logger = logging.getLogger("defi_agent")
+
+# Moralis chain name -> (CoinGecko platform, DexScreener network, GoPlus chain id).
+CHAINS: Dict[str, Tuple[str, str, int]] = {
+    "eth": ("ethereum", "ethereum", 1),
+    "base": ("base", "base", 8453),
+    "polygon": ("polygon-pos", "polygon", 137),
+    "arbitrum": ("arbitrum-one", "arbitrum", 42161),
+    "optimism": ("optimistic-ethereum", "optimism", 10),
+    "bsc": ("binance-smart-chain", "bsc", 56),
+}
+
+# Only the most valuable tokens get a (enriched) row; dust rarely changes the assessment.
+MAX_TOKENS = 40
+# Holdings priced below this many USD are dust.
+DUST_VALUE_USD = 1.0
+HISTORY_DAYS = 90
+HISTORY_MAX_TRANSACTIONS = 1000
+# Tokens without a row priced for the history flows, most transferred first.
+MAX_FLOW_TOKENS = 100
+
+
+async def _source(name: str, call: Awaitable[Any], errors: Dict[str, str]) -> Optional[Any]:
+    try:
+        return await call
+    except Exception as exc:
+        logger.warning("Prefetch of %s failed: %s", name, exc)
+        errors[name] = str(exc)
+        return None
+
+
+def _select_tokens(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Top MAX_TOKENS rows by value (`rows` come sorted) without spam and dust, and a
+    summary of the dropped ones: count and value of the non-spam ones, number of
+    spam ones. Unpriced tokens are not dust: they are kept, after the priced
+    ones, while there is room.
+    """
+    kept, spam, dropped = [], 0, []
+    for r in rows:
+        value = r.get("value_usd")
+        if r.get("possible_spam"):
+            spam += 1
+        elif (value is not None and value < DUST_VALUE_USD) or len(kept) >= MAX_TOKENS:
+            dropped.append(r)
+        else:
+            kept.append(r)
+    other = {
+        "count": len(dropped),
+        "spam": spam,
+        "value_usd": sum(r.get("value_usd") or 0.0 for r in dropped),
+    }
+    return kept, other
+
+
+def _flow_tokens(history: Optional[Dict[str, Any]], known: List[str]) -> List[str]:
+    """Contract addresses in the history flows without a row, most transferred first."""
+    known = {a.lower() for a in known}
+    transfers: Dict[str, int] = {}
+    for key in ("outgoing_by_token", "incoming_by_token"):
+        for token, flow in ((history or {}).get(key) or {}).items():
+            if token != "native" and token not in known:
+                transfers[token] = transfers.get(token, 0) + (flow.get("transfers") or 0)
+    return sorted(transfers, key=transfers.get, reverse=True)[:MAX_FLOW_TOKENS]
+
+
+def _best_pair(pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The most liquid pair, whose stats stand for the token's market."""
+    return max(pairs, key=lambda p: (p.get("liquidity") or {}).get("usd") or 0, default={})
+
+
+def _token_row(
+    row: Dict[str, Any],
+    price: Optional[Dict[str, Any]],
+    pairs: Optional[List[Dict[str, Any]]],
+    security: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    out = dict(row)
+    price = price or {}
+    out["market_cap_usd"] = price.get("market_cap_usd")
+    out["market_cap_rank"] = price.get("market_cap_rank")
+    pair = _best_pair(pairs or [])
+    out["dex"] = pair.get("dexId")
+    out["liquidity_usd"] = (pair.get("liquidity") or {}).get("usd")
+    out["volume_24h_usd"] = (pair.get("volume") or {}).get("h24")
+    out["pair_created_at"] = pair.get("pairCreatedAt")
+    if security is not None:
+        out["security_flags"] = [flag for flag, raised in security.items() if raised is True]
+        out["buy_tax"] = security.get("buy_tax")
+        out["sell_tax"] = security.get("sell_tax")
+    return out
+
+
+async def gather_wallet_dataset(address: str, chain: str = "eth") -> Dict[str, Any]:
+    """Portfolio, history summary and per-token enrichment for `address`."""
+    platform, network, chain_id = CHAINS.get(chain, CHAINS["eth"])
+    errors: Dict[str, str] = {}
+
+    portfolio, history = await asyncio.gather(
+        _source("portfolio", api_portfolio.coroutine(address=address, chain=chain), errors),
+        _source(
+            "history",
+            api_moralis_wallet_history_summary.coroutine(
+                address=address,
+                chain=chain,
+                days=HISTORY_DAYS,
+                max_transactions=HISTORY_MAX_TRANSACTIONS,
+            ),
+            errors,
+        ),
+    )
+    rows, other_tokens = _select_tokens((portfolio or {}).get("tokens") or [])
+    addresses = [r["token_address"] for r in rows if r["token_address"]]
+    flow_tokens = _flow_tokens(history, addresses)
+
+    prices = pairs = security = None
+    if addresses or flow_tokens:
+        prices, pairs, security = await asyncio.gather(
+            _source(
+                "prices",
+                api_coingecko_token_prices.coroutine(
+                    token_addresses=addresses + flow_tokens, chain=platform
+                ),
+                errors,
+            ),
+            _source(
+                "pairs",
+                api_dexscreener_tokens_batch.coroutine(token_addresses=addresses, network=network),
+                errors,
+            ),
+            _source(
+                "security",
+                api_goplus_tokens_security_scan.coroutine(
+                    token_addresses=addresses, chain_id=chain_id
+                ),
+                errors,
+            ),
+        )
+    prices = (prices or {}).get("tokens") or {}
+    pairs = pairs or {}
+    # None (scan failed) is kept apart from "no flags raised".
+    security = (security.get("tokens") or {}) if security is not None else None
+    tokens = []
+    for r in rows:
+        a = r["token_address"]
+        if a is None:
+            tokens.append(dict(r))
+            continue
+        tokens.append(
+            _token_row(
+                r,
+                prices.get(a),
+                pairs.get(a),
+                security.get(a) if security is not None else None,
+            )
+        )
+    return {
+        "address": address,
+        "chain": chain,
+        "portfolio_source": (portfolio or {}).get("source"),
+        "total_value_usd": (portfolio or {}).get("total_value_usd"),
+        "tokens": tokens,
+        "other_tokens": other_tokens,
+        "history": history,
+        "flow_prices_usd": {
+            a: prices[a]["current_price_usd"]
+            for a in flow_tokens
+            if a in prices and prices[a].get("current_price_usd") is not None
+        },
+        "errors": errors,
+    }
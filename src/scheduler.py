@@ -0,0 +1,115 @@
+"""Rate-limit-aware scheduling of tool calls.
+
+Before a batch of tool calls is executed, the executor asks each provider's
+token bucket how long until the call could start (calls to the same provider
+queue behind each other, bulk and history tools counting for every upstream
+request they make, see REQUESTS_PER_CALL). Ready calls run straight away; calls that can start
+within `AgentState.max_schedule_wait` seconds are started when their bucket
+refills, while the others run; calls further out are answered with a
+"scheduled" message and run on a later tools step, their result being delivered
+to the LLM then. The LLM never has to sleep to wait for a quota.
+"""
+
+import json
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+from src.providers import alchemy, coingecko, dexscreener, goplus, moralis
+from src.providers.client import PROVIDER_CLIENTS
+from src.providers.portfolio import primary_provider
+
+# Tools whose name does not say which provider they spend.
+TOOL_PROVIDERS: Dict[str, Callable[[], str]] = {
+    "api_portfolio": primary_provider,
+}
+
+
+def _batches(arg: str, size: int) -> Callable[[Dict[str, Any]], int]:
+    def count(args: Dict[str, Any]) -> int:
+        items = args.get(arg) or []
+        if isinstance(items, str):
+            items = [i for i in items.split(",") if i.strip()]
+        return max(1, math.ceil(len(items) / size))
+
+    return count
+
+
+def _pages(arg: str, default: int, page_size: int) -> Callable[[Dict[str, Any]], int]:
+    return lambda args: max(1, math.ceil((args.get(arg) or default) / page_size))
+
+
+# Upstream requests made by one call, for tools that make more than one: bulk
+# tools split their input in chunks, history tools walk pages (upper bounds,
+# cached chunks and stored pages cost nothing).
+REQUESTS_PER_CALL: Dict[str, Callable[[Dict[str, Any]], int]] = {
+    "api_coingecko_token_prices": _batches("token_addresses", coingecko.MAX_IDS_PER_REQUEST),
+    "api_dexscreener_token_data": _batches(
+        "token_addresses", dexscreener.MAX_ADDRESSES_PER_REQUEST
+    ),
+    "api_dexscreener_tokens_batch": _batches(
+        "token_addresses", dexscreener.MAX_ADDRESSES_PER_REQUEST
+    ),
+    "api_goplus_tokens_security_scan": _batches(
+        "token_addresses", goplus.MAX_ADDRESSES_PER_REQUEST
+    ),
+    "api_moralis_wallet_history_summary": _pages(
+        "max_transactions", 1000, moralis.HISTORY_PAGE_SIZE
+    ),
+    "api_alchemy_tx_history": _pages("limit", 50, alchemy.HISTORY_PAGE_SIZE),
+}
+
+
+def provider_of(tool_name: str) -> Optional[str]:
+    """Provider whose quota an `api_<provider>_*` tool (or one in TOOL_PROVIDERS) spends."""
+    if tool_name in TOOL_PROVIDERS:
+        provider = TOOL_PROVIDERS[tool_name]()
+        return provider if provider in PROVIDER_CLIENTS else None
+    parts = tool_name.split("_")
+    if len(parts) > 2 and parts[0] == "api" and parts[1] in PROVIDER_CLIENTS:
+        return parts[1]
+    return None
+
+
+def requests_of(tool_name: str, args: Dict[str, Any]) -> int:
+    estimate = REQUESTS_PER_CALL.get(tool_name)
+    return estimate(args or {}) if estimate is not None else 1
+
+
+async def call_etas(calls: List[Dict[str, Any]]) -> List[float]:
+    """
+    Seconds until each call (`{"name", "args"}`) could start, in order, given the
+    current buckets. A call queues behind every request of the calls before it.
+    """
+    queued: Dict[str, int] = {}
+    etas = []
+    for call in calls:
+        provider = provider_of(call["name"])
+        if provider is None:
+            etas.append(0.0)
+            continue
+        etas.append(await PROVIDER_CLIENTS[provider].eta(queued.get(provider, 0)))
+        queued[provider] = queued.get(provider, 0) + requests_of(call["name"], call.get("args"))
+    return etas
+
+
+def scheduled_reply(tool_name: str, eta: float) -> str:
+    """ToolMessage content for a call deferred to a later step."""
+    return json.dumps(
+        {
+            "status": "scheduled",
+            "eta_seconds": round(eta, 1),
+            "message": (
+                f"The {provider_of(tool_name)} rate limit is exhausted. The call will run "
+                "automatically and its result will be delivered in a later message; "
+                "continue with other work meanwhile, do not call it again."
+            ),
+        }
+    )
+
+
+def delivered_content(call: Dict[str, Any], content: Any) -> str:
+    """Message content delivering the result of a previously scheduled call."""
+    return (
+        f"Result of the scheduled call {call['name']}({json.dumps(call['args'])}), "
+        f"tool_call_id {call['id']}: {content}"
+    )
@@ -17,7 +17,10 @@ from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from langchain_core.runnables import RunnableConfig
 
 from src.agent import AgentState, build_graph
+from src.providers.base import provider_stats
+from src.providers.client import aclose_http_client
 from src.logging import configure_logging
+from src.utils import TOKEN_COUNTS
 
 logger = logging.getLogger("defi_agent")
 
@@ -57,6 +60,7 @@ async def lifespan(app: FastAPI):
         app.state.checkpointer = checkpointer
         yield
         await pool.close()
+        await aclose_http_client()
 
 
 app = FastAPI(title="DeFi Risk Agent API", lifespan=lifespan)
@@ -72,7 +76,12 @@ tasks: dict[str, dict[str, Any]] = {}
 
 
 def _start_job(
-    request: Request, address: str, model: str = "gpt-4o", temperature: float = 0.0
+    request: Request,
+    address: str,
+    model: str = "gpt-4o",
+    temperature: float = 0.0,
+    prefetch: bool = True,
+    fast: bool = False,
 ):
     """Prepare structures to run a job in the background coroutine."""
     task_id = str(uuid4())
@@ -93,6 +102,9 @@ def _start_job(
                 max_messages=7,
                 model_name=model,
                 temperature=temperature,
+                prefetch=prefetch,
+                fast_path=fast,
+                stream=True,
             )
             app_graph = build_graph(
                 model=model,
@@ -101,9 +113,13 @@ def _start_job(
             )
             cfg = RunnableConfig(configurable={"thread_id": task_id})
             final_state: dict[str, Any] | None = None
-            async for state_dict in app_graph.astream(
-                init_state, cfg, stream_mode="values"
+            async for mode, state_dict in app_graph.astream(
+                init_state, cfg, stream_mode=["values", "custom"]
             ):
+                if mode == "custom":
+                    # LLM token and tool-call deltas, see src.agent._astream_llm
+                    await queue.put({"type": "delta", "payload": state_dict})
+                    continue
                 # Keep reference to the latest state so we can inspect it after the loop
                 final_state = state_dict
                 # Try to detect the next tool(s) that the AI wants to call so the
@@ -198,6 +214,19 @@ def _start_job(
     return task_id
 
 
+def _flag(payload: dict[str, Any], key: str, default: bool) -> bool:
+    """Boolean option of /run: a JSON bool, or one of true/1/yes, false/0/no."""
+    value = payload.get(key, default)
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "1", "yes"):
+        return True
+    if text in ("false", "0", "no"):
+        return False
+    raise HTTPException(status_code=400, detail=f"'{key}' must be a boolean")
+
+
 @app.post("/run")
 async def run_job(request: Request, payload: dict[str, Any]):
     address = payload.get("address")
@@ -205,8 +234,15 @@ async def run_job(request: Request, payload: dict[str, Any]):
         raise HTTPException(status_code=400, detail="'address' is required")
     model = payload.get("model", "gpt-4o")
     temperature = float(payload.get("temperature", 0.0))
+    prefetch = _flag(payload, "prefetch", True)
+    fast = _flag(payload, "fast", False)
     task_id = _start_job(
-        request=request, address=address, model=model, temperature=temperature
+        request=request,
+        address=address,
+        model=model,
+        temperature=temperature,
+        prefetch=prefetch,
+        fast=fast,
     )
     return JSONResponse({"task_id": task_id})
 
@@ -221,6 +257,11 @@ async def _event_generator(task_id: str) -> AsyncGenerator[str, None]:
         if message["type"] == "progress":
             data = json.dumps(message["payload"], default=str)
             yield f"event: progress\ndata: {data}\n\n"
+        elif message["type"] == "delta":
+            data = json.dumps(message["payload"], default=str)
+            yield f"event: delta\ndata: {data}\n\n"
+            # Deltas come in bursts, no need to pause between them
+            continue
         elif message["type"] == "result":
             data = json.dumps(message["payload"], default=str)
             yield f"event: result\ndata: {data}\n\n"
@@ -236,6 +277,12 @@ async def _event_generator(task_id: str) -> AsyncGenerator[str, None]:
         await asyncio.sleep(0.01)
 
 
+@app.get("/stats")
+async def stats():
+    """Provider-layer counters (cache hits, coalesced calls, ...) and token count cache."""
+    return JSONResponse({**provider_stats(), "token_counts": TOKEN_COUNTS.stats()})
+
+
 @app.get("/events/{task_id}")
 async def events(task_id: str, request: Request):
     async def _wrap_gen():
@@ -1,63 +1,25 @@
 from tiktoken.core import Encoding
 
 
+import ast
 import functools
-import time
-from collections import defaultdict, deque
-from typing import Annotated
+import hashlib
+import math
+import operator
+import threading
+from collections import OrderedDict
+from typing import Annotated, Dict, Tuple
 
 import tiktoken
 
+# Distinct texts whose token count is remembered, least recently used evicted.
+TOKEN_COUNT_CACHE_SIZE = 4096
+
 
 def get_prompts_dir():
     return "src/prompts/"
 
 
-# A dictionary to store deques of timestamps for each function.
-# The key is the function object itself.
-API_CALL_TIMESTAMPS_BY_FUNC = defaultdict(deque)
-
-
-def rate_limit(max_calls: int, period_seconds: int):
-    """
-    Decorator to enforce a rate limit on function calls.
-    This limit is applied on a per-function basis, allowing different
-    APIs to have their own independent rate limits.
-    Blocks until the call can be made without violating the limit.
-    """
-
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # Get the specific deque for the function being called.
-            timestamps = API_CALL_TIMESTAMPS_BY_FUNC[func]
-
-            # Remove timestamps older than the defined period.
-            now = time.time()
-            while timestamps and timestamps[0] < now - period_seconds:
-                timestamps.popleft()
-
-            # If the number of calls exceeds the maximum, calculate wait time.
-            if len(timestamps) >= max_calls:
-                time_to_wait = timestamps[0] + period_seconds - now
-                if time_to_wait > 0:
-                    print(
-                        f"Rate limit reached for {func.__name__}. Waiting for {time_to_wait:.2f} seconds."
-                    )
-                    time.sleep(time_to_wait)
-
-            # Record the new call timestamp and execute the function.
-            API_CALL_TIMESTAMPS_BY_FUNC[func].append(time.time())
-            return func(*args, **kwargs)
-
-        from typing import Annotated as _A
-
-        wrapper.__globals__.setdefault("Annotated", _A)
-        return wrapper
-
-    return decorator
-
-
 def str_to_float(value: str) -> float:
     """
     Convert a string representing a number into a Python float.
@@ -94,14 +56,189 @@ def str_to_float(value: str) -> float:
     raise ValueError(f"Cannot convert '{value}' to float")
 
 
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str) -> Encoding:
+    """Tokenizer for `model`, built once per process."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class TokenCounts:
+    """
+    Memoized token counts, keyed by encoding and a hash of the text.
+
+    The same messages are counted on every turn (windowing, truncation, logging),
+    so each distinct text is only encoded once.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_COUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._counts: OrderedDict[Tuple[str, bytes], int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str, model: str) -> int:
+        encoding = get_encoding(model)
+        key = (encoding.name, hashlib.blake2b(text.encode(), digest_size=16).digest())
+        with self._lock:
+            n = self._counts.get(key)
+            if n is not None:
+                self._counts.move_to_end(key)
+                self.hits += 1
+                return n
+            self.misses += 1
+        # Tool results may contain special-token text such as "<|endoftext|>".
+        n = len(encoding.encode(text, disallowed_special=()))
+        with self._lock:
+            self._counts[key] = n
+            if len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+        return n
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._counts),
+        }
+
+
+TOKEN_COUNTS = TokenCounts()
+
+
 def count_tokens(text: str, model: str) -> int:
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    return len(tokens)
+    return TOKEN_COUNTS.count(text, model)
 
 
 def truncate_to_n_tokens(text: str, model_name: str, max_tokens: int) -> str:
-    encoding = tiktoken.encoding_for_model(model_name)
+    encoding = get_encoding(model_name)
     tokens = encoding.encode(text)
     truncated = tokens[:max_tokens]
     return encoding.decode(truncated)
+
+
+# Functions available in evaluate_expression; each takes numbers or lists of numbers.
+def _flatten(args) -> list[float]:
+    out = []
+    for a in args:
+        out.extend(_flatten(a) if isinstance(a, (list, tuple)) else [a])
+    return out
+
+
+def _mean(*args) -> float:
+    values = _flatten(args)
+    if not values:
+        raise ValueError("mean() of nothing")
+    return sum(values) / len(values)
+
+
+def _units(raw: float, decimals: float) -> float:
+    if abs(decimals) > MAX_DECIMALS:
+        raise ValueError(f"More than {MAX_DECIMALS} decimals")
+    return raw / 10.0 ** int(decimals)
+
+
+MATH_FUNCTIONS = {
+    "sum": lambda *args: float(sum(_flatten(args))),
+    "min": lambda *args: min(_flatten(args)),
+    "max": lambda *args: max(_flatten(args)),
+    "mean": _mean,
+    "abs": abs,
+    "round": lambda x, digits=0: round(x, int(digits)),
+    # Raw integer balance with `decimals` decimals, e.g. units('0x1bc16d674ec80000', 18) == 2.0
+    "units": _units,
+}
+MAX_EXPRESSION_LENGTH = 10_000
+MAX_EXPONENT = 400
+MAX_DECIMALS = 80
+
+
+def evaluate_expression(expression: str, names: dict[str, float] | None = None) -> float:
+    """
+    Evaluate an arithmetic expression without `eval`.
+
+    Supports numbers, + - * / // % **, parentheses, lists, the functions in
+    ``MATH_FUNCTIONS`` and references to ``names``. Quoted strings are numbers
+    in any format accepted by ``str_to_float`` (hex balances, Fortran exponents).
+    Operators only take numbers, and compute in floats so that a result too large
+    raises ``OverflowError`` instead of growing an unbounded integer. Anything
+    else raises ``ValueError``.
+    """
+    binary = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow,
+    }
+    unary = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+    names = names or {}
+
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"Invalid expression: {exc.msg}") from None
+
+    def number(value) -> float:
+        if isinstance(value, list):
+            raise ValueError("Operators take numbers, not lists; use sum(), mean(), ...")
+        return float(value)
+
+    def ev(node):
+        if isinstance(node, ast.Expression):
+            return ev(node.body)
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                return str_to_float(node.value)
+            if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+                return node.value
+        elif isinstance(node, ast.Name):
+            if node.id in names:
+                return names[node.id]
+            raise ValueError(f"Unknown name '{node.id}'")
+        elif isinstance(node, (ast.List, ast.Tuple)):
+            return [ev(e) for e in node.elts]
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in unary:
+            return unary[type(node.op)](number(ev(node.operand)))
+        elif isinstance(node, ast.BinOp) and type(node.op) in binary:
+            left, right = number(ev(node.left)), number(ev(node.right))
+            if isinstance(node.op, ast.Pow) and abs(right) > MAX_EXPONENT:
+                raise ValueError(f"Exponent larger than {MAX_EXPONENT}")
+            try:
+                result = binary[type(node.op)](left, right)
+            except ZeroDivisionError:
+                raise ValueError("Division by zero") from None
+            if isinstance(result, complex):
+                raise ValueError("Result is not a real number")
+            if math.isinf(result):
+                raise OverflowError("Result too large")
+            return result
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in MATH_FUNCTIONS
+            and not node.keywords
+        ):
+            args = [ev(a) for a in node.args]
+            try:
+                return MATH_FUNCTIONS[node.func.id](*args)
+            except TypeError:
+                raise ValueError(f"Invalid arguments for {node.func.id}()") from None
+        raise ValueError(f"Unsupported syntax: {ast.unparse(node)}")
+
+    result = ev(tree)
+    if isinstance(result, list):
+        raise ValueError("Expression evaluates to a list, wrap it in sum(), mean(), ...")
+    result = float(result)
+    if math.isinf(result):
+        raise OverflowError("Result too large")
+    return result
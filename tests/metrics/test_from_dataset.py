@@ -0,0 +1,93 @@
+import pytest
+from src.metrics.from_dataset import (
+    MetricUnavailable,
+    build_metric_input,
+    low_tvl_protocol_input,
+    portfolio_churn_rate_input,
+    portfolio_concentration_input,
+)
+
+WETH = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+
+
+def dataset(**extra):
+    return {
+        "tokens": [
+            {"token_address": None, "symbol": "ETH", "price_usd": 2000.0, "value_usd": 2000.0},
+            {
+                "token_address": WETH,
+                "symbol": "WETH",
+                "price_usd": 2000.0,
+                "value_usd": 1000.0,
+                "dex": "uniswap",
+                "liquidity_usd": 5e7,
+            },
+            {"token_address": "0xspam", "value_usd": 50.0, "possible_spam": True},
+        ],
+        "history": {
+            "days": 90,
+            "outgoing_by_token": {WETH: {"amount": 0.5}},
+            "incoming_by_token": {},
+            "first_timestamp": "2025-01-01T00:00:00+00:00",
+            "last_timestamp": "2025-01-11T00:00:00+00:00",
+            "truncated": False,
+        },
+        "errors": {},
+        **extra,
+    }
+
+
+def test_concentration_ignores_spam():
+    """Only priced, non-spam holdings count."""
+    assert portfolio_concentration_input(dataset()).asset_values == [2000.0, 1000.0]
+
+
+def test_failed_source_makes_metric_unavailable():
+    """A metric is not computed from a source listed under `errors`."""
+    data = dataset(errors={"history": "timeout"})
+    with pytest.raises(MetricUnavailable, match="history data failed: timeout"):
+        build_metric_input("metric_calculate_portfolio_churn_rate", data)
+    assert build_metric_input("metric_calculate_portfolio_concentration", data)
+
+
+def test_low_tvl_needs_protocol_positions():
+    """DEX pool liquidity of plain token holdings is not taken for protocol TVL."""
+    with pytest.raises(MetricUnavailable):
+        low_tvl_protocol_input(dataset())
+    data = dataset()
+    data["tokens"][1].update(protocol="Aave v3", protocol_tvl_usd=1e10)
+    (position,) = low_tvl_protocol_input(data).positions
+    assert position.protocol_name == "Aave v3" and position.protocol_tvl_usd == 1e10
+
+
+def test_churn_period_is_the_fetched_span_when_truncated():
+    """A history cut short by its transaction cap covers less than the requested days."""
+    data = dataset()
+    churn = portfolio_churn_rate_input(data)
+    assert churn.period_days == 90
+    assert churn.end_period_value_usd == 3000.0
+    assert [t.usd_value for t in churn.outgoing_transactions] == [1000.0]
+    data["history"]["truncated"] = True
+    assert portfolio_churn_rate_input(data).period_days == 10
+
+
+def test_tokens_no_longer_held_are_priced_from_the_flows():
+    """A fully sold token is valued at its fetched price, not at zero."""
+    data = dataset(flow_prices_usd={"0xsold": 10.0})
+    data["history"]["outgoing_by_token"]["0xsold"] = {"amount": 30.0, "transfers": 1}
+    churn = portfolio_churn_rate_input(data)
+    assert sorted(t.usd_value for t in churn.outgoing_transactions) == [300.0, 1000.0]
+    assert churn.start_period_value_usd == 4300.0
+
+
+def test_churn_unavailable_when_outflows_are_mostly_unpriced():
+    data = dataset()
+    data["history"]["outgoing_by_token"]["0xsold"] = {"amount": 30.0, "transfers": 4}
+    with pytest.raises(MetricUnavailable, match="4 of 5 outgoing transfers"):
+        portfolio_churn_rate_input(data)
+
+
+def test_other_tokens_tail_counts_towards_value_and_concentration():
+    data = dataset(other_tokens={"count": 4, "spam": 2, "value_usd": 400.0})
+    assert portfolio_concentration_input(data).asset_values == [2000.0, 1000.0] + [100.0] * 4
+    assert portfolio_churn_rate_input(data).end_period_value_usd == 3400.0
@@ -1,5 +1,9 @@
+import asyncio
+
 import pytest
+from src.providers import alchemy
 from src.providers.alchemy import api_alchemy_portfolio, api_alchemy_tx_history
+from src.providers.history_store import HistoryStore
 
 # A known address with activity
 TEST_ADDRESS = "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045" # vitalik.eth
@@ -18,3 +22,34 @@ def test_api_alchemy_tx_history():
     assert isinstance(result, dict)
     assert "transactions" in result
     assert len(result["transactions"]) == 5
+
+
+def test_forward_walk_resumes_without_gaps(tmp_path, monkeypatch):
+    """A capped forward walk keeps newest_block until it meets stored history."""
+    store = HistoryStore(str(tmp_path / "store.db"))
+    address, network = TEST_ADDRESS.lower(), "eth-mainnet"
+    store.save_transactions(
+        address, network, [{"hash": hex(100), "block_number": 100, "payload": {}}], 100, None, True
+    )
+    remote = [[105, 104], [103, 102], [101, 100], [99, 98]]
+
+    async def page(address, network, after=None):
+        n = int(after or 0)
+        return {
+            "transactions": [{"hash": hex(b), "blockNumber": b} for b in remote[n]],
+            "after": str(n + 1) if n + 1 < len(remote) else None,
+        }
+
+    monkeypatch.setattr(alchemy, "get_history_store", lambda: store)
+    monkeypatch.setattr(alchemy, "_tx_history_page", page)
+    monkeypatch.setattr(alchemy, "MAX_FORWARD_PAGES", 2)
+    monkeypatch.setattr(alchemy, "SYNC_FRESH_SECONDS", -1)
+
+    state = asyncio.run(alchemy.sync_alchemy_tx_history(address, network))
+    assert state["newest_block"] == 100
+    assert (state["forward_cursor"], state["forward_block"]) == ("2", 105)
+
+    state = asyncio.run(alchemy.sync_alchemy_tx_history(address, network))
+    assert state["newest_block"] == 105 and state["forward_cursor"] is None
+    assert store.count_transactions(address, network) == 6
+    store.close()
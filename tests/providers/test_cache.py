@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+from src.providers import cache as cache_module
+from src.providers.cache import ResponseCache, cached, make_key
+
+USDC_ADDRESS = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = ResponseCache(str(tmp_path / "cache.db"))
+    yield c
+    c.close()
+
+
+def test_make_key_normalizes_addresses():
+    """Checksummed and lowercase addresses map to the same key."""
+    assert make_key("t", {"address": USDC_ADDRESS.upper().replace("0X", "0x")}) == make_key(
+        "t", {"address": USDC_ADDRESS}
+    )
+    assert make_key("t", {"address": USDC_ADDRESS}) != make_key("u", {"address": USDC_ADDRESS})
+
+
+def test_roundtrip_and_counters(cache):
+    """Values survive a set/get roundtrip, compressed or not, and are counted."""
+    payload = {"symbol": "usdc", "blob": "x" * 2000}
+    assert cache.get("k") == (False, None)
+    cache.set("k", "tool", payload, ttl=60)
+    assert cache.get("k") == (True, payload)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["bytes"] < 2000  # compressed
+
+
+def test_expired_entries_are_misses(cache):
+    """Entries past their TTL are not served."""
+    cache.set("k", "tool", {"a": 1}, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("k") == (False, None)
+
+
+def test_lru_eviction(tmp_path):
+    """The least recently used entry is evicted once the size cap is exceeded."""
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=250, compress=False)
+    cache.set("a", "tool", "a" * 100, ttl=60)
+    cache.set("b", "tool", "b" * 100, ttl=60)
+    cache.get("a")
+    cache.set("c", "tool", "c" * 100, ttl=60)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a")[0] and cache.get("c")[0]
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_persists_across_instances(tmp_path):
+    """A new cache instance on the same file sees earlier entries."""
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(path)
+    first.set("k", "tool", [1, 2, 3], ttl=60)
+    first.close()
+    second = ResponseCache(path)
+    assert second.get("k") == (True, [1, 2, 3])
+    second.close()
+
+
+def test_cacheable_predicate(cache, monkeypatch):
+    """Results rejected by the decorator's predicate are fetched again next time."""
+    monkeypatch.setattr(cache_module, "get_cache", lambda: cache)
+    calls = []
+
+    @cached("goplus", cacheable=lambda value: value.get("code") == 1)
+    async def lookup(address: str):
+        calls.append(address)
+        return {"code": 1 if address == "ok" else 2, "result": {}}
+
+    for address in ("ok", "ok", "bad", "bad"):
+        asyncio.run(lookup(address))
+    assert calls == ["ok", "bad", "bad"]
@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from src.providers import cassette as cassette_module
+from src.providers.cassette import Cassette, CassetteMiss, reference_time, request_key
+
+
+def test_record_then_replay_in_order(tmp_path):
+    """Recorded responses come back in order, the last one repeating."""
+    path = str(tmp_path / "run.jsonl.gz")
+    key = request_key("p", "get", "/x", {"params": {"a": 1}})
+    recorder = Cassette(path, "record")
+    for status in (429, 200):
+        recorder.record(key, "p", "GET", "/x", httpx.Response(status, json={"s": status}))
+
+    player = Cassette(path, "replay")
+    statuses = [player.replay(key, "GET", "https://p/x").status_code for _ in range(3)]
+    assert statuses == [429, 200, 200]
+    assert player.replay(key, "GET", "https://p/x").json() == {"s": 200}
+
+
+def test_unknown_request_is_a_miss(tmp_path):
+    """Replay never falls back to the network."""
+    path = str(tmp_path / "run.jsonl.gz")
+    Cassette(path, "record").record("k", "p", "GET", "/x", httpx.Response(200))
+    with pytest.raises(CassetteMiss):
+        Cassette(path, "replay").replay("other", "GET", "https://p/y")
+
+
+def test_key_ignores_address_case():
+    """Checksummed and lower-case addresses hit the same recording."""
+    address = "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045"
+    assert request_key("p", "GET", "/t", {"params": {"a": address}}) == request_key(
+        "p", "get", "/t", {"params": {"a": address.lower()}}
+    )
+
+
+def test_replay_uses_recording_time(tmp_path, monkeypatch):
+    """Time windows are computed from when the cassette was recorded, not from now."""
+    path = str(tmp_path / "run.jsonl.gz")
+    monkeypatch.setattr(cassette_module.time, "time", lambda: 1000.0)
+    Cassette(path, "record").record("k", "p", "GET", "/x", httpx.Response(200))
+    monkeypatch.setattr(cassette_module.time, "time", lambda: 5000.0)
+    monkeypatch.setattr(cassette_module, "_cassette", Cassette(path, "replay"))
+    monkeypatch.setattr(cassette_module, "_configured", True)
+    assert reference_time() == 1000.0
+    monkeypatch.setattr(cassette_module, "_cassette", None)
+    assert reference_time() == 5000.0
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+from src.providers.circuit import CircuitBreaker, ProviderUnavailable
+
+
+def test_opens_after_threshold_and_fails_fast():
+    """Consecutive failures open the circuit; calls are then rejected."""
+    breaker = CircuitBreaker("p", failure_threshold=2, cooldown_seconds=60)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(ProviderUnavailable):
+        breaker.before_request()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_failures():
+    """A success in between keeps the circuit closed."""
+    breaker = CircuitBreaker("p", failure_threshold=2, cooldown_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_probe():
+    """After the cool-down one probe goes through; its result decides the state."""
+    breaker = CircuitBreaker("p", failure_threshold=1, cooldown_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    breaker.before_request()
+    with pytest.raises(ProviderUnavailable):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.02)
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
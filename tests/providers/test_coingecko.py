@@ -1,8 +1,16 @@
+import asyncio
+
 import pytest
-from src.providers.coingecko import api_coingecko_contract, api_coingecko_coin_data
+from src.providers import coingecko
+from src.providers.coingecko import (
+    api_coingecko_contract,
+    api_coingecko_coin_data,
+    api_coingecko_token_prices,
+)
 
 # Known contract and coin for testing
 USDC_CONTRACT = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+WETH_CONTRACT = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
 BITCOIN_ID = "bitcoin"
 
 def test_api_coingecko_contract():
@@ -20,3 +28,31 @@ def test_api_coingecko_coin_data():
     assert "symbol" in result
     assert result["symbol"].lower() == "btc"
     assert "market_cap_rank" in result
+
+def test_api_coingecko_token_prices():
+    """Test that several contracts are priced in bulk."""
+    result = api_coingecko_token_prices.invoke(
+        {"token_addresses": [USDC_CONTRACT, WETH_CONTRACT]}
+    )
+    assert set(result["tokens"]) == {USDC_CONTRACT, WETH_CONTRACT.lower()}
+    usdc = result["tokens"][USDC_CONTRACT]
+    assert usdc["symbol"].lower() == "usdc"
+    assert usdc["market_cap_rank"] is not None
+    assert "current_price_usd" in usdc
+
+def test_token_prices_addresses_sharing_a_coin(monkeypatch):
+    """Every address that resolves to the same coin id gets priced."""
+    old, new = "0x" + "1" * 40, "0x" + "2" * 40
+
+    async def index(chain):
+        return {old: "token", new: "token"}
+
+    async def markets(coin_ids):
+        return [{"id": "token", "symbol": "tkn", "current_price": 2.0}]
+
+    monkeypatch.setenv("PROVIDER_CACHE_DISABLED", "1")
+    monkeypatch.setattr(coingecko, "_contract_to_coin_id", index)
+    monkeypatch.setattr(coingecko, "_markets", markets)
+    result = asyncio.run(api_coingecko_token_prices.coroutine([old, new]))
+    assert set(result["tokens"]) == {old, new}
+    assert result["tokens"][new]["current_price_usd"] == 2.0
@@ -1,8 +1,13 @@
 import pytest
-from src.providers.dexscreener import api_dexscreener_token_data
+from src.providers.dexscreener import (
+    _pair_key,
+    api_dexscreener_token_data,
+    api_dexscreener_tokens_batch,
+)
 
 # Known token address for testing
 WETH_ADDRESS = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+USDC_ADDRESS = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
 
 def test_api_dexscreener_token_data():
     """Test that we can fetch token data from DexScreener."""
@@ -13,3 +18,25 @@ def test_api_dexscreener_token_data():
     assert isinstance(result, list)
     assert "pairAddress" in result[0]
     assert result[0]["baseToken"]["symbol"] == "WETH"
+
+def test_api_dexscreener_tokens_batch():
+    """Test that pairs for several tokens are fetched and grouped per token."""
+    result = api_dexscreener_tokens_batch.invoke({
+        "network": "ethereum",
+        "token_addresses": [WETH_ADDRESS, USDC_ADDRESS, WETH_ADDRESS.lower()],
+    })
+    assert isinstance(result, dict)
+    assert set(result) == {WETH_ADDRESS.lower(), USDC_ADDRESS}
+    pair_addresses = [p["pairAddress"] for p in result[USDC_ADDRESS]]
+    assert len(pair_addresses) == len(set(pair_addresses))
+
+def test_pair_key_without_address():
+    """Pairs lacking a pairAddress are told apart by dex and tokens, not merged."""
+    tokens = {"baseToken": {"address": WETH_ADDRESS}, "quoteToken": {"address": USDC_ADDRESS}}
+    pairs = [
+        {"chainId": "ethereum", "dexId": "uniswap", **tokens},
+        {"chainId": "ethereum", "dexId": "sushiswap", **tokens},
+        {"chainId": "ethereum", "dexId": "uniswap", "pairAddress": None, **tokens},
+    ]
+    assert len({_pair_key(p) for p in pairs}) == 2
+    assert _pair_key({"pairAddress": "0xABC"}) == _pair_key({"pairAddress": "0xabc"})
@@ -1,8 +1,13 @@
 import pytest
-from src.providers.goplus import api_goplus_token_security
+from src.providers.goplus import (
+    _security_row,
+    api_goplus_token_security,
+    api_goplus_tokens_security_scan,
+)
 
 # Known token address for testing
 USDC_ADDRESS = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+WETH_ADDRESS = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
 
 def test_api_goplus_token_security():
     """Test that we can fetch token security data from GoPlus."""
@@ -11,3 +16,22 @@ def test_api_goplus_token_security():
     assert "result" in result
     assert USDC_ADDRESS.lower() in result["result"]
     assert "is_open_source" in result["result"][USDC_ADDRESS.lower()]
+
+def test_api_goplus_tokens_security_scan():
+    """Test that several tokens are scanned into a compact flag table."""
+    result = api_goplus_tokens_security_scan.invoke(
+        {"token_addresses": [USDC_ADDRESS, WETH_ADDRESS]}
+    )
+    assert set(result["tokens"]) == {USDC_ADDRESS, WETH_ADDRESS.lower()}
+    usdc = result["tokens"][USDC_ADDRESS]
+    assert usdc["is_honeypot"] is False
+    assert usdc["is_closed_source"] is False
+
+
+def test_security_row_flags_are_risks():
+    """Flags where GoPlus' "1" is safe are inverted, so True always means a risk."""
+    row = _security_row({"is_honeypot": "0", "is_open_source": "0", "is_in_dex": "1"})
+    assert row["is_honeypot"] is False
+    assert row["is_closed_source"] is True
+    assert row["not_in_dex"] is False
+    assert row["is_mintable"] is None
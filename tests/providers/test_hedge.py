@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from src.providers.hedge import LatencyTracker, hedged
+
+
+def leg(name, seconds, fail=False):
+    async def call():
+        await asyncio.sleep(seconds)
+        if fail:
+            raise RuntimeError(name)
+        return name
+
+    return name, call
+
+
+def test_fast_primary_is_not_hedged():
+    """A primary answering within the delay never starts the secondary."""
+    assert asyncio.run(hedged(leg("a", 0), leg("b", 0), delay=0.5)) == ("a", "a", False)
+
+
+def test_slow_primary_is_hedged():
+    """The secondary wins when the primary is slower than the delay."""
+    assert asyncio.run(hedged(leg("a", 1), leg("b", 0), delay=0.05)) == ("b", "b", True)
+
+
+def test_failing_primary_falls_back_and_both_failing_raises():
+    """A primary error starts the secondary at once; two errors raise the primary's."""
+    assert asyncio.run(hedged(leg("a", 0, fail=True), leg("b", 0), delay=5))[0] == "b"
+    with pytest.raises(RuntimeError, match="a"):
+        asyncio.run(hedged(leg("a", 0, fail=True), leg("b", 0, fail=True), delay=5))
+
+
+def test_losing_and_failing_legs_are_timed(monkeypatch):
+    """Latency is recorded for the cancelled loser and for failed legs, not just winners."""
+    tracker = LatencyTracker()
+    monkeypatch.setattr("src.providers.hedge.LATENCY", tracker)
+    asyncio.run(hedged(leg("a", 1), leg("b", 0), delay=0.05))
+    asyncio.run(hedged(leg("c", 0, fail=True), leg("d", 0), delay=5))
+    assert set(tracker.stats()) == {"a", "b", "c", "d"}
+    assert tracker._samples["a"][0] >= 0.05
+
+
+def test_loser_is_cancelled():
+    """The slower leg's coroutine is cancelled once the other leg wins."""
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        result = await hedged(("a", slow), leg("b", 0), delay=0.01)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run())[0] == "b"
+    assert cancelled == [True]
+
+
+def test_percentile_needs_samples():
+    """Percentiles are only reported once enough samples were recorded."""
+    tracker = LatencyTracker()
+    tracker.record("p", 1.0)
+    assert tracker.percentile("p", 90) is None
+    for s in [0.1, 0.2, 0.3, 0.4, 5.0]:
+        tracker.record("p", s)
+    assert tracker.percentile("p", 0) == 0.1
+    assert tracker.percentile("p", 100) == 5.0
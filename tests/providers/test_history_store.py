@@ -0,0 +1,66 @@
+import pytest
+from src.providers.history_store import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = HistoryStore(str(tmp_path / "store.db"))
+    yield s
+    s.close()
+
+
+def test_unknown_walk(store):
+    """A walk that was never started is reported as missing."""
+    assert store.get_walk("w") is None
+
+
+def test_pages_and_cursor_are_persisted(tmp_path):
+    """Pages and the next cursor survive a restart, so the walk can resume."""
+    path = str(tmp_path / "store.db")
+    first = HistoryStore(path)
+    first.reset_walk("w")
+    first.add_page("w", 0, [{"hash": "0x1"}], cursor="c1", done=False)
+    first.add_page("w", 1, [{"hash": "0x2"}], cursor="c2", done=False)
+    first.close()
+
+    second = HistoryStore(path)
+    walk = second.get_walk("w")
+    assert walk["cursor"] == "c2"
+    assert not walk["done"]
+    assert walk["pages"] == [[{"hash": "0x1"}], [{"hash": "0x2"}]]
+    second.close()
+
+
+def test_reset_drops_pages(store):
+    """Resetting a walk forgets its pages and cursor."""
+    store.add_page("w", 0, [1, 2], cursor=None, done=True)
+    store.reset_walk("w")
+    walk = store.get_walk("w")
+    assert walk["pages"] == [] and walk["cursor"] is None and not walk["done"]
+
+
+def test_transactions_newest_first_with_sync_state(store):
+    """Transactions are upserted by hash and returned newest block first."""
+    txs = [
+        {"hash": "0xa", "block_number": 10, "payload": {"hash": "0xa"}},
+        {"hash": "0xb", "block_number": 12, "payload": {"hash": "0xb"}},
+    ]
+    store.save_transactions("0xABC", "eth-mainnet", txs, 12, "cur", complete=False)
+    store.save_transactions("0xabc", "eth-mainnet", txs[1:], 12, "cur", complete=False)
+
+    assert store.count_transactions("0xabc", "eth-mainnet") == 2
+    assert store.get_transactions("0xabc", "eth-mainnet", limit=1) == [{"hash": "0xb"}]
+    assert store.get_transactions("0xabc", "eth-mainnet", limit=5, offset=1) == [{"hash": "0xa"}]
+    state = store.get_sync_state("0xAbc", "eth-mainnet")
+    assert state["newest_block"] == 12 and state["backfill_cursor"] == "cur"
+    assert not state["complete"]
+    assert store.get_sync_state("0xabc", "base-mainnet") is None
+
+
+def test_forward_cursor_in_sync_state(store):
+    """The cursor of an unfinished forward walk round-trips with the sync state."""
+    store.save_transactions("0xabc", "eth-mainnet", [], 12, None, False, "fwd", 20)
+    state = store.get_sync_state("0xabc", "eth-mainnet")
+    assert (state["forward_cursor"], state["forward_block"]) == ("fwd", 20)
+    store.save_transactions("0xabc", "eth-mainnet", [], 20, None, False)
+    assert store.get_sync_state("0xabc", "eth-mainnet")["forward_cursor"] is None
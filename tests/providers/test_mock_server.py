@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.providers.client import base_url_for
+from src.providers.mock_server import app
+
+WALLET = "0xcB1C1FdE09f811B294172696404e88E658659905"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_synthetic_data_is_stable(client):
+    """The same wallet always gets the same portfolio, whatever the address case."""
+    first = client.get(f"/moralis/{WALLET}/erc20").json()
+    again = client.get(f"/moralis/{WALLET.lower()}/erc20").json()
+    assert first == again and len(first) >= 3
+    token = first[0]["token_address"]
+    security = client.get(f"/goplus/token_security/1?contract_addresses={token}").json()
+    assert token in security["result"]
+
+
+def test_history_pages_follow_cursor(client):
+    """Alchemy-style history pages chain through `after` until exhausted."""
+    body = {"addresses": [{"address": WALLET, "networks": ["eth-mainnet"]}], "limit": 50}
+    seen, after = [], None
+    while True:
+        page = client.post(
+            "/alchemy/transactions/history/by-address", json={**body, "after": after}
+        ).json()
+        seen += [tx["hash"] for tx in page["transactions"]]
+        after = page["after"]
+        if after is None:
+            break
+    assert len(seen) == len(set(seen)) == page["totalCount"]
+
+
+def test_base_url_overrides(monkeypatch):
+    """Per-provider URLs win over the shared mock URL, which wins over the default."""
+    assert base_url_for("goplus", "https://real") == "https://real"
+    monkeypatch.setenv("PROVIDER_BASE_URL", "http://localhost:8010/")
+    assert base_url_for("goplus", "https://real") == "http://localhost:8010/goplus"
+    monkeypatch.setenv("GOPLUS_BASE_URL", "http://other")
+    assert base_url_for("goplus", "https://real") == "http://other"
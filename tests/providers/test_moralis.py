@@ -1,7 +1,9 @@
 import pytest
 from src.providers.moralis import (
+    _summarize_history,
     api_moralis_wallet_portfolio,
     api_moralis_wallet_history,
+    api_moralis_wallet_history_summary,
 )
 
 TEST_ADDRESS = "0xcB1C1FdE09f811B294172696404e88E658659905"
@@ -23,3 +25,30 @@ def test_api_moralis_wallet_history():
     assert isinstance(result, dict)
     assert "result" in result
     assert "hash" in result["result"][0]
+
+
+def test_api_moralis_wallet_history_summary():
+    """Test that the history walk returns an aggregated summary."""
+    result = api_moralis_wallet_history_summary.invoke(
+        {"address": TEST_ADDRESS, "days": 365, "max_transactions": 150}
+    )
+    assert isinstance(result, dict)
+    assert 0 < result["transactions"] <= 150
+    assert "categories" in result
+    assert "outgoing_by_token" in result
+
+
+def test_summary_labels_counterparties_with_their_own_entity():
+    """The wallet's own entity label never names a counterparty."""
+    wallet = TEST_ADDRESS.lower()
+    transactions = [
+        {"from_address": wallet, "from_address_entity": "Me", "to_address": "0xa"},
+        {"from_address": "0xb", "to_address": wallet, "to_address_entity": "Me"},
+        {"from_address": "0xc", "from_address_entity": "Binance", "to_address": wallet},
+    ]
+    parties = _summarize_history(TEST_ADDRESS, transactions)["top_counterparties"]
+    assert {p["address"]: p["entity"] for p in parties} == {
+        "0xa": None,
+        "0xb": None,
+        "0xc": "Binance",
+    }
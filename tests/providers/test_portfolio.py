@@ -0,0 +1,12 @@
+import pytest
+from src.providers.portfolio import api_portfolio
+
+TEST_ADDRESS = "0xcB1C1FdE09f811B294172696404e88E658659905"
+
+
+def test_api_portfolio():
+    """Test that the hedged portfolio returns normalised rows from one provider."""
+    result = api_portfolio.invoke({"address": TEST_ADDRESS})
+    assert result["source"] in ("alchemy", "moralis")
+    assert len(result["tokens"]) > 0
+    assert {"token_address", "symbol", "balance", "value_usd"} <= set(result["tokens"][0])
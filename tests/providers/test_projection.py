@@ -0,0 +1,40 @@
+import asyncio
+
+from src.providers.projection import PROJECTION_STATS, project, projected
+
+
+def test_project_keeps_declared_fields():
+    """Only declared keys survive; lists are projected element-wise."""
+    raw = {
+        "data": {
+            "tokens": [
+                {"symbol": "A", "logo": "x.png", "prices": [{"value": "1", "ts": 1}]},
+                {"symbol": "B", "logo": None, "prices": []},
+            ],
+            "extra": 1,
+        }
+    }
+    spec = {"data": {"tokens": [{"symbol": True, "prices": [{"value": True}]}]}}
+    assert project(raw, spec) == {
+        "data": {"tokens": [{"symbol": "A", "prices": [{"value": "1"}]}, {"symbol": "B", "prices": []}]}
+    }
+
+
+def test_project_drops_nulls_and_empty_objects():
+    """Null values and objects with nothing left are dropped."""
+    raw = {"name": None, "meta": {"logo": "x"}, "price": False}
+    spec = {"name": True, "meta": {"symbol": True}, "price": {"rate": True}}
+    assert project(raw, spec) == {"price": False}
+
+
+def test_projected_records_savings():
+    """The decorator returns the slim payload and records what it saved."""
+
+    @projected({"keep": True}, name="test_fetch")
+    async def fetch():
+        return {"keep": 1, "drop": "y" * 1000}
+
+    assert asyncio.run(fetch()) == {"keep": 1}
+    row = PROJECTION_STATS.stats()["test_fetch"]
+    assert row["calls"] == 1
+    assert row["bytes_saved"] > 1000 and row["tokens_saved"] > 0
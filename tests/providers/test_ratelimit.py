@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from src.providers.ratelimit import (
+    LocalTokenBucket,
+    RateLimit,
+    RateLimiter,
+    bucket_key,
+    key_fingerprint,
+    limit_for,
+)
+
+
+def test_parse_spec():
+    """`calls/seconds[:burst]` specs are parsed into limits."""
+    limit = RateLimit.parse("30/60:5")
+    assert limit.capacity == 5
+    assert limit.refill_per_second == 0.5
+    assert RateLimit.parse("2/10").capacity == 2
+
+
+def test_bucket_key_depends_on_api_key():
+    """Different API keys of the same provider get different buckets."""
+    assert bucket_key("moralis", "a") != bucket_key("moralis", "b")
+    assert bucket_key("goplus") == "ratelimit:goplus:anon"
+
+
+def test_limit_per_api_key(monkeypatch):
+    """A key-specific override wins over the provider one, other keys keep theirs."""
+    monkeypatch.setenv("RATE_LIMIT_MORALIS", "5/1")
+    monkeypatch.setenv(f"RATE_LIMIT_MORALIS_{key_fingerprint('paid').upper()}", "100/1:20")
+    assert limit_for("moralis", "paid") == RateLimit(max_calls=100, period_seconds=1, burst=20)
+    assert limit_for("moralis", "free") == RateLimit(max_calls=5, period_seconds=1)
+    assert limit_for("moralis") == RateLimit(max_calls=5, period_seconds=1)
+
+
+def test_local_bucket_allows_burst_then_waits():
+    """A full bucket allows `burst` calls, then reports the time to refill."""
+    bucket = LocalTokenBucket()
+    limit = RateLimit(max_calls=2, period_seconds=10)
+    assert bucket.take("k", limit) == 0
+    assert bucket.take("k", limit) == 0
+    wait = bucket.take("k", limit)
+    assert 4.9 < wait <= 5
+
+
+def test_try_acquire_does_not_block():
+    """try_acquire falls back to local buckets without Redis and never sleeps."""
+    limiter = RateLimiter(redis_url=None)
+    limit = RateLimit(max_calls=1, period_seconds=60)
+
+    async def main():
+        return [await limiter.try_acquire("k", limit) for _ in range(2)]
+
+    (first_ok, _), (second_ok, wait) = asyncio.run(main())
+    assert first_ok and not second_ok
+    assert wait > 0
+    assert limiter.stats()["backend"] == "local"
+
+
+def test_block_delays_next_token():
+    """Blocking a bucket makes the next take wait for the requested time."""
+    bucket = LocalTokenBucket()
+    limit = RateLimit(max_calls=10, period_seconds=1)
+    bucket.block("k", limit, 2.0)
+    assert bucket.take("k", limit) == pytest.approx(2.0, abs=0.05)
+
+
+def test_available_does_not_take_tokens():
+    """Peeking at a bucket reports its tokens and leaves them in place."""
+    limiter = RateLimiter(redis_url=None)
+    limit = RateLimit(max_calls=1, period_seconds=60, burst=2)
+
+    async def scenario():
+        assert await limiter.available("k", limit) == pytest.approx(2.0)
+        await limiter.acquire("k", limit)
+        assert await limiter.available("k", limit) == pytest.approx(1.0, abs=0.01)
+        assert await limiter.available("k", limit) == pytest.approx(1.0, abs=0.01)
+        limiter.local.block("k", limit, 120.0)
+        assert await limiter.available("k", limit) < 0
+
+    asyncio.run(scenario())
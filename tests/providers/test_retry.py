@@ -0,0 +1,28 @@
+import email.utils
+import time
+
+import httpx
+import pytest
+from src.providers.retry import RetryPolicy, retry_after_seconds
+
+
+def test_retry_after_seconds_and_date():
+    """Retry-After is read both as a delay and as an HTTP date."""
+    assert retry_after_seconds(httpx.Response(503, headers={"Retry-After": "7"})) == 7
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    wait = retry_after_seconds(httpx.Response(429, headers={"Retry-After": date}))
+    assert 25 <= wait <= 30
+
+
+def test_rate_limit_reset_only_on_429():
+    """Reset headers are honoured on 429, epoch values converted to a delay."""
+    reset = str(int(time.time()) + 10)
+    assert 8 <= retry_after_seconds(httpx.Response(429, headers={"X-RateLimit-Reset": reset})) <= 10
+    assert retry_after_seconds(httpx.Response(500, headers={"X-RateLimit-Reset": "5"})) is None
+
+
+def test_backoff_is_bounded():
+    """Jittered backoff never exceeds the exponential cap or max_delay."""
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    assert all(0 <= policy.backoff(1) <= 2 for _ in range(50))
+    assert all(0 <= policy.backoff(10) <= 5 for _ in range(50))
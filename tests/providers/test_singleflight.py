@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from src.providers.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    """Concurrent callers with the same key get the leader's result."""
+    flight = SingleFlight()
+    upstream = 0
+
+    async def fetch():
+        nonlocal upstream
+        upstream += 1
+        await asyncio.sleep(0.01)
+        return {"price": 1.0}
+
+    async def main():
+        return await asyncio.gather(*(flight.do("usdc", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert upstream == 1
+    assert all(r == {"price": 1.0} for r in results)
+    assert results[0] is not results[1]
+    assert flight.stats() == {"upstream_calls": 1, "coalesced": 4}
+
+
+def test_sequential_calls_are_not_coalesced():
+    """Once a call completes, the next one goes upstream again."""
+    flight = SingleFlight()
+
+    async def fetch():
+        return 1
+
+    async def main():
+        await flight.do("k", fetch)
+        await flight.do("k", fetch)
+
+    asyncio.run(main())
+    assert flight.stats() == {"upstream_calls": 2, "coalesced": 0}
+
+
+def test_errors_propagate_to_all_callers():
+    """A failing upstream call fails every waiting caller."""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do("k", fetch) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,44 @@
+import pytest
+from src.providers import wallet_dataset
+from src.providers.wallet_dataset import _flow_tokens, _select_tokens
+
+
+def row(symbol, value, spam=None):
+    return {
+        "token_address": f"0x{symbol}",
+        "symbol": symbol,
+        "value_usd": value,
+        "possible_spam": spam,
+    }
+
+
+def test_select_tokens_drops_spam_dust_and_tail(monkeypatch):
+    """Spam and dust rows are dropped, the tail beyond MAX_TOKENS is only counted."""
+    monkeypatch.setattr(wallet_dataset, "MAX_TOKENS", 2)
+    rows = [
+        row("a", 500.0),
+        row("s", 100.0, spam=True),
+        row("b", 50.0),
+        row("c", 20.0),
+        row("d", 0.2),
+        row("u", None),
+    ]
+    kept, other = _select_tokens(rows)
+    assert [r["symbol"] for r in kept] == ["a", "b"]
+    assert other == {"count": 3, "spam": 1, "value_usd": pytest.approx(20.2)}
+
+
+def test_select_tokens_keeps_unpriced_when_there_is_room():
+    """Tokens without a price are not dust."""
+    kept, other = _select_tokens([row("a", 5.0), row("u", None)])
+    assert [r["symbol"] for r in kept] == ["a", "u"]
+    assert other["count"] == 0
+
+
+def test_flow_tokens_are_the_moved_tokens_without_a_row():
+    history = {
+        "outgoing_by_token": {"native": {"transfers": 9}, "0xsold": {"transfers": 2}},
+        "incoming_by_token": {"0xheld": {"transfers": 5}, "0xairdrop": {"transfers": 3}},
+    }
+    assert _flow_tokens(history, ["0xHELD"]) == ["0xairdrop", "0xsold"]
+    assert _flow_tokens(None, []) == []
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+import src.agent as agent
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.tools import StructuredTool
+from src.agent import (
+    AgentState,
+    _astream_llm,
+    _fit_prefix,
+    _message_tokens,
+    _pack_window,
+    _tool_message,
+    anode_tools,
+    node_tools,
+    util_stop_now,
+)
+
+MODEL = "gpt-4o"
+
+
+def tool_round(n, size):
+    call = {"name": "api_x", "args": {}, "id": f"c{n}", "type": "tool_call"}
+    return [
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content="word " * size, tool_call_id=f"c{n}", name="api_x"),
+    ]
+
+
+def test_window_keeps_newest_units_within_budget():
+    """Older tool rounds are dropped as a whole once the budget is spent."""
+    messages = tool_round(1, 300) + tool_round(2, 300) + tool_round(3, 300)
+    one_round = sum(_message_tokens(m, MODEL) for m in messages[-2:])
+    window, used = _pack_window(
+        messages, MODEL, budget=2 * one_round + 10, max_messages=10, max_token_per_msg=None
+    )
+    assert window == messages[2:]
+    assert used <= 2 * one_round + 10
+
+
+def test_window_respects_max_messages():
+    messages = tool_round(1, 10) + tool_round(2, 10) + [HumanMessage(content="go on")]
+    window, _ = _pack_window(
+        messages, MODEL, budget=10_000, max_messages=3, max_token_per_msg=None
+    )
+    assert window == messages[2:]
+
+
+def test_latest_tool_round_is_kept_even_over_budget():
+    """The latest tool round survives, truncated, when it does not fit."""
+    messages = tool_round(1, 50) + tool_round(2, 5000) + [HumanMessage(content="and then?")]
+    window, _ = _pack_window(
+        messages, MODEL, budget=400, max_messages=2, max_token_per_msg=None
+    )
+    assert [type(m) for m in window] == [AIMessage, ToolMessage, HumanMessage]
+    assert window[1].tool_call_id == "c2"
+    assert _message_tokens(window[1], MODEL) < _message_tokens(messages[3], MODEL)
+
+
+def test_prefix_is_bounded_by_truncating_the_dataset():
+    system = SystemMessage("You are an analyst.")
+    dataset = HumanMessage(content="token " * 5000)
+    prefix, tokens = _fit_prefix([system], [dataset], MODEL, budget=500)
+    assert prefix[0] is system
+    assert tokens <= 500
+    assert len(prefix[1].content) < len(dataset.content)
+
+    prefix, tokens = _fit_prefix([system], [HumanMessage(content="small")], MODEL, budget=500)
+    assert prefix[1].content == "small"
+
+
+def test_large_results_are_stored_but_query_results_are_truncated():
+    """A util_query_data result is never stored again, only cut down."""
+    result = {"rows": ["word"] * 500}
+    msg, _, _, stored = _tool_message("api_x", "c1", result, MODEL, store_min_tokens=50)
+    assert list(stored.values()) == [result]
+    assert json.loads(msg.content)["stored_as"] in stored
+
+    msg, _, _, stored = _tool_message("util_query_data", "c2", result, MODEL, store_min_tokens=50)
+    assert stored == {}
+    assert json.loads(msg.content)["truncated"] is True
+
+
+class StreamingLLM:
+    """Streams two util_math_evaluate calls, checking in between what has started."""
+
+    def __init__(self):
+        self.started_mid_stream = None
+
+    async def astream(self, convo):
+        yield AIMessageChunk(content="Computing")
+        for index in (0, 1):
+            args = json.dumps({"expressions": {"x": f"{index} + 1"}})
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"index": index, "id": f"c{index}", "name": "util_math_evaluate", "args": ""}
+                ],
+            )
+            if index == 1:
+                self.started_mid_stream = set(agent._EARLY_TOOL_RUNS["t1"].tasks)
+            for part in (args[:5], args[5:]):
+                yield AIMessageChunk(
+                    content="", tool_call_chunks=[{"index": index, "args": part}]
+                )
+
+
+@pytest.fixture
+def run_context(monkeypatch):
+    """Graph context of a run: its thread_id and custom stream."""
+    written = []
+    monkeypatch.setattr(agent, "get_config", lambda: {"configurable": {"thread_id": "t1"}})
+    monkeypatch.setattr(agent, "get_stream_writer", lambda: written.append)
+    return written
+
+
+def state(**extra):
+    return AgentState(
+        input_address="0x0", max_turns=5, max_messages=10, model_name=MODEL, stream=True, **extra
+    )
+
+
+def test_stream_writes_deltas_and_starts_complete_calls_early(run_context):
+    """A call starts as soon as the next one begins; the last is left to the tools node."""
+    llm = StreamingLLM()
+
+    async def run():
+        message = await _astream_llm(state(), [], llm)
+        tasks = dict(agent._EARLY_TOOL_RUNS["t1"].tasks)
+        result = await anode_tools(state(messages=[message]))
+        return message, tasks, result
+
+    message, tasks, result = asyncio.run(run())
+    assert llm.started_mid_stream == {"c0"}
+    assert set(tasks) == {"c0"}
+    assert [tc["id"] for tc in message.tool_calls] == ["c0", "c1"]
+    assert run_context[0] == {"type": "token", "turn": 0, "text": "Computing"}
+    deltas = [w["args_delta"] for w in run_context if w["type"] == "tool_call" and w["id"] == "c0"]
+    assert json.loads("".join(deltas)) == {"expressions": {"x": "0 + 1"}}
+    replies = result["messages"][1:]
+    assert [m.tool_call_id for m in replies] == ["c0", "c1"]
+    assert [json.loads(m.content) for m in replies] == [{"x": "1.0"}, {"x": "2.0"}]
+    assert "t1" not in agent._EARLY_TOOL_RUNS
+
+
+def test_tools_node_cancels_early_calls_it_does_not_collect(run_context):
+    """Early runs are per thread_id and do not outlive the tools step."""
+
+    async def run():
+        runs = agent._early_tool_runs(state())
+        leftover = asyncio.create_task(asyncio.sleep(60))
+        runs.tasks["gone"] = leftover
+        other = agent._EARLY_TOOL_RUNS.setdefault("t2", agent._EarlyToolRuns(1))
+        await anode_tools(state(messages=[AIMessage(content="done")]))
+        await asyncio.sleep(0)
+        return leftover, other
+
+    leftover, other = asyncio.run(run())
+    assert leftover.cancelled()
+    assert "t1" not in agent._EARLY_TOOL_RUNS
+    assert agent._EARLY_TOOL_RUNS.pop("t2") is other
+
+
+class SlowTools:
+    """A fake `slow` tool (sync and async) recording which calls ran and how many at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = self.peak = 0
+        self.ran = []
+
+    def _enter(self, name):
+        with self.lock:
+            self.ran.append(name)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def _exit(self):
+        with self.lock:
+            self.running -= 1
+
+    def run(self, name: str, delay: float) -> str:
+        self._enter(name)
+        time.sleep(delay)
+        self._exit()
+        return name
+
+    async def arun(self, name: str, delay: float) -> str:
+        self._enter(name)
+        await asyncio.sleep(delay)
+        self._exit()
+        return name
+
+
+@pytest.fixture
+def slow_tools(monkeypatch, run_context):
+    tools = SlowTools()
+    slow = StructuredTool.from_function(
+        func=tools.run, coroutine=tools.arun, name="slow", description="Sleep, return name."
+    )
+    monkeypatch.setattr(agent, "tool_executor", agent.ToolExecutor([slow, util_stop_now]))
+    return tools
+
+
+def run_tools(node, state):
+    return asyncio.run(node(state)) if node is anode_tools else node(state)
+
+
+def calls_state(calls, **extra):
+    tool_calls = [
+        {"name": name, "args": args, "id": f"c{i}", "type": "tool_call"}
+        for i, (name, args) in enumerate(calls)
+    ]
+    return state(messages=[AIMessage(content="", tool_calls=tool_calls)], **extra)
+
+
+@pytest.mark.parametrize("node", [node_tools, anode_tools])
+def test_tool_messages_follow_tool_call_order(node, slow_tools):
+    """Results are merged in tool_call order, not in completion order."""
+    delays = [0.2, 0.0, 0.1]
+    calls = [("slow", {"name": f"t{i}", "delay": d}) for i, d in enumerate(delays)]
+    replies = run_tools(node, calls_state(calls))["messages"][1:]
+    assert [m.tool_call_id for m in replies] == ["c0", "c1", "c2"]
+    assert [json.loads(m.content) for m in replies] == ["t0", "t1", "t2"]
+
+
+@pytest.mark.parametrize("node", [node_tools, anode_tools])
+def test_stop_now_short_circuits_the_batch(node, slow_tools):
+    calls = [
+        ("slow", {"name": "before", "delay": 0.0}),
+        ("util_stop_now", {}),
+        ("slow", {"name": "after", "delay": 0.0}),
+    ]
+    replies = run_tools(node, calls_state(calls))["messages"][1:]
+    assert [m.tool_call_id for m in replies] == ["c0", "c1"]
+    assert json.loads(replies[1].content)["type"] == "stop_now"
+    assert slow_tools.ran == ["before"]
+
+
+@pytest.mark.parametrize("node", [node_tools, anode_tools])
+def test_at_most_max_parallel_tools_run_at_once(node, slow_tools):
+    calls = [("slow", {"name": f"t{i}", "delay": 0.05}) for i in range(6)]
+    replies = run_tools(node, calls_state(calls, max_parallel_tools=2))["messages"][1:]
+    assert len(replies) == 6
+    assert slow_tools.peak <= 2
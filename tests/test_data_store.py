@@ -0,0 +1,70 @@
+import pytest
+
+from src.data_store import PathError, make_handle, outline, query, query_stored
+
+PORTFOLIO = {
+    "source": "alchemy",
+    "tokens": [
+        {"symbol": "ETH", "value_usd": 2500.0, "market": {"rank": 2}},
+        {"symbol": "PEPE", "value_usd": 12.5, "market": {"rank": 40}},
+        {"symbol": "USDC", "value_usd": "1000", "market": {"rank": 6}},
+    ],
+}
+
+
+def test_keys_and_indices():
+    assert query(PORTFOLIO, "source") == "alchemy"
+    assert query(PORTFOLIO, "tokens[0].symbol") == "ETH"
+    assert query(PORTFOLIO, "tokens.-1.market.rank") == 6
+    assert query(PORTFOLIO, "") == PORTFOLIO
+
+
+def test_projections_apply_to_every_item():
+    assert query(PORTFOLIO, "tokens[*].symbol") == ["ETH", "PEPE", "USDC"]
+    assert query(PORTFOLIO, "tokens[1:]{symbol}") == [{"symbol": "PEPE"}, {"symbol": "USDC"}]
+
+
+def test_filters_compare_numeric_strings_and_nested_fields():
+    """Numbers in string form are compared as numbers, fields may be dotted."""
+    assert query(PORTFOLIO, "tokens[?value_usd>=1000].symbol") == ["ETH", "USDC"]
+    assert query(PORTFOLIO, "tokens[?market.rank>10].symbol") == ["PEPE"]
+    assert query(PORTFOLIO, "tokens[?symbol=='usdc'].value_usd") == ["1000"]
+    assert query(PORTFOLIO, "tokens[?symbol~pe].symbol") == ["PEPE"]
+
+
+def test_missing_key_lists_available_keys():
+    with pytest.raises(PathError, match="source"):
+        query(PORTFOLIO, "tokenz")
+
+
+def test_malformed_path():
+    with pytest.raises(PathError):
+        query(PORTFOLIO, "tokens[?value_usd]")
+
+
+def test_query_stored_caps_list_results():
+    store = {"h": list(range(10))}
+    assert query_stored(store, "h", "[*]", limit=3) == {
+        "total": 10,
+        "returned": 3,
+        "items": [0, 1, 2],
+    }
+    with pytest.raises(PathError, match="Unknown handle"):
+        query_stored(store, "other")
+
+
+def test_query_stored_caps_large_objects():
+    store = {"h": {"by_token": {f"0x{i}": i for i in range(10)}}}
+    result = query_stored(store, "h", "by_token", limit=2)
+    assert result == {"total_keys": 10, "returned": 2, "items": {"0x0": 0, "0x1": 1}}
+
+
+def test_handle_is_stable():
+    assert make_handle("api_x", {"a": 1, "b": 2}) == make_handle("api_x", {"b": 2, "a": 1})
+    assert make_handle("api_x", {"a": 1}) != make_handle("api_x", {"a": 2})
+
+
+def test_outline_elides_lists_and_long_strings():
+    shape = outline({"items": [{"id": "x" * 100}] * 500})
+    assert shape["items"][0] == "<list, 500 items, first:>"
+    assert shape["items"][1]["id"].endswith("…")
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from src.providers.client import PROVIDER_CLIENTS, ProviderClient
+from src.providers.ratelimit import RATE_LIMITER, RateLimit
+from src.scheduler import (
+    REQUESTS_PER_CALL,
+    TOOL_PROVIDERS,
+    call_etas,
+    provider_of,
+    scheduled_reply,
+)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Registered through monkeypatch so the test provider is removed afterwards.
+    monkeypatch.setitem(PROVIDER_CLIENTS, "schedtest", None)
+    c = ProviderClient("schedtest", "https://example.invalid")
+    c.rate_limit = RateLimit(max_calls=1, period_seconds=10, burst=2)
+    RATE_LIMITER.local._buckets.pop(c.rate_key, None)
+    yield c
+    RATE_LIMITER.local._buckets.pop(c.rate_key, None)
+
+
+def calls(*names, **args):
+    return [{"name": name, "args": args} for name in names]
+
+
+def test_provider_of(client):
+    assert provider_of("api_schedtest_wallet") == "schedtest"
+    assert provider_of("api_unknown_wallet") is None
+    assert provider_of("util_math_evaluate") is None
+
+
+def test_calls_to_one_provider_queue_behind_each_other(client):
+    """Two tokens in the bucket: the third call waits one refill, the fourth two."""
+    names = ["api_schedtest_a", "util_x", "api_schedtest_b", "api_schedtest_c", "api_schedtest_d"]
+    etas = asyncio.run(call_etas(calls(*names)))
+    assert etas[:3] == [0.0, 0.0, 0.0]
+    assert etas[3] == pytest.approx(10.0, abs=0.1)
+    assert etas[4] == pytest.approx(20.0, abs=0.1)
+
+
+def test_bulk_calls_count_every_request(client, monkeypatch):
+    """A call making three requests pushes the next call back by all three."""
+    monkeypatch.setitem(REQUESTS_PER_CALL, "api_schedtest_bulk", lambda args: len(args["ids"]))
+    batch = [{"name": "api_schedtest_bulk", "args": {"ids": [1, 2, 3]}}]
+    etas = asyncio.run(call_etas(batch + calls("api_schedtest_a")))
+    assert etas[0] == 0.0
+    assert etas[1] == pytest.approx(20.0, abs=0.1)
+
+
+def test_unprefixed_tools_map_to_their_provider(client, monkeypatch):
+    monkeypatch.setitem(TOOL_PROVIDERS, "api_portfolio", lambda: "schedtest")
+    assert provider_of("api_portfolio") == "schedtest"
+    etas = asyncio.run(call_etas(calls("api_portfolio", "api_portfolio", "api_portfolio")))
+    assert etas[2] == pytest.approx(10.0, abs=0.1)
+
+
+def test_scheduled_reply():
+    reply = json.loads(scheduled_reply("api_schedtest_a", 42.04))
+    assert reply["status"] == "scheduled"
+    assert reply["eta_seconds"] == 42.0
@@ -0,0 +1,96 @@
+import pytest
+
+import src.utils
+from src.utils import TokenCounts, evaluate_expression
+
+
+def test_arithmetic_and_functions():
+    assert evaluate_expression("(1 + 2) * 3 - 4 / 2") == 7.0
+    assert evaluate_expression("sum([1, 2, 3], 4)") == 10.0
+    assert evaluate_expression("mean([2, 4]) + max(1, 5) - min([3, 7])") == 5.0
+    assert evaluate_expression("round(2.345, 2)") == 2.35
+
+
+def test_quoted_numbers_use_str_to_float():
+    """Hex balances and Fortran exponents are accepted as quoted strings."""
+    assert evaluate_expression("units('0x1bc16d674ec80000', 18)") == 2.0
+    assert evaluate_expression("'1.5d02' + 1") == 151.0
+
+
+def test_names_refer_to_earlier_results():
+    assert evaluate_expression("eth / total", {"eth": 25.0, "total": 100.0}) == 0.25
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "__import__('os').system('true')",
+        "(1).__class__",
+        "unknown + 1",
+        "1 / 0",
+        "10 ** 1000",
+        "[1, 2]",
+        "1 +",
+        "[1] * 10 ** 9",
+        "-[1, 2]",
+        "(-8) ** 0.5",
+        "units(1, 100000000)",
+        "units(1)",
+        "round(1, 2, 3)",
+    ],
+)
+def test_rejected(expression):
+    with pytest.raises(ValueError):
+        evaluate_expression(expression)
+
+
+@pytest.mark.parametrize(
+    "expression", ["(10 ** 300) ** 300", "9 ** 400 * 9 ** 400", "10 ** 300 * 10 ** 300"]
+)
+def test_overflow(expression):
+    """Huge results raise instead of building unbounded integers."""
+    with pytest.raises(OverflowError):
+        evaluate_expression(expression)
+
+
+class FakeEncoding:
+    name = "fake"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text, **kwargs):
+        self.encoded.append(text)
+        return text.split()
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    fake = FakeEncoding()
+    monkeypatch.setattr(src.utils, "get_encoding", lambda model: fake)
+    return fake
+
+
+def test_token_counts_hit_does_not_encode_again(encoding):
+    counts = TokenCounts()
+    assert counts.count("a b c", "m") == 3
+    assert counts.count("a b c", "m") == 3
+    assert encoding.encoded == ["a b c"]
+
+
+def test_token_counts_evicts_least_recently_used(encoding):
+    counts = TokenCounts(maxsize=2)
+    counts.count("a", "m")
+    counts.count("b", "m")
+    counts.count("a", "m")  # "b" is now the least recently used
+    counts.count("c", "m")
+    counts.count("a", "m")
+    counts.count("b", "m")
+    assert encoding.encoded == ["a", "b", "c", "b"]
+
+
+def test_token_counts_stats(encoding):
+    counts = TokenCounts()
+    for text in ["x", "y", "x", "x"]:
+        counts.count(text, "m")
+    assert counts.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5, "entries": 2}